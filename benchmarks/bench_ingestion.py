@@ -0,0 +1,105 @@
+"""
+Ingestion throughput benchmark against the local fake embedding server.
+
+Compares the old single Chroma.from_documents call with batched, concurrent
+embedding for a sweep of batch sizes and worker counts:
+
+    python -m benchmarks.bench_ingestion --chunks 2000 --latency 0.05
+"""
+import argparse
+import json
+import shutil
+import tempfile
+import time
+
+from langchain_chroma import Chroma
+from langchain_core.documents import Document
+from langchain_openai import OpenAIEmbeddings
+
+from benchmarks.fake_embedding_server import FakeEmbeddingServer
+from src.ingestion import embed_and_upsert, compute_chunk_id
+
+
+def make_chunks(count: int):
+    chunks = []
+    for i in range(count):
+        chunk = Document(
+            page_content=f"Synthetic chunk {i} about gen AI adoption and workflow redesign. " * 12,
+            metadata={"source": "synthetic.pdf", "page": i // 4},
+        )
+        chunk.metadata["content_hash"] = compute_chunk_id(chunk)
+        chunks.append(chunk)
+    return chunks
+
+
+def make_embeddings(base_url: str) -> OpenAIEmbeddings:
+    return OpenAIEmbeddings(
+        model="text-embedding-ada-002",
+        base_url=base_url,
+        api_key="fake-key",
+        check_embedding_ctx_length=False,
+        max_retries=0,
+    )
+
+
+def bench_from_documents(chunks, base_url: str) -> dict:
+    directory = tempfile.mkdtemp()
+    try:
+        started = time.perf_counter()
+        Chroma.from_documents(chunks, make_embeddings(base_url), persist_directory=directory)
+        elapsed = time.perf_counter() - started
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    return {"mode": "from_documents", "seconds": round(elapsed, 3),
+            "chunks_per_second": round(len(chunks) / elapsed, 2)}
+
+
+def bench_batched(chunks, base_url: str, batch_size: int, max_workers: int,
+                  tokens_per_minute: int) -> dict:
+    directory = tempfile.mkdtemp()
+    try:
+        embeddings = make_embeddings(base_url)
+        vector_store = Chroma(persist_directory=directory, embedding_function=embeddings)
+        stats = embed_and_upsert(chunks, vector_store, embeddings, batch_size=batch_size,
+                                 max_workers=max_workers, tokens_per_minute=tokens_per_minute)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    stats.update({"mode": "batched", "batch_size": batch_size, "max_workers": max_workers})
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=1000)
+    parser.add_argument("--latency", type=float, default=0.05,
+                        help="Fake server latency per request in seconds")
+    parser.add_argument("--batch-sizes", default="16,64,256")
+    parser.add_argument("--workers", default="1,4,8")
+    parser.add_argument("--tokens-per-minute", type=int, default=10_000_000)
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    server = FakeEmbeddingServer(latency=args.latency).start()
+    chunks = make_chunks(args.chunks)
+    results = [bench_from_documents(chunks, server.base_url)]
+    try:
+        for batch_size in map(int, args.batch_sizes.split(",")):
+            for workers in map(int, args.workers.split(",")):
+                results.append(bench_batched(chunks, server.base_url, batch_size, workers,
+                                             args.tokens_per_minute))
+    finally:
+        server.stop()
+
+    for result in results:
+        print(f"{result['mode']:>15} batch={result.get('batch_size', '-'):>4} "
+              f"workers={result.get('max_workers', '-'):>2} "
+              f"{result['chunks_per_second']:>9} chunks/s "
+              f"{result.get('tokens_per_second', '-'):>10} tokens/s")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
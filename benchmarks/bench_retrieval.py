@@ -0,0 +1,192 @@
+"""
+Offline recall@k benchmark - dense versus BM25 versus hybrid retrieval, with
+and without the lexical rerank stage and sentence-level context compression.
+
+Runs the golden questions in benchmarks/golden_questions.json against the
+bundled index. A question is recalled at k when one of its evidence passages
+is inside the top-k chunks; for the compressed rows, when it survives
+compression of the hybrid top-k to CONTEXT_TOKEN_BUDGET tokens. The index is copied to a temp directory first, so
+the bundled files are never touched:
+
+    python -m benchmarks.bench_retrieval --k 1,2,3,4,6,8
+
+With --embeddings openai the stored vectors and the real embedding model are
+used (needs OPENAI_API_KEY). The default, --embeddings lsa, re-embeds the
+bundled chunks with a local latent semantic model (TF-IDF + SVD) so the
+benchmark runs without network access.
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+from typing import Dict, List
+
+import numpy as np
+from langchain_chroma import Chroma
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from config.settings import CHROMA_DB_DIR, HYBRID_FETCH_K, RERANK_FETCH_K
+from src.context_compression import SentenceCompressor, build_sentence_index
+from src.keyword_index import KeywordIndex, tokenize
+from src.reranker import LexicalReranker
+from src.utils import count_tokens
+from src.vector_store import HybridRetriever, load_chunks_from_store
+
+GOLDEN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "golden_questions.json")
+
+
+def load_golden(path: str = GOLDEN_PATH) -> List[dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def normalize(text: str) -> str:
+    """Lowercase, straight quotes and single spaces - PDF line breaks fall mid-sentence"""
+    return re.sub(r"\s+", " ", text.replace("’", "'").lower()).strip()
+
+
+def is_relevant(doc: Document, evidence: List[str]) -> bool:
+    content = normalize(doc.page_content)
+    return any(normalize(passage) in content for passage in evidence)
+
+
+def recall_at_k(rankings: List[List[Document]], golden: List[dict], k: int) -> float:
+    """Share of questions with an evidence chunk in the top k"""
+    hits = sum(any(is_relevant(doc, item["evidence"]) for doc in ranking[:k])
+               for ranking, item in zip(rankings, golden))
+    return hits / len(golden)
+
+
+class LSAEmbeddings(Embeddings):
+    """TF-IDF vectors projected onto the top singular vectors of the corpus"""
+
+    def __init__(self, texts: List[str], dimensions: int = 24):
+        documents = [tokenize(text) for text in texts]
+        self.vocabulary = {term: i for i, term in enumerate(sorted({t for doc in documents for t in doc}))}
+        frequency = np.zeros(len(self.vocabulary))
+        for doc in documents:
+            frequency[[self.vocabulary[t] for t in set(doc)]] += 1
+        self.idf = np.log((1 + len(documents)) / (1 + frequency)) + 1
+        matrix = np.stack([self._tfidf(doc) for doc in documents])
+        _, _, vt = np.linalg.svd(matrix, full_matrices=False)
+        self.projection = vt[:dimensions].T
+
+    def _tfidf(self, tokens: List[str]) -> np.ndarray:
+        vector = np.zeros(len(self.vocabulary))
+        for token in tokens:
+            if token in self.vocabulary:
+                vector[self.vocabulary[token]] += 1
+        vector = np.log1p(vector) * self.idf
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def embed_query(self, text: str) -> List[float]:
+        vector = self._tfidf(tokenize(text)) @ self.projection
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self.embed_query(text) for text in texts]
+
+
+def open_store(persist_directory: str, embeddings: str, workdir: str, lsa_dimensions: int = 24) -> Chroma:
+    """Copy the bundled index and open it, re-embedded locally unless using OpenAI"""
+    copy = os.path.join(workdir, "index")
+    shutil.copytree(persist_directory, copy)
+    if embeddings == "openai":
+        from src.vector_store import create_embeddings
+        return Chroma(persist_directory=copy, embedding_function=create_embeddings())
+
+    chunks = load_chunks_from_store(Chroma(persist_directory=copy))
+    return Chroma.from_documents(chunks, LSAEmbeddings([chunk.page_content for chunk in chunks], lsa_dimensions),
+                                 persist_directory=os.path.join(workdir, "lsa"))
+
+
+def result_row(retriever: str, k: int, ranked: List[List[Document]], golden: List[dict], seconds: float) -> Dict:
+    tokens = [sum(count_tokens(doc.page_content) for doc in ranking[:k]) for ranking in ranked]
+    return {
+        "retriever": retriever,
+        "k": k,
+        "recall": round(recall_at_k(ranked, golden, k), 3),
+        "context_tokens": round(float(np.mean(tokens)), 1),
+        "latency_ms": round(seconds / len(golden) * 1000, 2),
+    }
+
+
+def evaluate(vector_store: Chroma, golden: List[dict], ks: List[int], workdir: str) -> List[Dict]:
+    """Recall@k, mean context tokens and retrieval latency for each retriever and k"""
+    keyword_index = KeywordIndex.build(load_chunks_from_store(vector_store))
+    max_k = max(ks)
+    hybrid = HybridRetriever(vector_store=vector_store, keyword_index=keyword_index,
+                             k=max_k, fetch_k=max(HYBRID_FETCH_K, max_k))
+    candidates = HybridRetriever(vector_store=vector_store, keyword_index=keyword_index,
+                                 k=max(RERANK_FETCH_K, max_k), fetch_k=max(HYBRID_FETCH_K, RERANK_FETCH_K, max_k))
+    reranker = LexicalReranker(keyword_index=keyword_index, top_n=max_k)
+
+    retrievers = {
+        "dense": lambda question: vector_store.similarity_search(question, k=max_k),
+        "bm25": lambda question: [doc for doc, _ in keyword_index.search(question, max_k)],
+        "hybrid": hybrid.invoke,
+        "rerank": lambda question: reranker.compress_documents(candidates.invoke(question), question),
+    }
+
+    results, rankings = [], {}
+    for retriever, retrieve in retrievers.items():
+        ranked, seconds = [], 0.0
+        for item in golden:
+            started = time.perf_counter()
+            ranked.append(list(retrieve(item["question"])))
+            seconds += time.perf_counter() - started
+        rankings[retriever] = ranked
+        results.extend(result_row(retriever, k, ranked, golden, seconds) for k in ks)
+
+    # Compression trims the hybrid top-k as a whole, so it runs once per k
+    compressor = SentenceCompressor(embeddings=vector_store.embeddings,
+                                    sentence_index=build_sentence_index(vector_store, workdir))
+    for k in ks:
+        compressed, seconds = [], 0.0
+        for item, ranking in zip(golden, rankings["hybrid"]):
+            started = time.perf_counter()
+            compressed.append(list(compressor.compress_documents(ranking[:k], item["question"])))
+            seconds += time.perf_counter() - started
+        results.append(result_row("compressed", k, compressed, golden, seconds))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--persist-directory", default=CHROMA_DB_DIR)
+    parser.add_argument("--golden", default=GOLDEN_PATH)
+    parser.add_argument("--embeddings", choices=["lsa", "openai"], default="lsa")
+    parser.add_argument("--lsa-dimensions", type=int, default=24,
+                        help="Latent dimensions of the offline embedder - about a third of the chunk count")
+    parser.add_argument("--k", default="1,2,3,4,6,8")
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    ks = [int(k) for k in args.k.split(",")]
+    golden = load_golden(args.golden)
+    workdir = tempfile.mkdtemp()
+    try:
+        results = evaluate(open_store(args.persist_directory, args.embeddings, workdir, args.lsa_dimensions),
+                           golden, ks, workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"{len(golden)} golden questions, {args.embeddings} embeddings")
+    print(f"{'retriever':>10} {'k':>3} {'recall':>7} {'context tokens':>15} {'latency ms':>11}")
+    for result in results:
+        print(f"{result['retriever']:>10} {result['k']:>3} {result['recall']:>7} "
+              f"{result['context_tokens']:>15} {result['latency_ms']:>11}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+Vector backend benchmark - Chroma versus the NumPy flat and IVF snapshots,
+in float32 and quantized to float16 / int8.
+
+Measures load time (open the store and answer a first query), single-query
+and batched throughput, resident memory added by the loaded store, the size
+of the matrix each search scans, and recall@k of each backend against exact
+search - so the recall lost to quantization sits next to the memory saved.
+Queries are stored vectors plus noise, so no embedding calls are made. Each
+backend is measured in its own process, on a copy of the index:
+
+    python -m benchmarks.bench_vector_backend --rows 20000
+
+--rows pads the bundled chunks with perturbed copies of their vectors to see
+how the backends scale past the bundled corpus.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+from langchain_chroma import Chroma
+
+from config.settings import CHROMA_DB_DIR, NUMPY_IVF_NPROBE, NUMPY_RESCORE_FACTOR
+from src.numpy_store import NumpyVectorStore, normalize_rows, top_k
+from src.vector_store import search_by_vectors
+
+NOISE = 0.3
+BATCH_SIZE = 32
+# NumPy snapshot variants: name -> (IVF, quantization)
+SNAPSHOTS = {
+    "flat": (False, "none"),
+    "flat-f16": (False, "float16"),
+    "flat-int8": (False, "int8"),
+    "ivf": (True, "none"),
+    "ivf-int8": (True, "int8"),
+}
+
+
+def rss_mb() -> float:
+    """Current resident set size - Linux /proc, else the peak from getrusage"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def perturb(vectors: np.ndarray, count: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    base = vectors[rng.integers(0, len(vectors), count)]
+    return normalize_rows(base + rng.normal(scale=NOISE / np.sqrt(vectors.shape[1]), size=base.shape))
+
+
+def prepare(persist_directory: str, workdir: str, rows: int, ivf_lists: int, queries: int) -> Dict:
+    """Build the Chroma copy, every NumPy snapshot and the query vectors"""
+    chroma_dir = os.path.join(workdir, "chroma")
+    shutil.copytree(persist_directory, chroma_dir)
+    collection = Chroma(persist_directory=chroma_dir)._collection
+    stored = collection.get(include=["embeddings", "documents", "metadatas"])
+    vectors = np.asarray(stored["embeddings"], dtype=np.float32)
+
+    extra = max(0, rows - len(vectors))
+    if extra:
+        padding = perturb(vectors, extra, seed=1)
+        source = np.random.default_rng(1).integers(0, len(vectors), extra)
+        for start in range(0, extra, 5000):
+            stop = min(start + 5000, extra)
+            collection.add(ids=[f"synthetic-{i}" for i in range(start, stop)],
+                           embeddings=padding[start:stop],
+                           documents=[stored["documents"][i] for i in source[start:stop]],
+                           metadatas=[stored["metadatas"][i] for i in source[start:stop]])
+        vectors = np.vstack([vectors, padding])
+        stored["ids"] += [f"synthetic-{i}" for i in range(extra)]
+        stored["documents"] += [stored["documents"][i] for i in source]
+        stored["metadatas"] += [stored["metadatas"][i] for i in source]
+
+    for name, (ivf, quantization) in SNAPSHOTS.items():
+        os.makedirs(os.path.join(workdir, name))
+        NumpyVectorStore.from_arrays(vectors, stored["ids"], stored["documents"], stored["metadatas"],
+                                     ivf_lists=ivf_lists if ivf else 0,
+                                     quantization=quantization).save(os.path.join(workdir, name))
+
+    query_vectors = perturb(vectors, queries, seed=2)
+    np.save(os.path.join(workdir, "queries.npy"), query_vectors)
+    exact, _ = top_k(query_vectors @ normalize_rows(vectors).T, 10)
+    return {"rows": len(vectors), "exact": [[stored["ids"][i] for i in row] for row in exact]}
+
+
+def scanned_mb(store) -> Optional[float]:
+    """Size of the matrix a search scans - the float32 one is only read to rescore"""
+    if not isinstance(store, NumpyVectorStore):
+        return None
+    matrix = store.vectors if store.quantized is None else store.quantized
+    scales = store.scales.nbytes if store.scales is not None else 0
+    return round((matrix.nbytes + scales) / (1024 * 1024), 1)
+
+
+def measure(backend: str, workdir: str, k: int, nprobe: int, rescore_factor: int) -> Dict:
+    """Runs in a fresh process so load time and memory are not shared between backends"""
+    queries = np.load(os.path.join(workdir, "queries.npy"))
+    baseline = rss_mb()
+    started = time.perf_counter()
+    if backend == "chroma":
+        store = Chroma(persist_directory=os.path.join(workdir, "chroma"))
+    else:
+        store = NumpyVectorStore.load(os.path.join(workdir, backend), nprobe=nprobe,
+                                      rescore_factor=rescore_factor)
+    search_by_vectors(store, queries[:1].tolist(), k)
+    load_ms = (time.perf_counter() - started) * 1000
+
+    ranked: List[List[str]] = []
+    started = time.perf_counter()
+    for query in queries:
+        ranked.append([doc.id or doc.metadata.get("content_hash") for doc in
+                       store.similarity_search_by_vector(query.tolist(), k=k)])
+    single = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for start in range(0, len(queries), BATCH_SIZE):
+        search_by_vectors(store, queries[start:start + BATCH_SIZE].tolist(), k)
+    batched = time.perf_counter() - started
+
+    return {
+        "backend": backend,
+        "load_ms": round(load_ms, 1),
+        "qps": round(len(queries) / single, 1),
+        "batch_qps": round(len(queries) / batched, 1),
+        "rss_mb": round(rss_mb() - baseline, 1),
+        "index_mb": scanned_mb(store),
+        "ranked": ranked,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--persist-directory", default=CHROMA_DB_DIR)
+    parser.add_argument("--rows", type=int, default=0, help="Pad the index to this many vectors")
+    parser.add_argument("--ivf-lists", type=int, default=0, help="IVF lists - default about sqrt(rows)")
+    parser.add_argument("--nprobe", type=int, default=NUMPY_IVF_NPROBE)
+    parser.add_argument("--rescore-factor", type=int, default=NUMPY_RESCORE_FACTOR,
+                        help="Candidates rescored in float32 per result for quantized snapshots")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    try:
+        rows = max(args.rows, 1)
+        prepared = prepare(args.persist_directory, workdir, rows,
+                           args.ivf_lists or max(1, int(np.sqrt(max(rows, 72)))), args.queries)
+        context = multiprocessing.get_context("spawn")
+        results = []
+        for backend in ("chroma", *SNAPSHOTS):
+            with context.Pool(1) as pool:
+                result = pool.apply(measure, (backend, workdir, args.k, args.nprobe, args.rescore_factor))
+            ranked = result.pop("ranked")
+            hits = [len(set(found) & set(exact[:args.k])) / args.k for found, exact in zip(ranked, prepared["exact"])]
+            result["recall"] = round(float(np.mean(hits)), 3)
+            results.append(result)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"{prepared['rows']} vectors, {args.queries} queries, k={args.k}")
+    print(f"{'backend':>9} {'load ms':>9} {'qps':>9} {'batch qps':>10} {'rss mb':>8} {'index mb':>9} {'recall':>7}")
+    for result in results:
+        print(f"{result['backend']:>9} {result['load_ms']:>9} {result['qps']:>9} {result['batch_qps']:>10} "
+              f"{result['rss_mb']:>8} {str(result['index_mb'] or '-'):>9} {result['recall']:>7}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""
+Retrieval quality and cost sweep over chunking and k.
+
+For every chunk size / overlap pair the corpus pages are re-split and indexed
+into a temporary Chroma collection, and the golden questions in
+benchmarks/golden_questions.json are retrieved with dense and hybrid search at
+each k. A chunk counts as relevant when it comes from one of the question's
+expected pages of its expected source file, so the score does not depend on
+where the chunk boundaries fall.
+Each row reports recall@k, MRR, the prompt tokens of the "stuff" answer prompt
+and the retrieval latency, and the cheapest row that keeps the best recall is
+printed at the end:
+
+    python -m benchmarks.eval_retrieval --chunk-sizes 512,1024,2048 --overlaps 0,200 --k 2,3,4,6
+
+Pages are parsed from the PDFs under DATA_DIR when there are any. Otherwise
+they are rebuilt from the chunks of the bundled index, which is copied to a
+temp directory first. The default embedder, --embeddings lsa, is the local
+latent semantic model of bench_retrieval, fitted once on the corpus so every
+configuration is embedded the same way. --embeddings fake uses random
+deterministic vectors, which is enough to time the pipeline but leaves dense
+recall at chance. --embeddings openai uses the real model and needs
+OPENAI_API_KEY.
+"""
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+from typing import Dict, List
+
+import numpy as np
+from langchain.chains.question_answering.stuff_prompt import CHAT_PROMPT
+from langchain_chroma import Chroma
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding, Embeddings
+
+from benchmarks.bench_retrieval import GOLDEN_PATH, LSAEmbeddings, load_golden
+from config.settings import (
+    CHROMA_DB_DIR, CHUNK_OVERLAP, CHUNK_SIZE, DATA_DIR, HYBRID_FETCH_K, HYBRID_SEARCH_K, VECTOR_SEARCH_K
+)
+from src.document_processor import find_corpus_files, iter_chunks, iter_corpus_pages
+from src.keyword_index import KeywordIndex
+from src.utils import count_tokens
+from src.vector_store import HybridRetriever, load_chunks_from_store
+
+# The offline embedder is fitted on one fixed split of the pages, not on the configuration under test
+LSA_FIT_CHUNK_SIZE = 512
+
+
+def merge_overlap(text: str, chunk: str) -> str:
+    """Append a chunk to the text before it, dropping the overlap the splitter repeated"""
+    for size in range(min(len(text), len(chunk)), 0, -1):
+        if text.endswith(chunk[:size]):
+            return text + chunk[size:]
+    return text + "\n" + chunk
+
+
+def pages_from_store(vector_store: Chroma) -> List[Document]:
+    """Rebuild one Document per page from its chunks, in corpus order"""
+    pages: Dict[tuple, Document] = {}
+    for chunk in load_chunks_from_store(vector_store):
+        key = (chunk.metadata.get("source"), chunk.metadata.get("page"))
+        if key in pages:
+            pages[key].page_content = merge_overlap(pages[key].page_content, chunk.page_content)
+        else:
+            pages[key] = Document(page_content=chunk.page_content, metadata=dict(chunk.metadata))
+    return list(pages.values())
+
+
+def load_pages(data_dir: str, persist_directory: str, workdir: str) -> List[Document]:
+    if find_corpus_files(data_dir):
+        return list(iter_corpus_pages(data_dir))
+    copy = os.path.join(workdir, "bundled")
+    shutil.copytree(persist_directory, copy)
+    return pages_from_store(Chroma(persist_directory=copy))
+
+
+def make_embeddings(kind: str, pages: List[Document], lsa_dimensions: int) -> Embeddings:
+    if kind == "openai":
+        from src.vector_store import create_embeddings
+        return create_embeddings()
+    if kind == "fake":
+        return DeterministicFakeEmbedding(size=lsa_dimensions)
+    fit_chunks = iter_chunks(pages, LSA_FIT_CHUNK_SIZE, 0)
+    return LSAEmbeddings([chunk.page_content for chunk in fit_chunks], lsa_dimensions)
+
+
+def is_supporting(doc: Document, item: dict) -> bool:
+    """Same file name and one of the expected pages - golden pages are numbered from 1, chunk metadata from 0"""
+    return (os.path.basename(doc.metadata.get("source", "")) == item["source"]
+            and doc.metadata.get("page", -1) + 1 in item["pages"])
+
+
+def first_hit(ranking: List[Document], item: dict, k: int) -> int:
+    """1-based rank of the first supporting chunk in the top k, 0 if there is none"""
+    for rank, doc in enumerate(ranking[:k], start=1):
+        if is_supporting(doc, item):
+            return rank
+    return 0
+
+
+def prompt_tokens(docs: List[Document], question: str) -> int:
+    """Tokens of the "stuff" prompt RetrievalQA sends to the answer LLM"""
+    messages = CHAT_PROMPT.format_messages(context="\n\n".join(doc.page_content for doc in docs),
+                                           question=question)
+    return sum(count_tokens(message.content) for message in messages)
+
+
+def evaluate_config(pages: List[Document], golden: List[dict], embeddings: Embeddings,
+                    chunk_size: int, chunk_overlap: int, ks: List[int], retrievers: List[str],
+                    workdir: str) -> List[Dict]:
+    """Recall@k, MRR, prompt tokens and retrieval latency for one chunking, per retriever and k"""
+    chunks = list(iter_chunks(pages, chunk_size, chunk_overlap))
+    vector_store = Chroma.from_documents(chunks, embeddings,
+                                         persist_directory=os.path.join(workdir, f"{chunk_size}-{chunk_overlap}"))
+    keyword_index = KeywordIndex.build(chunks)
+    max_k = max(ks)
+    hybrid = HybridRetriever(vector_store=vector_store, keyword_index=keyword_index,
+                             k=max_k, fetch_k=max(HYBRID_FETCH_K, max_k))
+    retrieve_with = {
+        "dense": lambda question: vector_store.similarity_search(question, k=max_k),
+        "hybrid": hybrid.invoke,
+    }
+
+    results = []
+    for retriever in retrievers:
+        retrieve = retrieve_with[retriever]
+        # The first query pays for Chroma's lazy index load
+        retrieve(golden[0]["question"])
+        ranked, seconds = [], 0.0
+        for item in golden:
+            started = time.perf_counter()
+            ranked.append(list(retrieve(item["question"])))
+            seconds += time.perf_counter() - started
+        for k in ks:
+            ranks = [first_hit(ranking, item, k) for ranking, item in zip(ranked, golden)]
+            tokens = [prompt_tokens(ranking[:k], item["question"]) for ranking, item in zip(ranked, golden)]
+            results.append({
+                "chunk_size": chunk_size,
+                "chunk_overlap": chunk_overlap,
+                "chunks": len(chunks),
+                "retriever": retriever,
+                "k": k,
+                "recall": round(sum(rank > 0 for rank in ranks) / len(golden), 3),
+                "mrr": round(sum(1 / rank for rank in ranks if rank) / len(golden), 3),
+                "prompt_tokens": round(float(np.mean(tokens)), 1),
+                "latency_ms": round(seconds / len(golden) * 1000, 2),
+            })
+    return results
+
+
+def cheapest(results: List[Dict], tolerance: float) -> Dict:
+    """Fewest prompt tokens among the rows within tolerance of the best recall"""
+    best = max(result["recall"] for result in results)
+    keeping = [result for result in results if result["recall"] >= best - tolerance]
+    return min(keeping, key=lambda result: (result["prompt_tokens"], -result["mrr"], result["latency_ms"]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--persist-directory", default=CHROMA_DB_DIR)
+    parser.add_argument("--golden", default=GOLDEN_PATH)
+    parser.add_argument("--embeddings", choices=["lsa", "fake", "openai"], default="lsa")
+    parser.add_argument("--lsa-dimensions", type=int, default=48,
+                        help="Latent dimensions of the offline embedder - about a third of the fitted chunks")
+    parser.add_argument("--chunk-sizes", default=f"512,{CHUNK_SIZE},2048")
+    parser.add_argument("--overlaps", default=f"0,{CHUNK_OVERLAP}")
+    parser.add_argument("--k", default=f"2,{HYBRID_SEARCH_K},{VECTOR_SEARCH_K},6")
+    parser.add_argument("--retrievers", default="dense,hybrid")
+    parser.add_argument("--recall-tolerance", type=float, default=0.0,
+                        help="Recall the recommended configuration may give up against the best row")
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    chunk_sizes = [int(size) for size in args.chunk_sizes.split(",")]
+    overlaps = [int(overlap) for overlap in args.overlaps.split(",")]
+    ks = sorted({int(k) for k in args.k.split(",")})
+    retrievers = args.retrievers.split(",")
+    golden = load_golden(args.golden)
+
+    workdir = tempfile.mkdtemp()
+    try:
+        pages = load_pages(args.data_dir, args.persist_directory, workdir)
+        embeddings = make_embeddings(args.embeddings, pages, args.lsa_dimensions)
+        results = []
+        for chunk_size in chunk_sizes:
+            for chunk_overlap in overlaps:
+                if chunk_overlap >= chunk_size:
+                    continue
+                results.extend(evaluate_config(pages, golden, embeddings, chunk_size, chunk_overlap,
+                                               ks, retrievers, workdir))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"{len(golden)} golden questions, {len(pages)} pages, {args.embeddings} embeddings")
+    print(f"{'chunk':>6} {'overlap':>8} {'chunks':>7} {'retriever':>10} {'k':>3} {'recall':>7} "
+          f"{'mrr':>6} {'prompt tokens':>14} {'latency ms':>11}")
+    for result in results:
+        print(f"{result['chunk_size']:>6} {result['chunk_overlap']:>8} {result['chunks']:>7} "
+              f"{result['retriever']:>10} {result['k']:>3} {result['recall']:>7} {result['mrr']:>6} "
+              f"{result['prompt_tokens']:>14} {result['latency_ms']:>11}")
+
+    choice = cheapest(results, args.recall_tolerance)
+    print(f"\nCheapest configuration keeping recall: CHUNK_SIZE={choice['chunk_size']} "
+          f"CHUNK_OVERLAP={choice['chunk_overlap']} {choice['retriever']} k={choice['k']} "
+          f"(recall {choice['recall']}, {choice['prompt_tokens']} prompt tokens)")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
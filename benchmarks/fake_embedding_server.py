@@ -0,0 +1,156 @@
+"""
+Local fake of the OpenAI embeddings endpoint for offline benchmarks.
+
+Serves POST /v1/embeddings with deterministic vectors, a configurable
+per-request latency and an optional tokens-per-minute limit that answers
+429 like the real API. Point OpenAIEmbeddings at it with
+base_url="http://127.0.0.1:<port>/v1".
+"""
+import argparse
+import base64
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional, Union
+
+import numpy as np
+
+
+def fake_vector(item: Union[str, List[int]], dimensions: int) -> np.ndarray:
+    """Deterministic float32 unit vector for a text (or token list)"""
+    seed = int.from_bytes(hashlib.sha256(json.dumps(item).encode("utf-8")).digest()[:8], "little")
+    vector = np.random.default_rng(seed).standard_normal(dimensions).astype(np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def encode_vector(vector: np.ndarray, encoding_format: str):
+    """Encode like the real API - the openai client asks for base64 by default"""
+    if encoding_format == "base64":
+        return base64.b64encode(vector.tobytes()).decode("ascii")
+    return vector.tolist()
+
+
+class _HTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Load tests open hundreds of connections at once
+    request_queue_size = 1024
+
+
+class FakeEmbeddingServer:
+    """Threaded HTTP server mimicking /v1/embeddings"""
+
+    def __init__(self, port: int = 0, latency: float = 0.05, dimensions: int = 1536,
+                 tokens_per_minute: Optional[int] = None):
+        self.latency = latency
+        self.dimensions = dimensions
+        self.tokens_per_minute = tokens_per_minute
+        self.requests = 0
+        self.rejected = 0
+        self._window: List = []
+        self._lock = threading.Lock()
+        self.httpd = _HTTPServer(("127.0.0.1", port), self._make_handler())
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}/v1"
+
+    def _admit(self, tokens: int) -> bool:
+        """Sliding one-minute window rate limit"""
+        if not self.tokens_per_minute:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            self._window = [(t, n) for t, n in self._window if now - t < 60]
+            if sum(n for _, n in self._window) + tokens > self.tokens_per_minute:
+                self.rejected += 1
+                return False
+            self._window.append((now, tokens))
+            return True
+
+    def respond(self, path: str, body: dict):
+        """Return (status, payload) for a POST - an iterable payload is streamed as SSE"""
+        if not path.endswith("/embeddings"):
+            return 404, {"error": {"message": f"Unknown path {path}"}}
+
+        inputs = body["input"]
+        if isinstance(inputs, str) or (inputs and isinstance(inputs[0], int)):
+            inputs = [inputs]
+        tokens = sum(len(item) if isinstance(item, list) else max(1, len(item) // 4)
+                     for item in inputs)
+
+        if not self._admit(tokens):
+            return 429, {"error": {"message": "Rate limit reached", "type": "requests"}}
+
+        time.sleep(self.latency)
+        return 200, {
+            "object": "list",
+            "model": body.get("model", "fake"),
+            "data": [
+                {"object": "embedding", "index": i,
+                 "embedding": encode_vector(fake_vector(item, self.dimensions),
+                                            body.get("encoding_format", "float"))}
+                for i, item in enumerate(inputs)
+            ],
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        }
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                with server._lock:
+                    server.requests += 1
+                status, payload = server.respond(self.path, body)
+                if isinstance(payload, dict):
+                    self._reply(status, payload)
+                else:
+                    self._stream(status, payload)
+
+            def _reply(self, status: int, payload: dict):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _stream(self, status: int, events):
+                """Write an iterable of dicts as server-sent events"""
+                self.send_response(status)
+                self.send_header("Content-Type", "text/event-stream")
+                self.end_headers()
+                for event in events:
+                    self.wfile.write(f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+                    self.wfile.flush()
+                self.wfile.write(b"data: [DONE]\n\n")
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> "FakeEmbeddingServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake OpenAI embeddings server")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--tokens-per-minute", type=int, default=None)
+    args = parser.parse_args()
+
+    fake = FakeEmbeddingServer(args.port, args.latency, tokens_per_minute=args.tokens_per_minute)
+    print(f"Fake embedding server listening on {fake.base_url}")
+    fake.httpd.serve_forever()
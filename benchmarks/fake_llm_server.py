@@ -0,0 +1,118 @@
+"""
+Local fake of the OpenAI chat completions and embeddings endpoints.
+
+Chat requests that offer tools get a call to the first tool with the user's
+question; anything else (including the turn after a tool result) gets a
+short canned answer, streamed word by word when the client asks for it.
+Every completion waits a configurable latency, so the agent's tool call ->
+retrieval -> final answer loop has realistic timing without an API key.
+"""
+import argparse
+import json
+import time
+import uuid
+from typing import List, Optional
+
+from benchmarks.fake_embedding_server import FakeEmbeddingServer
+
+
+def last_user_message(messages: List[dict]) -> str:
+    for message in reversed(messages):
+        if message.get("role") == "user":
+            content = message.get("content") or ""
+            return content if isinstance(content, str) else json.dumps(content)
+    return ""
+
+
+class FakeLLMServer(FakeEmbeddingServer):
+    """Threaded HTTP server mimicking /v1/chat/completions and /v1/embeddings"""
+
+    def __init__(self, port: int = 0, latency: float = 0.05, chat_latency: float = 0.2,
+                 dimensions: int = 1536, tokens_per_minute: Optional[int] = None,
+                 token_latency: float = 0.0):
+        super().__init__(port, latency, dimensions, tokens_per_minute)
+        self.chat_latency = chat_latency
+        self.token_latency = token_latency
+        self.completions = 0
+
+    def completion(self, body: dict) -> dict:
+        """Build a chat.completion - a tool call first, then a final answer"""
+        messages = body.get("messages", [])
+        question = last_user_message(messages)
+        tools = body.get("tools") or []
+
+        if tools and messages[-1].get("role") != "tool":
+            message = {
+                "role": "assistant",
+                "content": None,
+                "tool_calls": [{
+                    "id": f"call_{uuid.uuid4().hex[:12]}",
+                    "type": "function",
+                    "function": {"name": tools[0]["function"]["name"],
+                                 "arguments": json.dumps({"query": question})},
+                }],
+            }
+            finish_reason = "tool_calls"
+        else:
+            message = {"role": "assistant", "content": f"Fake answer to: {question[-120:]}"}
+            finish_reason = "stop"
+
+        prompt_tokens = sum(len(str(m.get("content") or "")) for m in messages) // 4
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "fake"),
+            "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": 16,
+                      "total_tokens": prompt_tokens + 16},
+        }
+
+    def stream_completion(self, completion: dict, include_usage: bool = False):
+        """Yield chat.completion.chunk events - one per word of a text answer"""
+        choice = completion["choices"][0]
+        message = choice["message"]
+        base = {"id": completion["id"], "object": "chat.completion.chunk",
+                "created": completion["created"], "model": completion["model"]}
+
+        def chunk(delta: dict, finish_reason=None) -> dict:
+            return dict(base, choices=[{"index": 0, "delta": delta, "finish_reason": finish_reason}])
+
+        if message.get("tool_calls"):
+            tool_calls = [dict(call, index=i) for i, call in enumerate(message["tool_calls"])]
+            yield chunk({"role": "assistant", "content": None, "tool_calls": tool_calls})
+        else:
+            yield chunk({"role": "assistant", "content": ""})
+            for i, word in enumerate(message["content"].split(" ")):
+                time.sleep(self.token_latency)
+                yield chunk({"content": word if i == 0 else f" {word}"})
+        yield chunk({}, choice["finish_reason"])
+        if include_usage:
+            yield dict(base, choices=[], usage=completion["usage"])
+
+    def respond(self, path: str, body: dict):
+        if not path.endswith("/chat/completions"):
+            return super().respond(path, body)
+
+        with self._lock:
+            self.completions += 1
+        time.sleep(self.chat_latency)
+        completion = self.completion(body)
+        if body.get("stream"):
+            include_usage = (body.get("stream_options") or {}).get("include_usage", False)
+            return 200, self.stream_completion(completion, include_usage)
+        return 200, completion
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake OpenAI chat + embeddings server")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--chat-latency", type=float, default=0.2)
+    parser.add_argument("--token-latency", type=float, default=0.0)
+    args = parser.parse_args()
+
+    fake = FakeLLMServer(args.port, args.latency, args.chat_latency,
+                         token_latency=args.token_latency)
+    print(f"Fake OpenAI server listening on {fake.base_url}")
+    fake.httpd.serve_forever()
@@ -0,0 +1,51 @@
+"""
+Offline stand-ins for the SerpAPI and ArXiv wrappers.
+
+They answer with deterministic text derived from the query after a
+configurable latency, so the web and ArXiv tools can be exercised without
+network access or API keys:
+
+    create_all_tools(search=FakeSearch(latency=0.3), arxiv=FakeArxiv(latency=0.5))
+"""
+import asyncio
+import hashlib
+import time
+
+
+def _digest(query: str) -> str:
+    return hashlib.sha256(query.encode("utf-8")).hexdigest()[:8]
+
+
+class FakeSearch:
+    """Same run / arun interface as SerpAPIWrapper"""
+
+    def __init__(self, latency: float = 0.3):
+        self.latency = latency
+        self.calls = 0
+
+    def _answer(self, query: str) -> str:
+        return f"Top web result {_digest(query)} for '{query}': companies report rising gen AI adoption."
+
+    def run(self, query: str) -> str:
+        self.calls += 1
+        time.sleep(self.latency)
+        return self._answer(query)
+
+    async def arun(self, query: str) -> str:
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        return self._answer(query)
+
+
+class FakeArxiv:
+    """Same run interface as ArxivAPIWrapper - the real client is synchronous too"""
+
+    def __init__(self, latency: float = 0.5):
+        self.latency = latency
+        self.calls = 0
+
+    def run(self, query: str) -> str:
+        self.calls += 1
+        time.sleep(self.latency)
+        return (f"Published: 2025-01-01\nTitle: A study of {query} ({_digest(query)})\n"
+                f"Authors: A. Author, B. Author\nSummary: A deterministic offline abstract.")
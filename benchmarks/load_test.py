@@ -0,0 +1,221 @@
+"""
+Load test of /api/ask - sync Flask workers versus the async ASGI path.
+
+Both servers run the real agent, tools and Chroma retrieval against the local
+fake LLM server, so the numbers reflect how many in-flight questions each
+serving mode can hold while OpenAI is slow:
+
+    python -m benchmarks.load_test --requests 400 --concurrency 100 --chat-latency 0.3
+"""
+import argparse
+import functools
+import http.client
+import json
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from wsgiref.simple_server import WSGIServer, WSGIRequestHandler, make_server
+
+import numpy as np
+
+from benchmarks.fake_llm_server import FakeLLMServer
+
+FLASK_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "flask")
+
+
+def configure_environment(base_url: str, router: bool = False):
+    """Point every OpenAI client at the fake server and turn the caches off.
+
+    Must run before any project module is imported - settings are read at import.
+    """
+    os.environ.update({
+        "ROUTER_ENABLED": "true" if router else "false",
+        "ROUTER_USE_EMBEDDINGS": "false",
+        "OPENAI_API_KEY": "fake-key",
+        "OPENAI_API_BASE": base_url,
+        "OPENAI_BASE_URL": base_url,
+        "SERPAPI_API_KEY": "fake-key",
+        "ENABLE_LANGFUSE": "false",
+        "EMBEDDING_CACHE_ENABLED": "false",
+        "SEMANTIC_CACHE_ENABLED": "false",
+        "RESPONSE_CACHE_ENABLED": "false",
+    })
+
+
+def build_system(base_url: str, chunks: int):
+    """Index synthetic chunks in a temp store and initialize the web app around it"""
+    from langchain_chroma import Chroma
+    from benchmarks.bench_ingestion import make_chunks, make_embeddings
+    from src.engine_registry import warm_up_engine
+    from src.tools import mckinsey_report_tool
+    from src.agent import create_enhanced_agent
+
+    sys.path.insert(0, FLASK_DIR)
+    import app as web
+    import asgi
+
+    directory = tempfile.mkdtemp()
+    vector_store = Chroma.from_documents(make_chunks(chunks), make_embeddings(base_url),
+                                         persist_directory=directory)
+    # Served under the default key, with its side indexes in the temp directory, not the bundled index
+    warm_up_engine(vector_store, store_directory=directory)
+
+    web.agent = create_enhanced_agent([mckinsey_report_tool])
+    web.agent.verbose = False
+    web.system_initialized = True
+    return web.app, asgi.application
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class PooledWSGIServer(WSGIServer):
+    """wsgiref server with a fixed worker pool, like gunicorn sync workers"""
+
+    request_queue_size = 1024
+
+    def __init__(self, address, handler_class, workers: int = 4):
+        super().__init__(address, handler_class)
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self._process, request, client_address)
+
+    def _process(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_sync(wsgi_app, workers: int):
+    server = make_server("127.0.0.1", free_port(), wsgi_app,
+                         server_class=functools.partial(PooledWSGIServer, workers=workers),
+                         handler_class=QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    def stop():
+        server.shutdown()
+        server.pool.shutdown(wait=False)
+
+    return server.server_address[1], stop
+
+
+def serve_async(asgi_app):
+    import uvicorn
+
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(asgi_app, host="127.0.0.1", port=port,
+                                           log_level="warning", lifespan="on"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+
+    def stop():
+        server.should_exit = True
+        thread.join(timeout=10)
+
+    return port, stop
+
+
+def run_load(port: int, requests: int, concurrency: int) -> dict:
+    """Fire distinct questions at /api/ask from a pool of blocking clients"""
+
+    def ask(i: int):
+        question = f"Question {i}: how are companies redesigning workflows according to the report?"
+        body = json.dumps({"question": question, "session_id": f"load-{i}"})
+        started = time.perf_counter()
+        connection = http.client.HTTPConnection("127.0.0.1", port, timeout=300)
+        try:
+            connection.request("POST", "/api/ask", body, {"Content-Type": "application/json"})
+            response = connection.getresponse()
+            payload = json.loads(response.read())
+            # Agent failures come back as 200 with an "Error: ..." answer
+            ok = (response.status == 200 and payload["status"] == "success"
+                  and not payload["answer"].startswith("Error"))
+        except Exception:
+            ok = False
+        finally:
+            connection.close()
+        return time.perf_counter() - started, ok
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(ask, range(requests)))
+    elapsed = time.perf_counter() - started
+
+    latencies = np.array([latency for latency, _ in results])
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": sum(1 for _, ok in results if not ok),
+        "seconds": round(elapsed, 3),
+        "requests_per_second": round(requests / elapsed, 2),
+        "p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 1),
+        "p95_ms": round(float(np.percentile(latencies, 95)) * 1000, 1),
+        "p99_ms": round(float(np.percentile(latencies, 99)) * 1000, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--chat-latency", type=float, default=0.2,
+                        help="Fake chat completion latency in seconds")
+    parser.add_argument("--embedding-latency", type=float, default=0.02)
+    parser.add_argument("--sync-workers", type=int, default=4,
+                        help="Worker threads for the sync server (like gunicorn workers)")
+    parser.add_argument("--chunks", type=int, default=200)
+    parser.add_argument("--modes", default="sync,async")
+    parser.add_argument("--router", action="store_true",
+                        help="Let the pre-agent router skip the agent hop for report questions")
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    fake = FakeLLMServer(latency=args.embedding_latency, chat_latency=args.chat_latency).start()
+    configure_environment(fake.base_url, args.router)
+    wsgi_app, asgi_app = build_system(fake.base_url, args.chunks)
+
+    results = []
+    try:
+        for mode in args.modes.split(","):
+            port, stop = (serve_sync(wsgi_app, args.sync_workers) if mode == "sync"
+                          else serve_async(asgi_app))
+            try:
+                run_load(port, min(args.concurrency, 10), min(args.concurrency, 10))  # warm up
+                result = run_load(port, args.requests, args.concurrency)
+            finally:
+                stop()
+            result["mode"] = mode
+            results.append(result)
+    finally:
+        fake.stop()
+
+    for result in results:
+        print(f"{result['mode']:>6} {result['requests_per_second']:>8} req/s "
+              f"p50={result['p50_ms']:>8}ms p95={result['p95_ms']:>8}ms "
+              f"p99={result['p99_ms']:>8}ms errors={result['errors']}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+"""
+Offline benchmark suite - ingestion throughput, index load time, retrieval
+QPS, tool latency, end-to-end /api/ask latency under concurrency and memory
+footprint, in one run with JSON output.
+
+Every OpenAI call goes to the local fake server (deterministic vectors and
+canned completions after a configurable latency) and the web / ArXiv tools
+use the deterministic backends in benchmarks/fake_tools.py, so no API key or
+network access is needed. Results carry the git commit they were measured
+at; --compare flags metrics that regressed against an earlier run:
+
+    python -m benchmarks.suite --output bench-main.json
+    python -m benchmarks.suite --compare bench-main.json
+"""
+import argparse
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from benchmarks.fake_llm_server import FakeLLMServer
+from benchmarks.fake_tools import FakeArxiv, FakeSearch
+from benchmarks.load_test import configure_environment, run_load, serve_async, serve_sync, FLASK_DIR
+
+STAGES = ("ingestion", "index_load", "retrieval", "tools", "ask")
+# Metrics where a larger value is an improvement - everything else (ms, mb, seconds) should shrink
+HIGHER_IS_BETTER = ("per_second", "qps")
+# A pass of the vector search alone takes milliseconds - repeat it so the QPS is stable
+SEARCH_PASSES = 10
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True, cwd=os.path.dirname(FLASK_DIR)).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def latency_summary(seconds: List[float]) -> Dict[str, float]:
+    latencies = np.array(seconds) * 1000
+    return {"p50_ms": round(float(np.percentile(latencies, 50)), 2),
+            "p95_ms": round(float(np.percentile(latencies, 95)), 2),
+            "p99_ms": round(float(np.percentile(latencies, 99)), 2)}
+
+
+def make_questions(count: int) -> List[str]:
+    topics = ["workflow redesign", "gen AI adoption", "AI governance", "workforce reskilling",
+              "risk mitigation", "CEO oversight", "AI high performers", "use case scaling"]
+    return [f"What does the report say about {topics[i % len(topics)]} ({i})?" for i in range(count)]
+
+
+def bench_ingestion(base_url: str, chunks: int, directory: str) -> Dict:
+    """Embed and upsert synthetic chunks into a fresh Chroma directory"""
+    from langchain_chroma import Chroma
+    from benchmarks.bench_ingestion import make_chunks, make_embeddings
+    from src.ingestion import embed_and_upsert
+
+    embeddings = make_embeddings(base_url)
+    stats = embed_and_upsert(make_chunks(chunks), Chroma(persist_directory=directory, embedding_function=embeddings),
+                             embeddings)
+    return {key: stats[key] for key in ("chunks", "seconds", "chunks_per_second", "tokens_per_second")}
+
+
+def bench_index_load(base_url: str, directory: str):
+    """Open the store cold, health-check it and build its retrieval engine (keyword index included).
+
+    Mirrors load_existing_vector_store, but with the benchmark embeddings client - the
+    default one fetches its tokenizer over the network.
+    """
+    from chromadb.api.client import SharedSystemClient
+    from langchain_chroma import Chroma
+    from benchmarks.bench_ingestion import make_embeddings
+    from src.engine_registry import engine_registry
+    from src.vector_store import check_vector_store_health
+
+    SharedSystemClient.clear_system_cache()
+    started = time.perf_counter()
+    vector_store = Chroma(persist_directory=directory, embedding_function=make_embeddings(base_url))
+    health = check_vector_store_health(directory, vector_store)
+    if not health["healthy"]:
+        raise RuntimeError(f"Benchmark index failed its health check: {health['errors']}")
+    engine = engine_registry.swap(vector_store, directory)
+    return engine, {"load_ms": round((time.perf_counter() - started) * 1000, 1)}
+
+
+def bench_retrieval(engine, queries: List[str]) -> Dict:
+    """Hybrid retrieval per question, and the vector search alone on precomputed query vectors"""
+    from src.vector_store import create_retriever, search_by_vectors
+
+    retriever = create_retriever(engine.vector_store, engine.keyword_index)
+    retriever.invoke(queries[0])  # warm up
+    timings = []
+    for query in queries:
+        started = time.perf_counter()
+        retriever.invoke(query)
+        timings.append(time.perf_counter() - started)
+
+    vectors = engine.vector_store.embeddings.embed_documents(queries)
+    started = time.perf_counter()
+    for _ in range(SEARCH_PASSES):
+        for vector in vectors:
+            search_by_vectors(engine.vector_store, [vector], 4)
+    search_seconds = time.perf_counter() - started
+    return {"queries": len(queries), "qps": round(len(queries) / sum(timings), 1),
+            **latency_summary(timings), "search_qps": round(SEARCH_PASSES * len(queries) / search_seconds, 1)}
+
+
+def bench_tools(tools, calls: int) -> Dict:
+    """Latency of the web and ArXiv tools, wrappers included, over the fake backends"""
+    results = {}
+    for tool in tools:
+        if tool.name not in ("web_search", "arxiv_search"):
+            continue
+        timings = []
+        for i in range(calls):
+            started = time.perf_counter()
+            tool.invoke(f"gen AI adoption study {i}")
+            timings.append(time.perf_counter() - started)
+        results[tool.name] = latency_summary(timings)
+    return results
+
+
+def bench_ask(engine, tools, modes: List[str], levels: List[int], requests: int,
+              sync_workers: int) -> List[Dict]:
+    """/api/ask through the real agent, tools and retrieval, at each concurrency level"""
+    from src.agent import create_enhanced_agent
+    from src.engine_registry import warm_up_engine
+    from src.usage import get_usage_stats
+
+    sys.path.insert(0, FLASK_DIR)
+    import app as web
+    import asgi
+
+    # Served under the default key, with its side indexes kept in the benchmark's temp directory
+    warm_up_engine(engine.vector_store, store_directory=engine.persist_directory)
+    web.agent = create_enhanced_agent(tools)
+    web.agent.verbose = False
+    web.system_initialized = True
+
+    results = []
+    for mode in modes:
+        port, stop = serve_sync(web.app, sync_workers) if mode == "sync" else serve_async(asgi.application)
+        try:
+            run_load(port, 4, 4)  # warm up
+            for concurrency in levels:
+                tokens = get_usage_stats()["total_tokens"]
+                result = run_load(port, max(requests, concurrency), concurrency)
+                result["tokens_per_request"] = round((get_usage_stats()["total_tokens"] - tokens)
+                                                     / result["requests"], 1)
+                result["mode"] = mode
+                results.append(result)
+        finally:
+            stop()
+    return results
+
+
+def flatten(results: Dict) -> Dict[str, float]:
+    """stage.metric -> value, with /api/ask rows keyed by mode and concurrency"""
+    metrics = {}
+    for stage, values in results.items():
+        if stage == "ask":
+            for row in values:
+                for name in ("requests_per_second", "p50_ms", "p95_ms", "p99_ms"):
+                    metrics[f"ask.{row['mode']}.c{row['concurrency']}.{name}"] = row[name]
+        elif stage == "tools":
+            for tool, summary in values.items():
+                metrics.update({f"tools.{tool}.{name}": value for name, value in summary.items()})
+        else:
+            metrics.update({f"{stage}.{name}": value for name, value in values.items()
+                            if isinstance(value, (int, float)) and name not in ("chunks", "queries")})
+    return metrics
+
+
+def compare(current: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Print every shared metric's change and return the ones that regressed beyond tolerance"""
+    before, after = flatten(baseline["results"]), flatten(current["results"])
+    regressions = []
+    print(f"\nCompared with {baseline.get('commit') or 'baseline'}:")
+    for name in sorted(set(before) & set(after)):
+        if not before[name]:
+            continue
+        change = (after[name] - before[name]) / before[name]
+        worse = -change if name.endswith(HIGHER_IS_BETTER) else change
+        flag = "REGRESSED" if worse > tolerance else ""
+        if flag:
+            regressions.append(name)
+        print(f"{name:>42} {before[name]:>10} -> {after[name]:>10} {change:>+8.1%} {flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--stages", default=",".join(STAGES))
+    parser.add_argument("--chunks", type=int, default=500)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--chat-latency", type=float, default=0.05,
+                        help="Fake chat completion latency in seconds")
+    parser.add_argument("--embedding-latency", type=float, default=0.01)
+    parser.add_argument("--search-latency", type=float, default=0.1, help="Fake SerpAPI latency")
+    parser.add_argument("--arxiv-latency", type=float, default=0.2, help="Fake ArXiv latency")
+    parser.add_argument("--tool-calls", type=int, default=10)
+    parser.add_argument("--concurrency", default="1,8,32", help="Concurrency levels for /api/ask")
+    parser.add_argument("--requests", type=int, default=64, help="Requests per concurrency level")
+    parser.add_argument("--modes", default="sync,async")
+    parser.add_argument("--sync-workers", type=int, default=4)
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    parser.add_argument("--compare", help="Earlier results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15,
+                        help="Relative change counted as a regression by --compare")
+    args = parser.parse_args()
+    stages = set(args.stages.split(","))
+
+    fake = FakeLLMServer(latency=args.embedding_latency, chat_latency=args.chat_latency).start()
+    configure_environment(fake.base_url)
+    from src.tools import create_all_tools
+    tools = create_all_tools(FakeSearch(args.search_latency), FakeArxiv(args.arxiv_latency))
+
+    workdir = tempfile.mkdtemp()
+    results: Dict = {}
+    memory = {"baseline_mb": round(peak_rss_mb(), 1)}
+    try:
+        # Every later stage needs the index, so ingestion always runs
+        results["ingestion"] = bench_ingestion(fake.base_url, args.chunks, workdir)
+        memory["after_ingestion_mb"] = round(peak_rss_mb(), 1)
+        engine, results["index_load"] = bench_index_load(fake.base_url, workdir)
+        memory["after_index_load_mb"] = round(peak_rss_mb(), 1)
+        if "retrieval" in stages:
+            results["retrieval"] = bench_retrieval(engine, make_questions(args.queries))
+        if "tools" in stages:
+            results["tools"] = bench_tools(tools, args.tool_calls)
+        if "ask" in stages:
+            results["ask"] = bench_ask(engine, tools, args.modes.split(","),
+                                       [int(level) for level in args.concurrency.split(",")],
+                                       args.requests, args.sync_workers)
+            memory["after_ask_mb"] = round(peak_rss_mb(), 1)
+        results["memory"] = memory
+    finally:
+        fake.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "config": vars(args),
+        "results": results,
+    }
+
+    ingestion, load = results["ingestion"], results["index_load"]
+    print(f"ingestion   {ingestion['chunks_per_second']:>9} chunks/s ({ingestion['chunks']} chunks)")
+    print(f"index load  {load['load_ms']:>9} ms")
+    if "retrieval" in results:
+        retrieval = results["retrieval"]
+        print(f"retrieval   {retrieval['qps']:>9} qps  p95={retrieval['p95_ms']}ms  "
+              f"vector search {retrieval['search_qps']} qps")
+    for tool, summary in results.get("tools", {}).items():
+        print(f"{tool:<12}{summary['p50_ms']:>9} ms p50")
+    for row in results.get("ask", []):
+        print(f"ask {row['mode']:>5} c={row['concurrency']:<3} {row['requests_per_second']:>8} req/s "
+              f"p50={row['p50_ms']:>8}ms p95={row['p95_ms']:>8}ms errors={row['errors']} "
+              f"tokens/request={row['tokens_per_request']}")
+    print(f"peak rss    {max(memory.values()):>9} MB")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} metric(s) regressed by more than {args.tolerance:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -16,20 +16,127 @@ LANGFUSE_HOST = os.getenv("LANGFUSE_HOST", "https://cloud.langfuse.com")
 # Model configurations
 LLM_MODEL = "gpt-3.5-turbo"
 EMBEDDING_MODEL = "text-embedding-ada-002"
+EMBEDDING_DIMENSIONS = 1536
 LLM_TEMPERATURE = 0
 
 # Document processing
 CHUNK_SIZE = 1024
 CHUNK_OVERLAP = 200
 VECTOR_SEARCH_K = 4
+# Batched, concurrent embedding during index builds
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", 64))
+EMBEDDING_MAX_WORKERS = int(os.getenv("EMBEDDING_MAX_WORKERS", 4))
+EMBEDDING_TOKENS_PER_MINUTE = int(os.getenv("EMBEDDING_TOKENS_PER_MINUTE", 1_000_000))
+EMBEDDING_MAX_RETRIES = int(os.getenv("EMBEDDING_MAX_RETRIES", 5))
+# Streaming ingestion - chunks buffered between pipeline stages
+INGESTION_QUEUE_SIZE = int(os.getenv("INGESTION_QUEUE_SIZE", 256))
+INGESTION_TRACE_MEMORY = os.getenv("INGESTION_TRACE_MEMORY", "false").lower() == "true"
+# Only embed new/changed chunks on startup instead of rebuilding the index
+INCREMENTAL_INGESTION = os.getenv("INCREMENTAL_INGESTION", "true").lower() == "true"
 
 # Paths
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DATA_DIR = "data"
 CHROMA_DB_DIR = "./chroma_db_langchain"
 PDF_FILE_PATH = os.path.join(DATA_DIR, "state.pdf")
+# Corpus parsing - every PDF under DATA_DIR is indexed
+PDF_PARSE_WORKERS = int(os.getenv("PDF_PARSE_WORKERS", min(4, os.cpu_count() or 1)))
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", 16))
+# Every cache file lives here, anchored to the project root rather than the directory the server starts in
+CACHE_DIR = os.path.join(PROJECT_ROOT, "cache")
+
+# Embedding cache
+EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+EMBEDDING_CACHE_PATH = os.path.join(CACHE_DIR, "embeddings.sqlite3")
+EMBEDDING_CACHE_MAX_BYTES = int(os.getenv("EMBEDDING_CACHE_MAX_BYTES", 512 * 1024 * 1024))
 
 # Logging
 LOG_LEVEL = "INFO"
 
 # Observability settings
-ENABLE_LANGFUSE = os.getenv("ENABLE_LANGFUSE", "true").lower() == "true"
\ No newline at end of file
+ENABLE_LANGFUSE = os.getenv("ENABLE_LANGFUSE", "true").lower() == "true"
+
+# Telemetry export - events are buffered in memory and sent in batches off the request path
+TELEMETRY_BUFFER_SIZE = int(os.getenv("TELEMETRY_BUFFER_SIZE", 10000))
+TELEMETRY_BATCH_SIZE = int(os.getenv("TELEMETRY_BATCH_SIZE", 100))
+TELEMETRY_FLUSH_INTERVAL_SECONDS = float(os.getenv("TELEMETRY_FLUSH_INTERVAL_SECONDS", 1.0))
+TELEMETRY_TIMEOUT_SECONDS = float(os.getenv("TELEMETRY_TIMEOUT_SECONDS", 5.0))
+TELEMETRY_MAX_RETRIES = int(os.getenv("TELEMETRY_MAX_RETRIES", 5))
+TELEMETRY_BACKOFF_SECONDS = float(os.getenv("TELEMETRY_BACKOFF_SECONDS", 0.5))
+TELEMETRY_MAX_BACKOFF_SECONDS = float(os.getenv("TELEMETRY_MAX_BACKOFF_SECONDS", 30.0))
+
+# Per-stage latency histograms served at /api/metrics
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+# Recent calls per stage kept for the p50/p95/p99 gauges
+METRICS_WINDOW = int(os.getenv("METRICS_WINDOW", 1024))
+
+# Token and cost accounting - USD per million tokens of the configured models
+LLM_INPUT_COST_PER_1M = float(os.getenv("LLM_INPUT_COST_PER_1M", 0.50))
+LLM_OUTPUT_COST_PER_1M = float(os.getenv("LLM_OUTPUT_COST_PER_1M", 1.50))
+EMBEDDING_COST_PER_1M = float(os.getenv("EMBEDDING_COST_PER_1M", 0.10))
+# Per-session token budget (0 = unlimited); over it requests are "downgrade"d or "reject"ed
+SESSION_TOKEN_BUDGET = int(os.getenv("SESSION_TOKEN_BUDGET", 0))
+BUDGET_ACTION = os.getenv("BUDGET_ACTION", "downgrade").lower()
+# Expected cost of a session's first request, before it has an average of its own
+BUDGET_REQUEST_ESTIMATE_TOKENS = int(os.getenv("BUDGET_REQUEST_ESTIMATE_TOKENS", 2000))
+USAGE_MAX_SESSIONS = int(os.getenv("USAGE_MAX_SESSIONS", 10000))
+
+# Semantic answer cache in front of the vector query engine
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", 0.97))
+SEMANTIC_CACHE_TTL_SECONDS = int(os.getenv("SEMANTIC_CACHE_TTL_SECONDS", 3600))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", 1000))
+
+# Exact-match response cache at the /api/ask layer
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", 1024))
+RESPONSE_CACHE_TTL_SECONDS = int(os.getenv("RESPONSE_CACHE_TTL_SECONDS", 3600))
+# How long past the TTL an answer may be served while it is refreshed in the background
+RESPONSE_CACHE_STALE_SECONDS = int(os.getenv("RESPONSE_CACHE_STALE_SECONDS", 86400))
+RESPONSE_CACHE_SQLITE_PATH = (os.getenv("RESPONSE_CACHE_SQLITE_PATH", os.path.join(CACHE_DIR, "responses.sqlite3"))
+                              if os.getenv("RESPONSE_CACHE_PERSIST", "true").lower() == "true" else None)
+
+# Batch question API
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", 8))
+BATCH_MAX_QUESTIONS = int(os.getenv("BATCH_MAX_QUESTIONS", 100))
+
+# Pre-agent router - confident report questions skip the agent's tool-choice LLM hop
+ROUTER_ENABLED = os.getenv("ROUTER_ENABLED", "true").lower() == "true"
+ROUTER_CONFIDENCE_THRESHOLD = float(os.getenv("ROUTER_CONFIDENCE_THRESHOLD", 0.8))
+ROUTER_USE_EMBEDDINGS = os.getenv("ROUTER_USE_EMBEDDINGS", "true").lower() == "true"
+ROUTER_EMBEDDING_MARGIN = float(os.getenv("ROUTER_EMBEDDING_MARGIN", 0.05))
+ROUTER_DIRECT_TOOLS = os.getenv("ROUTER_DIRECT_TOOLS", "mckinsey_report_tool,mckinsey_summary_tool").split(",")
+
+# BM25 keyword index over the stored chunks
+BM25_K1 = float(os.getenv("BM25_K1", 1.5))
+BM25_B = float(os.getenv("BM25_B", 0.75))
+
+# Hybrid retrieval - BM25 and dense candidates fused with reciprocal rank fusion
+HYBRID_SEARCH_ENABLED = os.getenv("HYBRID_SEARCH_ENABLED", "true").lower() == "true"
+HYBRID_SEARCH_K = int(os.getenv("HYBRID_SEARCH_K", 3))
+HYBRID_FETCH_K = int(os.getenv("HYBRID_FETCH_K", 20))
+RRF_K = int(os.getenv("RRF_K", 60))
+
+# Rerank stage - over-fetch candidates, keep the top N by lexical relevance
+RERANK_ENABLED = os.getenv("RERANK_ENABLED", "false").lower() == "true"
+RERANK_FETCH_K = int(os.getenv("RERANK_FETCH_K", 20))
+RERANK_TOP_N = int(os.getenv("RERANK_TOP_N", 2))
+
+# Vector backend - "chroma", or "numpy" to serve from a memory-mapped snapshot of the collection
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma").lower()
+# IVF lists for the numpy backend (0 = exact flat search) and how many lists a query scans
+NUMPY_IVF_LISTS = int(os.getenv("NUMPY_IVF_LISTS", 0))
+NUMPY_IVF_NPROBE = int(os.getenv("NUMPY_IVF_NPROBE", 8))
+# Scan a "float16" or "int8" copy of the matrix and rescore k * factor candidates in float32
+NUMPY_QUANTIZATION = os.getenv("NUMPY_QUANTIZATION", "none").lower()
+NUMPY_RESCORE_FACTOR = int(os.getenv("NUMPY_RESCORE_FACTOR", 10))
+
+# Context compression - keep only the retrieved sentences closest to the question
+CONTEXT_COMPRESSION_ENABLED = os.getenv("CONTEXT_COMPRESSION_ENABLED", "false").lower() == "true"
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", 400))
+
+# Hierarchical summary index built at ingestion for overview / key-insight questions
+SUMMARY_INDEX_ENABLED = os.getenv("SUMMARY_INDEX_ENABLED", "true").lower() == "true"
+SUMMARY_PAGES_PER_SECTION = int(os.getenv("SUMMARY_PAGES_PER_SECTION", 4))
+SUMMARY_TOP_SECTIONS = int(os.getenv("SUMMARY_TOP_SECTIONS", 3))
+SUMMARY_MAX_CONCURRENCY = int(os.getenv("SUMMARY_MAX_CONCURRENCY", 4))
@@ -5,25 +5,41 @@ Flask web application with Langfuse observability for the Agentic RAG System
 
 import sys
 import os
+import json
 import uuid
+import asyncio
+from typing import Optional
 
 # Add the parent directory to Python path to find src modules
 current_dir = os.path.dirname(os.path.abspath(__file__))
 parent_dir = os.path.dirname(current_dir)
 sys.path.insert(0, parent_dir)
 
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, Response, request, jsonify, render_template, stream_with_context
 import logging
 import traceback
 
 # Import your existing system
 from src.utils import setup_logging, validate_api_keys, ensure_directories
-from src.document_processor import load_and_process_documents
-from src.vector_store import create_vector_index
+from src.document_processor import find_corpus_files
+from src.ingestion import ingest_corpus
+from src.vector_store import check_vector_store_health
+from src.engine_registry import get_engine, warm_up_engine, get_engine_stats
+from src.embedding_cache import get_embedding_cache_stats
+from src.semantic_cache import get_semantic_cache_stats
+from src.router import get_router_stats
 from src.tools import create_all_tools
-from src.agent import create_enhanced_agent, ask_question
-from src.observability import initialize_observability, shutdown_observability
-from config.settings import PDF_FILE_PATH
+from src.agent import (
+    create_enhanced_agent, ask_question, astream_question, ask_questions_batch, PROMPT_VERSION
+)
+from src.response_cache import create_response_cache, make_response_key
+from src.observability import initialize_observability, shutdown_observability, get_telemetry_stats
+from src.metrics import get_metrics_stats, render_metrics
+from src.usage import track_usage, get_session_usage, get_usage_stats
+from config.settings import (
+    DATA_DIR, CHROMA_DB_DIR, LLM_MODEL, RESPONSE_CACHE_ENABLED,
+    BATCH_MAX_CONCURRENCY, BATCH_MAX_QUESTIONS
+)
 
 # Initialize Flask app
 app = Flask(__name__)
@@ -37,10 +53,11 @@ logger = logging.getLogger(__name__)
 agent = None
 system_initialized = False
 langfuse_handler = None
+response_cache = None
 
 def initialize_system():
     """Initialize the agentic RAG system with observability"""
-    global agent, system_initialized, langfuse_handler
+    global agent, system_initialized, langfuse_handler, response_cache
     
     try:
         logger.info("Initializing Agentic RAG System with Langfuse observability...")
@@ -53,19 +70,19 @@ def initialize_system():
         validate_api_keys()
         ensure_directories()
         
-        # Check if PDF exists
-        if not os.path.exists(PDF_FILE_PATH):
-            raise FileNotFoundError(f"PDF file not found: {PDF_FILE_PATH}")
+        if RESPONSE_CACHE_ENABLED and response_cache is None:
+            response_cache = create_response_cache()
         
-        # Load and process documents
-        logger.info("Loading documents...")
-        documents, chunks = load_and_process_documents(PDF_FILE_PATH)
+        # Check the corpus has reports to index
+        if not find_corpus_files(DATA_DIR):
+            raise FileNotFoundError(f"No PDF files found in {DATA_DIR}")
         
-        # Create vector store
-        logger.info("Creating vector store...")
-        vector_store = create_vector_index(chunks)
-        if vector_store is None:
-            raise ValueError("Failed to create vector store")
+        # Stream the corpus into the vector store
+        logger.info("Syncing vector store...")
+        vector_store, ingestion_stats = ingest_corpus(DATA_DIR)
+        
+        # Hot-swap the shared retrieval engine so the first question is warm
+        warm_up_engine(vector_store)
         
         # Create tools and agent
         logger.info("Creating tools and agent with observability...")
@@ -89,13 +106,29 @@ def home():
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
+    # Local checks only - costs milliseconds and no embedding calls
+    index_health = check_vector_store_health(CHROMA_DB_DIR)
     return jsonify({
         'status': 'healthy',
         'system_initialized': system_initialized,
         'observability_enabled': langfuse_handler is not None,
+        'engine_registry': get_engine_stats(),
+        'embedding_cache': get_embedding_cache_stats(),
+        'semantic_cache': get_semantic_cache_stats(),
+        'response_cache': response_cache.get_stats() if response_cache else {},
+        'router': get_router_stats(),
+        'telemetry': get_telemetry_stats(),
+        'usage': get_usage_stats(),
+        'latency_ms': get_metrics_stats(),
+        'index': index_health,
         'message': 'Agentic RAG System with Langfuse observability is running'
     })
 
+@app.route('/api/metrics', methods=['GET'])
+def metrics():
+    """Per-stage latency histograms and counters in the Prometheus text format"""
+    return Response(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 @app.route('/api/initialize', methods=['POST'])
 def initialize():
     """Initialize the system with observability"""
@@ -119,6 +152,128 @@ def initialize():
             'message': str(e)
         }), 500
 
+# ---------------------------------------------------------------------------
+# /api/ask helpers - shared with the async entry point in asgi.py
+# ---------------------------------------------------------------------------
+
+def parse_ask_request(data) -> dict:
+    """Validate an /api/ask payload, raising ValueError with the client message"""
+    if not data or 'question' not in data:
+        raise ValueError('No question provided')
+    
+    question = data['question'].strip()
+    if not question:
+        raise ValueError('Empty question provided')
+    
+    # Generate session ID if not provided
+    return {
+        'question': question,
+        'session_id': data.get('session_id') or str(uuid.uuid4()),
+        'user_id': data.get('user_id', 'anonymous'),
+    }
+
+def parse_batch_request(data) -> dict:
+    """Validate an /api/ask/batch payload, raising ValueError with the client message"""
+    if not isinstance(data, dict):
+        raise ValueError('Request body must be a JSON object')
+    questions = data.get('questions')
+    if not isinstance(questions, list) or not questions:
+        raise ValueError('No questions provided')
+    if len(questions) > BATCH_MAX_QUESTIONS:
+        raise ValueError(f'Too many questions (max {BATCH_MAX_QUESTIONS})')
+    if not all(isinstance(question, str) and question.strip() for question in questions):
+        raise ValueError('Questions must be non-empty strings')
+    if data.get('source') is not None and not isinstance(data['source'], str):
+        raise ValueError('Source must be a string')
+    
+    return {
+        'questions': [question.strip() for question in questions],
+        'source': data.get('source'),
+        'max_concurrency': max(1, min(int(data.get('max_concurrency', BATCH_MAX_CONCURRENCY)),
+                                      BATCH_MAX_CONCURRENCY)),
+        'session_id': data.get('session_id') or str(uuid.uuid4()),
+        'user_id': data.get('user_id', 'anonymous'),
+    }
+
+def response_cache_key(question: str) -> Optional[str]:
+    """Identical questions against the same model, prompt and index share an answer.
+
+    None when the cache is off, or before an index is loaded - there is no corpus version to key on.
+    """
+    if response_cache is None:
+        return None
+    engine = get_engine(CHROMA_DB_DIR)
+    if engine is None:
+        return None
+    return make_response_key(question, LLM_MODEL, PROMPT_VERSION, engine.corpus_version)
+
+def uncached_info() -> dict:
+    return {'status': 'disabled' if response_cache is None else 'bypass'}
+
+def is_cacheable(answer: str) -> bool:
+    return not answer.startswith("Error")
+
+def ask_success_payload(ask: dict, answer: str, cache_info: dict, usage=None) -> dict:
+    return {
+        'status': 'success',
+        'question': ask['question'],
+        'answer': answer,
+        'session_id': ask['session_id'],
+        'user_id': ask['user_id'],
+        'cache': cache_info,
+        'usage': usage.as_dict() if usage is not None else {},
+        'session_usage': get_session_usage(ask['session_id']),
+        'observability_enabled': langfuse_handler is not None,
+        'message': 'Question answered successfully with observability tracking'
+    }
+
+def budget_rejected_payload(ask: dict, answer: str) -> dict:
+    return {
+        'status': 'error',
+        'message': answer,
+        'session_id': ask['session_id'],
+        'session_usage': get_session_usage(ask['session_id']),
+    }
+
+async def stream_answer(ask: dict):
+    """Agent events for one question; a fresh cached answer is sent as a single done event"""
+    with track_usage(ask['session_id']) as usage:
+        cache_key = response_cache_key(ask['question'])
+        if cache_key is not None:
+            entry, status = response_cache.lookup(cache_key)
+            # Stale answers are re-streamed, which also refreshes them
+            if status == 'hit':
+                yield {'event': 'done', 'answer': entry['value'], 'session_id': ask['session_id'],
+                       'cache': {'status': 'hit'}, 'usage': usage.as_dict()}
+                return
+        
+        async for event in astream_question(
+            agent,
+            ask['question'],
+            chat_history=[],
+            session_id=ask['session_id'],
+            user_id=ask['user_id']
+        ):
+            if event['event'] == 'done' and cache_key is not None and is_cacheable(event['answer']):
+                response_cache.set(cache_key, event['answer'])
+            yield event
+
+def format_sse(event: dict) -> str:
+    return f"event: {event['event']}\ndata: {json.dumps(event)}\n\n"
+
+def iterate_async(events):
+    """Drive an async generator from a sync WSGI response on a private event loop"""
+    loop = asyncio.new_event_loop()
+    try:
+        while True:
+            try:
+                yield loop.run_until_complete(events.__anext__())
+            except StopAsyncIteration:
+                break
+    finally:
+        loop.run_until_complete(events.aclose())
+        loop.close()
+
 @app.route('/api/ask', methods=['POST'])
 def ask_question_endpoint():
     """Ask a question to the agentic RAG system with observability"""
@@ -130,60 +285,136 @@ def ask_question_endpoint():
                 'message': 'System not initialized. Please initialize first.'
             }), 400
         
-        # Get question from request
-        data = request.get_json()
-        if not data or 'question' not in data:
+        # Get question and session info from request
+        try:
+            ask = parse_ask_request(request.get_json())
+        except ValueError as e:
             return jsonify({
                 'status': 'error',
-                'message': 'No question provided'
+                'message': str(e)
             }), 400
         
-        question = data['question'].strip()
-        if not question:
+        logger.info(f"Question received: {ask['question']} (Session: {ask['session_id']}, User: {ask['user_id']})")
+        
+        # Ask the question with observability
+        def answer():
+            return ask_question(
+                agent,
+                ask['question'],
+                chat_history=[],
+                session_id=ask['session_id'],
+                user_id=ask['user_id']
+            )
+        
+        # Cache hits cost no tokens; the usage is read back once the request is added to its session
+        with track_usage(ask['session_id']) as usage:
+            cache_key = response_cache_key(ask['question'])
+            if cache_key is not None:
+                response, cache_info = response_cache.get_or_compute(cache_key, answer, cacheable=is_cacheable)
+            else:
+                response, cache_info = answer(), uncached_info()
+        
+        if usage.budget_action == 'rejected':
+            return jsonify(budget_rejected_payload(ask, response)), 429
+        
+        logger.info(f"Answer generated successfully with observability (cache: {cache_info['status']})")
+        
+        return jsonify(ask_success_payload(ask, response, cache_info, usage))
+        
+    except Exception as e:
+        logger.error(f"Error processing question: {e}")
+        traceback.print_exc()
+        return jsonify({
+            'status': 'error',
+            'message': f'Error processing question: {str(e)}'
+        }), 500
+
+@app.route('/api/ask/batch', methods=['POST'])
+def ask_questions_batch_endpoint():
+    """Answer a list of report questions in one call, in order, with per-item timing"""
+    try:
+        if not system_initialized or agent is None:
             return jsonify({
                 'status': 'error',
-                'message': 'Empty question provided'
+                'message': 'System not initialized. Please initialize first.'
             }), 400
         
-        # Get session info for observability
-        session_id = data.get('session_id')
-        user_id = data.get('user_id', 'anonymous')
-        
-        # Generate session ID if not provided
-        if not session_id:
-            session_id = str(uuid.uuid4())
+        try:
+            batch = parse_batch_request(request.get_json(silent=True))
+        except (ValueError, TypeError) as e:
+            return jsonify({
+                'status': 'error',
+                'message': str(e)
+            }), 400
         
-        logger.info(f"Question received: {question} (Session: {session_id}, User: {user_id})")
+        logger.info(f"Batch of {len(batch['questions'])} questions received (Session: {batch['session_id']}, User: {batch['user_id']})")
         
-        # Ask the question with observability
-        response = ask_question(
-            agent,
-            question,
-            chat_history=[],
-            session_id=session_id,
-            user_id=user_id
+        response = ask_questions_batch(
+            batch['questions'],
+            source=batch['source'],
+            max_concurrency=batch['max_concurrency'],
+            session_id=batch['session_id'],
+            user_id=batch['user_id']
         )
         
-        logger.info("Answer generated successfully with observability")
+        if response['status'] == 'rejected':
+            return jsonify(budget_rejected_payload(batch, response['error'])), 429
+        if response['status'] == 'error':
+            return jsonify({
+                'status': 'error',
+                'message': response['error'],
+                'results': response['results'],
+                'session_id': batch['session_id'],
+                'user_id': batch['user_id']
+            }), 500
         
         return jsonify({
             'status': 'success',
-            'question': question,
-            'answer': response,
-            'session_id': session_id,
-            'user_id': user_id,
-            'observability_enabled': langfuse_handler is not None,
-            'message': 'Question answered successfully with observability tracking'
+            'results': response['results'],
+            'timing_ms': response['timing_ms'],
+            'usage': response.get('usage', {}),
+            'session_usage': get_session_usage(batch['session_id']),
+            'session_id': batch['session_id'],
+            'user_id': batch['user_id'],
+            'observability_enabled': langfuse_handler is not None
         })
         
     except Exception as e:
-        logger.error(f"Error processing question: {e}")
+        logger.error(f"Error processing question batch: {e}")
         traceback.print_exc()
         return jsonify({
             'status': 'error',
-            'message': f'Error processing question: {str(e)}'
+            'message': f'Error processing question batch: {str(e)}'
         }), 500
 
+@app.route('/api/ask/stream', methods=['POST'])
+def ask_question_stream_endpoint():
+    """Stream tool progress and answer tokens as Server-Sent Events"""
+    if not system_initialized or agent is None:
+        return jsonify({
+            'status': 'error',
+            'message': 'System not initialized. Please initialize first.'
+        }), 400
+    
+    try:
+        ask = parse_ask_request(request.get_json())
+    except ValueError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 400
+    
+    logger.info(f"Streaming question: {ask['question']} (Session: {ask['session_id']}, User: {ask['user_id']})")
+    
+    def events():
+        # Every step runs on a copy of this context, so they all meter into the one request opened here
+        with track_usage(ask['session_id']):
+            for event in iterate_async(stream_answer(ask)):
+                yield format_sse(event)
+    
+    return Response(stream_with_context(events()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @app.teardown_appcontext
 def close_observability(error):
     """Clean up observability on app teardown"""
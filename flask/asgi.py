@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+ASGI entry point for the Agentic RAG System
+
+/api/ask and /api/ask/stream run natively on the event loop, so a handful
+of processes can hold hundreds of in-flight questions while they wait on
+OpenAI and SerpAPI. Every other route is served by the Flask app.
+
+    uvicorn asgi:application --app-dir flask --port 8004
+"""
+
+import json
+import os
+import traceback
+from typing import AsyncIterator, Awaitable, Callable, Dict, Tuple, Union
+
+from uvicorn.middleware.wsgi import WSGIMiddleware
+
+import app as web
+from src.agent import aask_question
+from src.observability import shutdown_observability
+from src.usage import track_usage
+
+logger = web.logger
+
+# Handlers return a JSON payload, or an async iterator of events to send as SSE
+Handler = Callable[[dict], Awaitable[Tuple[int, Union[dict, AsyncIterator[dict]]]]]
+
+
+async def read_json(receive) -> dict:
+    """Read the full request body and decode it as JSON (None if invalid)"""
+    body = b""
+    more_body = True
+    while more_body:
+        message = await receive()
+        body += message.get("body", b"")
+        more_body = message.get("more_body", False)
+    try:
+        return json.loads(body) if body else None
+    except ValueError:
+        return None
+
+
+async def send_json(send, status: int, payload: dict):
+    data = json.dumps(payload).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"),
+                    (b"content-length", str(len(data)).encode("ascii"))],
+    })
+    await send({"type": "http.response.body", "body": data})
+
+
+async def send_sse(send, events: AsyncIterator[dict]):
+    await send({
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [(b"content-type", b"text/event-stream"),
+                    (b"cache-control", b"no-cache"),
+                    (b"x-accel-buffering", b"no")],
+    })
+    try:
+        async for event in events:
+            await send({"type": "http.response.body",
+                        "body": web.format_sse(event).encode("utf-8"), "more_body": True})
+    finally:
+        # Stops the agent run if the client went away mid-stream
+        await events.aclose()
+    await send({"type": "http.response.body", "body": b""})
+
+
+async def ask_question_endpoint(data: dict) -> Tuple[int, dict]:
+    """Async /api/ask - same contract as the Flask view"""
+    if not web.system_initialized or web.agent is None:
+        return 400, {
+            'status': 'error',
+            'message': 'System not initialized. Please initialize first.'
+        }
+
+    try:
+        ask = web.parse_ask_request(data)
+    except ValueError as e:
+        return 400, {'status': 'error', 'message': str(e)}
+
+    logger.info(f"Question received (async): {ask['question']} (Session: {ask['session_id']}, User: {ask['user_id']})")
+
+    def answer():
+        return aask_question(
+            web.agent,
+            ask['question'],
+            chat_history=[],
+            session_id=ask['session_id'],
+            user_id=ask['user_id']
+        )
+
+    with track_usage(ask['session_id']) as usage:
+        cache_key = web.response_cache_key(ask['question'])
+        if cache_key is not None:
+            response, cache_info = await web.response_cache.aget_or_compute(
+                cache_key, answer, cacheable=web.is_cacheable
+            )
+        else:
+            response, cache_info = await answer(), web.uncached_info()
+
+    if usage.budget_action == 'rejected':
+        return 429, web.budget_rejected_payload(ask, response)
+    return 200, web.ask_success_payload(ask, response, cache_info, usage)
+
+
+async def ask_question_stream_endpoint(data: dict):
+    """Async /api/ask/stream - tool progress and answer tokens as SSE"""
+    if not web.system_initialized or web.agent is None:
+        return 400, {
+            'status': 'error',
+            'message': 'System not initialized. Please initialize first.'
+        }
+
+    try:
+        ask = web.parse_ask_request(data)
+    except ValueError as e:
+        return 400, {'status': 'error', 'message': str(e)}
+
+    logger.info(f"Streaming question (async): {ask['question']} (Session: {ask['session_id']}, User: {ask['user_id']})")
+    return 200, web.stream_answer(ask)
+
+
+class AsyncApplication:
+    """Route async endpoints on the event loop and everything else to Flask"""
+
+    def __init__(self, wsgi_app, routes: Dict[Tuple[str, str], Handler], wsgi_workers: int = 10):
+        self.routes = routes
+        self.fallback = WSGIMiddleware(wsgi_app, workers=wsgi_workers)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self.lifespan(receive, send)
+            return
+
+        handler = self.routes.get((scope.get("method"), scope.get("path")))
+        if scope["type"] != "http" or handler is None:
+            await self.fallback(scope, receive, send)
+            return
+
+        try:
+            status, payload = await handler(await read_json(receive))
+        except Exception as e:
+            logger.error(f"Error processing question: {e}")
+            traceback.print_exc()
+            status, payload = 500, {
+                'status': 'error',
+                'message': f'Error processing question: {str(e)}'
+            }
+        if isinstance(payload, dict):
+            await send_json(send, status, payload)
+        else:
+            await send_sse(send, payload)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                logger.info("Shutting down observability...")
+                shutdown_observability()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+
+application = AsyncApplication(
+    web.app,
+    routes={
+        ("POST", "/api/ask"): ask_question_endpoint,
+        ("POST", "/api/ask/stream"): ask_question_stream_endpoint,
+    },
+    wsgi_workers=int(os.getenv("WSGI_WORKERS", 10)),
+)
+
+if __name__ == '__main__':
+    import uvicorn
+
+    logger.info("Starting ASGI application with Langfuse observability...")
+    uvicorn.run(application, host='0.0.0.0', port=int(os.getenv('PORT', 8004)))
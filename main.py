@@ -1,16 +1,13 @@
 import os
 import uuid
 from src.utils import setup_logging, validate_api_keys, ensure_directories
-from src.document_processor import load_and_process_documents
-from src.vector_store import (
-    create_vector_index, load_existing_vector_store,
-    create_vector_query_engine, create_summary_query_engine,
-    create_router_query_engine
-)
+from src.document_processor import find_corpus_files
+from src.ingestion import ingest_corpus
+from src.engine_registry import warm_up_engine
 from src.tools import create_all_tools
-from src.agent import create_enhanced_agent, ask_question
+from src.agent import create_enhanced_agent, ask_question, ask_questions_batch
 from src.observability import initialize_observability, shutdown_observability
-from config.settings import PDF_FILE_PATH, CHROMA_DB_DIR
+from config.settings import DATA_DIR, CHROMA_DB_DIR
 
 logger = setup_logging()
 
@@ -26,25 +23,17 @@ def setup_system():
     validate_api_keys()
     ensure_directories()
     
-    # Check if PDF exists
-    if not os.path.exists(PDF_FILE_PATH):
-        raise FileNotFoundError(f"PDF file not found: {PDF_FILE_PATH}")
+    # Check the corpus has reports to index
+    if not find_corpus_files(DATA_DIR):
+        raise FileNotFoundError(f"No PDF files found in {DATA_DIR}")
     
-    # Load and process documents
-    documents, chunks = load_and_process_documents(PDF_FILE_PATH)
+    # Stream the corpus into the vector store - unchanged chunks are not re-embedded,
+    # unchanged report sections are not re-summarized
+    logger.info("Syncing vector store...")
+    vector_store, ingestion_stats = ingest_corpus(DATA_DIR)
     
-    # Always create fresh vector store for consistency
-    logger.info("Creating fresh vector store...")
-    vector_store = create_vector_index(chunks)
-    if vector_store is None:
-        raise ValueError("Failed to create vector store")
-    
-    # Create query engines
-    vector_query_engine = create_vector_query_engine(vector_store)
-    summary_query_engine = create_summary_query_engine(chunks)
-    
-    # Create router query engine
-    router_query_engine = create_router_query_engine(vector_query_engine, summary_query_engine)
+    # Share the synced store and its summary index with the report tools
+    warm_up_engine(vector_store)
     
     # Create tools
     tools = create_all_tools()
@@ -78,24 +67,19 @@ def test_system():
     print(f" User ID: {user_id}")
     print("=" * 60)
     
-    for i, question in enumerate(test_questions, 1):
-        print(f"\n Question {i}: {question}")
+    # One embedding request and one vector search for all questions
+    batch = ask_questions_batch(test_questions, session_id=session_id, user_id=user_id)
+    
+    for item in batch["results"]:
+        print(f"\n Question {item['index'] + 1}: {item['question']}")
         print("-" * 50)
-        
-        try:
-            response = ask_question(
-                enhanced_agent, 
-                question, 
-                chat_history=[],
-                session_id=session_id,
-                user_id=user_id
-            )
-            print(f"🤖 Answer: {response}")
-        except Exception as e:
-            print(f" Error: {e}")
-        
+        print(f"🤖 Answer: {item['answer']}")
+        if "timing_ms" in item:
+            print(f" Timing: {item['timing_ms']}")
         print("=" * 60)
     
+    print(f" Batch timing: {batch['timing_ms']}")
+    
     return enhanced_agent
 
 def interactive_mode():
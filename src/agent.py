@@ -1,6 +1,8 @@
 from __future__ import annotations
 
-from typing import List, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional
+import hashlib
+import time
 import uuid
 
 from langchain_core.tools import Tool
@@ -9,9 +11,13 @@ from langchain_core.messages import HumanMessage, SystemMessage, AIMessage
 from langchain.agents import create_openai_tools_agent, AgentExecutor
 from langchain_openai import ChatOpenAI
 
-from config.settings import LLM_MODEL
+from config.settings import LLM_MODEL, CHROMA_DB_DIR, BATCH_MAX_CONCURRENCY, ROUTER_ENABLED
+from src.engine_registry import get_engine
+from src.router import get_router, RouteDecision, REPORT_TOOL
 from src.utils import setup_logging
 from src.observability import get_langfuse_handler, create_trace, log_generation
+from src.metrics import timed
+from src.usage import RequestUsage, track_usage, check_budget, llm_callbacks
 
 logger = setup_logging()
 
@@ -19,24 +25,30 @@ logger = setup_logging()
 # System prompt - VERY DIRECT AND SIMPLE
 # ---------------------------------------------------------------------------
 
-def create_system_prompt() -> ChatPromptTemplate:
-    """Return a simple, direct system prompt that forces tool usage."""
-
-    return ChatPromptTemplate.from_messages([
-        ("system", """You are a McKinsey AI report assistant. You MUST use tools to answer questions.
+SYSTEM_PROMPT = """You are a McKinsey AI report assistant. You MUST use tools to answer questions.
 
 RULES:
 1. For questions about the McKinsey report, use mckinsey_report_tool with the user's exact question
-2. For web search questions, use web_search  
-3. For academic papers, use arxiv_search
-4. You MUST call a tool for every question - never give direct answers without using tools
-5. Pass the user's question exactly as they wrote it to mckinsey_report_tool
+2. For an overview, summary or key insights of the report, use mckinsey_summary_tool
+3. For web search questions, use web_search  
+4. For academic papers, use arxiv_search
+5. You MUST call a tool for every question - never give direct answers without using tools
+6. Pass the user's question exactly as they wrote it to the report tools
 
 Example:
 User: "Who is Lareina Yee according to the document?"
 You MUST call: mckinsey_report_tool with query "Who is Lareina Yee according to the document?"
 
-ALWAYS USE TOOLS. DO NOT ANSWER WITHOUT USING TOOLS."""),
+ALWAYS USE TOOLS. DO NOT ANSWER WITHOUT USING TOOLS."""
+
+# Changes whenever the prompt does, so cached answers from an older prompt are not reused
+PROMPT_VERSION = hashlib.sha256(SYSTEM_PROMPT.encode("utf-8")).hexdigest()[:12]
+
+def create_system_prompt() -> ChatPromptTemplate:
+    """Return a simple, direct system prompt that forces tool usage."""
+
+    return ChatPromptTemplate.from_messages([
+        ("system", SYSTEM_PROMPT),
         MessagesPlaceholder(variable_name="chat_history"),
         ("human", "{input}"),
         MessagesPlaceholder(variable_name="agent_scratchpad"),
@@ -56,7 +68,9 @@ def create_enhanced_agent(tools: List[Tool]) -> AgentExecutor:
     llm = ChatOpenAI(
         model=LLM_MODEL,
         temperature=0,
-        callbacks=callbacks  # Add Langfuse callback to LLM
+        streaming=True,  # Token events for /api/ask/stream
+        stream_usage=True,  # Streamed responses still report their token usage
+        callbacks=callbacks + llm_callbacks("agent_llm")  # Langfuse plus latency and token usage
     )
 
     agent = create_openai_tools_agent(
@@ -82,6 +96,95 @@ def create_enhanced_agent(tools: List[Tool]) -> AgentExecutor:
 # Helper function with observability
 # ---------------------------------------------------------------------------
 
+def format_chat_history(chat_history: List | None) -> List:
+    """Convert {"question", "answer"} turns into chat messages."""
+    formatted_history: List = []
+
+    for turn in chat_history or []:
+        if isinstance(turn, dict):
+            q = turn.get("question")
+            a = turn.get("answer")
+            if q:
+                formatted_history.append(HumanMessage(content=q))
+            if a:
+                formatted_history.append(AIMessage(content=a))
+        else:
+            formatted_history.append(turn)
+
+    return formatted_history
+
+def _agent_config(session_id: str, user_id: Optional[str]) -> dict:
+    """Runnable config carrying the Langfuse callback and session metadata."""
+    langfuse_handler = get_langfuse_handler()
+    return {
+        "callbacks": [langfuse_handler] if langfuse_handler else [],
+        "metadata": {
+            "session_id": session_id,
+            "user_id": user_id,
+            "question_type": "agentic_rag"
+        }
+    }
+
+def _log_answer(agent_executor: AgentExecutor, question: str, answer: str,
+                session_id: str, user_id: Optional[str],
+                route: Optional[RouteDecision] = None,
+                usage: Optional[RequestUsage] = None):
+    """Log the final generation to Langfuse."""
+    log_generation(
+        name="agentic_rag_response",
+        input_text=question,
+        output_text=answer,
+        model=LLM_MODEL,
+        metadata={
+            "session_id": session_id,
+            "user_id": user_id,
+            "tools_used": [tool.name for tool in agent_executor.tools],
+            "route": route.as_dict() if route else None
+        },
+        usage=usage.as_dict() if usage else None
+    )
+    logger.info(f"✅ Question answered successfully for session: {session_id}")
+
+def _log_error(question: str, exc: Exception, session_id: str, user_id: Optional[str]) -> str:
+    """Log a failed question to Langfuse and return the error answer."""
+    error_msg = f"Error: {exc}"
+    logger.error(f"❌ Error while asking question: {exc}")
+
+    log_generation(
+        name="agentic_rag_error",
+        input_text=question,
+        output_text=error_msg,
+        model=LLM_MODEL,
+        metadata={
+            "session_id": session_id,
+            "user_id": user_id,
+            "error": str(exc)
+        }
+    )
+    return error_msg
+
+def _routable(chat_history: List | None) -> bool:
+    """Follow-up questions need the conversation, so only fresh ones skip the agent."""
+    return ROUTER_ENABLED and not chat_history
+
+def _find_tool(agent_executor: AgentExecutor, name: Optional[str]):
+    return next((tool for tool in agent_executor.tools if tool.name == name), None)
+
+def _over_budget(question: str, session_id: str, user_id: Optional[str]) -> str:
+    """Error answer for a session whose token budget is spent - never cached"""
+    return _log_error(question, RuntimeError("session token budget exhausted"), session_id, user_id)
+
+def _downgrade(agent_executor: AgentExecutor, tool, route: Optional[RouteDecision],
+               usage: Optional[RequestUsage]):
+    """Near the budget: answer from the report directly, without the agent's planning calls"""
+    if tool is not None:
+        return tool, route
+    if usage is not None:
+        usage.budget_action = "downgraded"
+    # Not a routing decision, so it stays out of the router's stats
+    return _find_tool(agent_executor, REPORT_TOOL), None
+
+@timed("ask_question")
 def ask_question(
     agent_executor: AgentExecutor,
     question: str,
@@ -98,75 +201,254 @@ def ask_question(
     # Create Langfuse trace for this conversation
     trace = create_trace(session_id, user_id)
 
-    raw_history = chat_history or []
-    formatted_history: List = []
+    with track_usage(session_id) as usage:
+        budget = check_budget(session_id)
+        if budget == "reject":
+            usage.budget_action = "rejected"
+            return _over_budget(question, session_id, user_id)
 
-    for turn in raw_history:
-        if isinstance(turn, dict):
-            q = turn.get("question")
-            a = turn.get("answer")
-            if q:
-                formatted_history.append(HumanMessage(content=q))
-            if a:
-                formatted_history.append(AIMessage(content=a))
-        else:
-            formatted_history.append(turn)
+        try:
+            logger.info(f"🤖 Processing question with session_id: {session_id}")
+            started = time.perf_counter()
 
-    try:
-        # Get Langfuse callback handler
-        langfuse_handler = get_langfuse_handler()
-        callbacks = [langfuse_handler] if langfuse_handler else []
-
-        logger.info(f"🤖 Processing question with session_id: {session_id}")
-        
-        response = agent_executor.invoke(
-            {
-                "input": question,
-                "chat_history": formatted_history,
-            },
-            config={
-                "callbacks": callbacks,
-                "metadata": {
-                    "session_id": session_id,
-                    "user_id": user_id,
-                    "question_type": "agentic_rag"
+            # Confident questions go straight to their tool, skipping the agent's LLM hop
+            route = get_router().route(question) if _routable(chat_history) else None
+            tool = _find_tool(agent_executor, route.tool) if route and route.direct else None
+            if budget == "downgrade":
+                tool, route = _downgrade(agent_executor, tool, route, usage)
+            if tool is not None:
+                answer = str(tool.invoke({"query": question}, config=_agent_config(session_id, user_id)))
+            else:
+                response = agent_executor.invoke(
+                    {
+                        "input": question,
+                        "chat_history": format_chat_history(chat_history),
+                    },
+                    config=_agent_config(session_id, user_id)
+                )
+                answer = response["output"]
+
+            if route is not None:
+                route.direct = tool is not None
+                get_router().record(route, (time.perf_counter() - started) * 1000)
+            _log_answer(agent_executor, question, answer, session_id, user_id, route, usage)
+            return answer
+
+        except Exception as exc:
+            return _log_error(question, exc, session_id, user_id)
+
+@timed("ask_question")
+async def aask_question(
+    agent_executor: AgentExecutor,
+    question: str,
+    chat_history: List | None = None,
+    session_id: Optional[str] = None,
+    user_id: Optional[str] = None,
+) -> str:
+    """Async version of ask_question - the agent and its tools run under ainvoke."""
+
+    if not session_id:
+        session_id = str(uuid.uuid4())
+
+    trace = create_trace(session_id, user_id)
+
+    with track_usage(session_id) as usage:
+        budget = check_budget(session_id)
+        if budget == "reject":
+            usage.budget_action = "rejected"
+            return _over_budget(question, session_id, user_id)
+
+        try:
+            logger.info(f"🤖 Processing question (async) with session_id: {session_id}")
+            started = time.perf_counter()
+
+            route = await get_router().aroute(question) if _routable(chat_history) else None
+            tool = _find_tool(agent_executor, route.tool) if route and route.direct else None
+            if budget == "downgrade":
+                tool, route = _downgrade(agent_executor, tool, route, usage)
+            if tool is not None:
+                answer = str(await tool.ainvoke({"query": question}, config=_agent_config(session_id, user_id)))
+            else:
+                response = await agent_executor.ainvoke(
+                    {
+                        "input": question,
+                        "chat_history": format_chat_history(chat_history),
+                    },
+                    config=_agent_config(session_id, user_id)
+                )
+                answer = response["output"]
+
+            if route is not None:
+                route.direct = tool is not None
+                get_router().record(route, (time.perf_counter() - started) * 1000)
+            _log_answer(agent_executor, question, answer, session_id, user_id, route, usage)
+            return answer
+
+        except Exception as exc:
+            return _log_error(question, exc, session_id, user_id)
+
+
+async def astream_question(
+    agent_executor: AgentExecutor,
+    question: str,
+    chat_history: List | None = None,
+    session_id: Optional[str] = None,
+    user_id: Optional[str] = None,
+) -> AsyncIterator[dict]:
+    """Stream agent progress and answer tokens as {"event": ..., ...} dicts.
+
+    Emits tool_start, retrieval_done, sources and tool_end while the tools run,
+    token for each chunk of the final answer and done (or error) at the end.
+    The Langfuse generation is logged once the stream completes, and done
+    carries the request's usage. A caller that drives the events on separate
+    tasks must open track_usage around the whole stream first.
+    """
+
+    if not session_id:
+        session_id = str(uuid.uuid4())
+
+    trace = create_trace(session_id, user_id)
+    answer_parts: List[str] = []
+    answer = None
+    tools_running = 0
+
+    with track_usage(session_id) as usage:
+        try:
+            logger.info(f"🤖 Streaming question with session_id: {session_id}")
+            started = time.perf_counter()
+
+            budget = check_budget(session_id)
+            if budget == "reject":
+                usage.budget_action = "rejected"
+                yield {"event": "error", "message": _over_budget(question, session_id, user_id)}
+                return
+
+            # A directly routed question streams the tool itself - its tokens are the answer
+            route = await get_router().aroute(question) if _routable(chat_history) else None
+            tool = _find_tool(agent_executor, route.tool) if route and route.direct else None
+            if budget == "downgrade":
+                tool, route = _downgrade(agent_executor, tool, route, usage)
+            if tool is not None:
+                runnable, inputs = tool, {"query": question}
+                if route is not None:
+                    yield {"event": "route", **route.as_dict()}
+            else:
+                runnable, inputs = agent_executor, {
+                    "input": question,
+                    "chat_history": format_chat_history(chat_history),
                 }
-            }
-        )
-        
-        answer = response["output"]
-        
-        # Log the final generation to Langfuse
-        log_generation(
-            name="agentic_rag_response",
-            input_text=question,
-            output_text=answer,
-            model=LLM_MODEL,
-            metadata={
-                "session_id": session_id,
-                "user_id": user_id,
-                "tools_used": [tool.name for tool in agent_executor.tools]
-            }
-        )
-        
-        logger.info(f"✅ Question answered successfully for session: {session_id}")
-        return answer
-        
+
+            async for event in runnable.astream_events(
+                inputs,
+                config=_agent_config(session_id, user_id),
+                version="v2",
+            ):
+                kind = event["event"]
+                top_level = not event.get("parent_ids")
+                if kind == "on_tool_start":
+                    tools_running += 1
+                    yield {"event": "tool_start", "tool": event["name"],
+                           "input": event["data"].get("input")}
+                elif kind == "on_tool_end":
+                    tools_running -= 1
+                    if top_level:
+                        answer = str(event["data"]["output"])
+                    yield {"event": "tool_end", "tool": event["name"]}
+                elif kind == "on_retriever_end":
+                    documents = event["data"].get("output") or []
+                    yield {"event": "retrieval_done", "documents": len(documents)}
+                    yield {"event": "sources", "sources": [
+                        {"source": doc.metadata.get("file_name") or doc.metadata.get("source"),
+                         "page": doc.metadata.get("page")}
+                        for doc in documents
+                    ]}
+                elif kind == "on_chat_model_stream" and (tool is not None or not tools_running):
+                    # Tokens generated inside an agent tool call (e.g. RetrievalQA) are not the answer
+                    text = event["data"]["chunk"].content
+                    if text:
+                        answer_parts.append(text)
+                        yield {"event": "token", "text": text}
+                elif kind == "on_chain_end" and top_level:
+                    answer = event["data"]["output"]["output"]
+
+            answer = answer if answer is not None else "".join(answer_parts)
+            if route is not None:
+                route.direct = tool is not None
+                get_router().record(route, (time.perf_counter() - started) * 1000)
+            _log_answer(agent_executor, question, answer, session_id, user_id, route, usage)
+            yield {"event": "done", "answer": answer, "session_id": session_id,
+                   "usage": usage.as_dict()}
+
+        except Exception as exc:
+            yield {"event": "error", "message": _log_error(question, exc, session_id, user_id)}
+
+
+def _failed_batch(questions: List[str], error_msg: str, status: str) -> Dict[str, Any]:
+    """Batch result for a batch that did not run - status is "rejected" or "error"."""
+    return {
+        "status": status,
+        "error": error_msg,
+        "results": [{"index": i, "question": question, "answer": error_msg}
+                    for i, question in enumerate(questions)],
+        "timing_ms": {},
+    }
+
+
+@timed("ask_questions_batch")
+def ask_questions_batch(
+    questions: List[str],
+    source: Optional[str] = None,
+    max_concurrency: int = BATCH_MAX_CONCURRENCY,
+    session_id: Optional[str] = None,
+    user_id: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Answer many report questions at once, in order, with per-item timing.
+
+    All questions are embedded in one request and searched in one Chroma
+    query; the answer generations then run up to max_concurrency at a time.
+    The batch goes straight to retrieval, without a per-question tool choice.
+    status is "success", or "rejected" / "error" (with the error) when the
+    batch did not run.
+    """
+
+    if not session_id:
+        session_id = str(uuid.uuid4())
+
+    trace = create_trace(session_id, user_id)
+
+    # A batch has no agent hop to drop, so only a reject decision stops it
+    if check_budget(session_id) == "reject":
+        return _failed_batch(questions, _over_budget(f"batch of {len(questions)} questions", session_id, user_id),
+                             "rejected")
+
+    try:
+        engine = get_engine(CHROMA_DB_DIR)
+        if engine is None:
+            raise RuntimeError("Vector store not found. Please ensure the system is properly initialized.")
+
+        logger.info(f"🤖 Processing batch of {len(questions)} questions with session_id: {session_id}")
+        with track_usage(session_id) as usage:
+            batch = engine.batch_query(questions, source=source, max_concurrency=max_concurrency)
+        batch["usage"] = usage.as_dict()
+        batch["status"] = "success"
     except Exception as exc:
-        error_msg = f"Error: {exc}"
-        logger.error(f"❌ Error while asking question: {exc}")
-        
-        # Log the error generation
+        return _failed_batch(questions, _log_error(f"batch of {len(questions)} questions", exc, session_id, user_id),
+                             "error")
+
+    for item in batch["results"]:
         log_generation(
-            name="agentic_rag_error",
-            input_text=question,
-            output_text=error_msg,
+            name="agentic_rag_batch_response",
+            input_text=item["question"],
+            output_text=item["answer"],
             model=LLM_MODEL,
             metadata={
                 "session_id": session_id,
                 "user_id": user_id,
-                "error": str(exc)
+                "batch_index": item["index"],
+                "batch_size": len(questions),
+                "timing_ms": item["timing_ms"]
             }
         )
-        
-        return error_msg
\ No newline at end of file
+
+    logger.info(f"✅ Batch of {len(questions)} questions answered for session: {session_id}")
+    return batch
@@ -0,0 +1,193 @@
+"""
+Sentence-level context compression.
+
+Retrieved chunks are split into sentences, each sentence is scored by cosine
+similarity to the question, and only a token budget's worth of the best
+sentences (kept in document order) reaches the "stuff" prompt. Sentence
+vectors are embedded once at ingestion and persisted next to Chroma, so a
+question costs one query embedding plus a dictionary lookup.
+"""
+import asyncio
+import os
+import re
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.callbacks import Callbacks
+from langchain_core.documents import BaseDocumentCompressor, Document
+from langchain_core.embeddings import Embeddings
+from pydantic import ConfigDict
+
+from config.settings import (
+    CHROMA_DB_DIR, EMBEDDING_MODEL, EMBEDDING_BATCH_SIZE, CONTEXT_TOKEN_BUDGET
+)
+from src.utils import setup_logging, count_tokens
+from src.embedding_cache import make_cache_key
+
+logger = setup_logging()
+
+SENTENCE_INDEX_FILE = "sentence_index.npz"
+
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+(?=[\"“(]?[A-Z0-9])")
+# Exhibit labels and tables have no punctuation - cut them into word windows
+MAX_SENTENCE_WORDS = 60
+
+
+def split_sentences(text: str) -> List[str]:
+    """Split chunk text into sentences, re-joining PDF line breaks first"""
+    sentences = []
+    for sentence in SENTENCE_BOUNDARY.split(" ".join(text.split())):
+        words = sentence.split()
+        for start in range(0, len(words), MAX_SENTENCE_WORDS):
+            sentences.append(" ".join(words[start:start + MAX_SENTENCE_WORDS]))
+    return [sentence for sentence in sentences if sentence]
+
+
+def sentence_key(sentence: str) -> str:
+    return make_cache_key(EMBEDDING_MODEL, sentence)
+
+
+class SentenceIndex:
+    """Sentence vectors keyed by model + text hash"""
+
+    def __init__(self, vectors: Optional[Dict[str, np.ndarray]] = None):
+        self.vectors = vectors or {}
+        # Concurrent questions add the sentences they embed at query time
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.vectors)
+
+    def _missing(self, sentences: List[str]) -> Tuple[List[str], Dict[str, str]]:
+        keys = [sentence_key(sentence) for sentence in sentences]
+        with self._lock:
+            return keys, {key: sentence for key, sentence in zip(keys, sentences) if key not in self.vectors}
+
+    def _stack(self, keys: List[str], added: Dict[str, List[float]]) -> np.ndarray:
+        with self._lock:
+            self.vectors.update({key: np.asarray(vector, dtype=np.float32) for key, vector in added.items()})
+            return np.stack([self.vectors[key] for key in keys])
+
+    def lookup(self, sentences: List[str], embeddings: Optional[Embeddings] = None) -> np.ndarray:
+        """Vectors for the sentences - any not indexed yet are embedded now"""
+        keys, missing = self._missing(sentences)
+        added = {}
+        if missing and embeddings is not None:
+            added = dict(zip(missing, embeddings.embed_documents(list(missing.values()))))
+        return self._stack(keys, added)
+
+    async def alookup(self, sentences: List[str], embeddings: Optional[Embeddings] = None) -> np.ndarray:
+        """Async version of lookup - awaits the embedding call instead of blocking the event loop"""
+        keys, missing = self._missing(sentences)
+        added = {}
+        if missing and embeddings is not None:
+            added = dict(zip(missing, await embeddings.aembed_documents(list(missing.values()))))
+        return self._stack(keys, added)
+
+    def save(self, persist_directory: str = CHROMA_DB_DIR):
+        """Atomically write the index next to the Chroma files"""
+        path = os.path.join(persist_directory, SENTENCE_INDEX_FILE)
+        tmp_path = f"{path}.tmp.npz"
+        with self._lock:
+            vectors = dict(self.vectors)
+        keys = list(vectors)
+        np.savez(tmp_path, keys=np.array(keys),
+                 vectors=np.stack([vectors[key] for key in keys]) if keys else np.zeros((0, 0)))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, persist_directory: str = CHROMA_DB_DIR) -> Optional["SentenceIndex"]:
+        """Load the persisted index, if any"""
+        path = os.path.join(persist_directory, SENTENCE_INDEX_FILE)
+        try:
+            with np.load(path) as data:
+                return cls(dict(zip(data["keys"].tolist(), data["vectors"].astype(np.float32))))
+        except (OSError, ValueError, KeyError):
+            return None
+
+
+def build_sentence_index(vector_store, persist_directory: str = CHROMA_DB_DIR,
+                         embeddings: Optional[Embeddings] = None,
+                         batch_size: int = EMBEDDING_BATCH_SIZE) -> SentenceIndex:
+    """Embed every stored sentence not indexed yet and drop sentences that disappeared"""
+    from src.vector_store import load_chunks_from_store
+
+    started = time.perf_counter()
+    embeddings = embeddings or vector_store.embeddings
+    sentences = {sentence_key(sentence): sentence
+                 for chunk in load_chunks_from_store(vector_store)
+                 for sentence in split_sentences(chunk.page_content)}
+
+    existing = SentenceIndex.load(persist_directory) or SentenceIndex()
+    vectors = {key: vector for key, vector in existing.vectors.items() if key in sentences}
+    missing = [key for key in sentences if key not in vectors]
+    for start in range(0, len(missing), batch_size):
+        batch = missing[start:start + batch_size]
+        for key, vector in zip(batch, embeddings.embed_documents([sentences[key] for key in batch])):
+            vectors[key] = np.asarray(vector, dtype=np.float32)
+
+    index = SentenceIndex(vectors)
+    if missing or len(vectors) != len(existing):
+        try:
+            index.save(persist_directory)
+        except OSError as e:
+            logger.warning(f"Could not persist sentence index: {e}")
+    logger.info(f"Sentence index: {len(index)} sentences, {len(missing)} newly embedded "
+                f"in {time.perf_counter() - started:.2f}s")
+    return index
+
+
+class SentenceCompressor(BaseDocumentCompressor):
+    """Keep the sentences most similar to the question, up to a token budget"""
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    embeddings: Embeddings
+    sentence_index: SentenceIndex
+    token_budget: int = CONTEXT_TOKEN_BUDGET
+
+    @staticmethod
+    def _split(documents: Sequence[Document]) -> List[Tuple[int, str]]:
+        return [(i, sentence) for i, doc in enumerate(documents) for sentence in split_sentences(doc.page_content)]
+
+    def _compress(self, documents: Sequence[Document], parts: List[Tuple[int, str]],
+                  matrix: np.ndarray, query_vector) -> List[Document]:
+        query = np.asarray(query_vector, dtype=np.float32)
+        scores = matrix @ query / (np.linalg.norm(matrix, axis=1) * np.linalg.norm(query) + 1e-9)
+
+        # Best sentences first until the budget is spent - the top one is always kept
+        kept, used = set(), 0
+        for position in np.argsort(-scores):
+            tokens = count_tokens(parts[position][1])
+            if kept and used + tokens > self.token_budget:
+                continue
+            kept.add(int(position))
+            used += tokens
+
+        compressed = []
+        for i, doc in enumerate(documents):
+            sentences = [sentence for position, (j, sentence) in enumerate(parts) if j == i and position in kept]
+            if sentences:
+                compressed.append(Document(page_content=" ".join(sentences), metadata=dict(doc.metadata)))
+        return compressed
+
+    def compress_documents(self, documents: Sequence[Document], query: str,
+                           callbacks: Optional[Callbacks] = None) -> Sequence[Document]:
+        parts = self._split(documents)
+        if not parts:
+            return list(documents)
+        matrix = self.sentence_index.lookup([sentence for _, sentence in parts], self.embeddings)
+        return self._compress(documents, parts, matrix, self.embeddings.embed_query(query))
+
+    async def acompress_documents(self, documents: Sequence[Document], query: str,
+                                  callbacks: Optional[Callbacks] = None) -> Sequence[Document]:
+        parts = self._split(documents)
+        if not parts:
+            return list(documents)
+        matrix, query_vector = await asyncio.gather(
+            self.sentence_index.alookup([sentence for _, sentence in parts], self.embeddings),
+            self.embeddings.aembed_query(query))
+        return self._compress(documents, parts, matrix, query_vector)
+
@@ -1,13 +1,30 @@
-from typing import List, Tuple
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from collections import deque
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+import hashlib
+import os
 from langchain_community.document_loaders import PyPDFLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
-from config.settings import CHUNK_SIZE, CHUNK_OVERLAP
+from config.settings import CHUNK_SIZE, CHUNK_OVERLAP, DATA_DIR, PDF_PARSE_WORKERS, PDF_PAGES_PER_TASK
 from src.utils import setup_logging
-from src.vector_store import load_existing_vector_store, create_vector_query_engine
+from src.engine_registry import get_engine
+from src.metrics import timed
 from config.settings import CHROMA_DB_DIR
 logger = setup_logging()
 
+@lru_cache(maxsize=8)
+def get_text_splitter(chunk_size: int = CHUNK_SIZE,
+                      chunk_overlap: int = CHUNK_OVERLAP) -> RecursiveCharacterTextSplitter:
+    """Shared splitter per configuration - splitters are stateless"""
+    return RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        length_function=len,
+    )
+
 def load_and_process_documents(pdf_path: str) -> Tuple[List[Document], List[Document]]:
     """Load and process PDF documents - equivalent to LlamaIndex SimpleDirectoryReader"""
     logger.info(f"Loading document from {pdf_path}...")
@@ -18,16 +35,103 @@ def load_and_process_documents(pdf_path: str) -> Tuple[List[Document], List[Docu
     logger.info(f"Loaded {len(documents)} document(s).")
     
     # Split into chunks - equivalent to LlamaIndex SentenceSplitter
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=CHUNK_SIZE,
-        chunk_overlap=CHUNK_OVERLAP,
-        length_function=len,
-    )
-    chunks = splitter.split_documents(documents)
+    chunks = get_text_splitter().split_documents(documents)
     logger.info(f"Created {len(chunks)} chunks.")
     
     return documents, chunks
 
+def file_checksum(path: str) -> str:
+    """SHA-256 of a file, read in blocks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def find_corpus_files(data_dir: str = DATA_DIR) -> List[str]:
+    """All PDFs under the data directory, in a stable order"""
+    paths = []
+    for root, _, files in os.walk(data_dir):
+        for name in files:
+            if name.lower().endswith(".pdf"):
+                paths.append(os.path.join(root, name))
+    return sorted(paths)
+
+def _parse_pdf_pages(path: str, start: int, end: int) -> List[Tuple[int, str, str]]:
+    """Extract (page, label, text) for a page range - runs in a worker process"""
+    import pypdf
+
+    reader = pypdf.PdfReader(path)
+    pages = []
+    for page_number in range(start, min(end, len(reader.pages))):
+        text = reader.pages[page_number].extract_text().strip()
+        pages.append((page_number, reader.page_labels[page_number], text))
+    return pages
+
+def _count_pdf_pages(path: str) -> int:
+    import pypdf
+
+    return len(pypdf.PdfReader(path).pages)
+
+def iter_corpus_pages(data_dir: str = DATA_DIR,
+                      max_workers: int = PDF_PARSE_WORKERS,
+                      pages_per_task: int = PDF_PAGES_PER_TASK,
+                      paths: Optional[List[str]] = None) -> Iterator[Document]:
+    """Yield one Document per PDF page across the corpus.
+
+    Files are split into page ranges parsed in a process pool, so large
+    reports are parsed in parallel too. Pages are yielded in corpus order as
+    soon as their range is parsed, tagged with source file, page and checksum.
+    """
+    paths = paths if paths is not None else find_corpus_files(data_dir)
+    if not paths:
+        logger.warning(f"No PDF files found in {data_dir}")
+        return
+
+    tasks = []
+    for path in paths:
+        base_metadata: Dict[str, Any] = {
+            "source": path,
+            "file_name": os.path.basename(path),
+            "checksum": file_checksum(path),
+        }
+        total_pages = _count_pdf_pages(path)
+        base_metadata["total_pages"] = total_pages
+        for start in range(0, total_pages, pages_per_task):
+            tasks.append((path, start, start + pages_per_task, base_metadata))
+    logger.info(f"Parsing {len(paths)} PDF file(s) in {len(tasks)} page range(s)")
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        # Keep a bounded window of ranges in flight and yield them in order
+        pending = deque()
+        task_iter = iter(tasks)
+        for path, start, end, base_metadata in islice(task_iter, max_workers * 2):
+            pending.append((pool.submit(_parse_pdf_pages, path, start, end), base_metadata))
+        while pending:
+            future, base_metadata = pending.popleft()
+            for path, start, end, next_metadata in islice(task_iter, 1):
+                pending.append((pool.submit(_parse_pdf_pages, path, start, end), next_metadata))
+            for page_number, page_label, text in future.result():
+                metadata = dict(base_metadata)
+                metadata.update({"page": page_number, "page_label": page_label})
+                yield Document(page_content=text, metadata=metadata)
+
+def iter_chunks(pages: Iterable[Document],
+                chunk_size: int = CHUNK_SIZE,
+                chunk_overlap: int = CHUNK_OVERLAP) -> Iterator[Document]:
+    """Split a stream of pages into chunks without materializing the corpus"""
+    splitter = get_text_splitter(chunk_size, chunk_overlap)
+    for page in pages:
+        yield from splitter.split_documents([page])
+
+def load_corpus(data_dir: str = DATA_DIR,
+                chunk_size: int = CHUNK_SIZE,
+                chunk_overlap: int = CHUNK_OVERLAP) -> List[Document]:
+    """Parse every PDF under the data directory and return its chunks"""
+    chunks = list(iter_chunks(iter_corpus_pages(data_dir), chunk_size, chunk_overlap))
+    logger.info(f"Created {len(chunks)} chunks from corpus in {data_dir}")
+    return chunks
+
 def split_documents(documents: List[Document], 
                    chunk_size: int = CHUNK_SIZE, 
                    chunk_overlap: int = CHUNK_OVERLAP) -> List[Document]:
@@ -36,27 +140,49 @@ def split_documents(documents: List[Document],
         logger.warning("No documents provided for splitting")
         return []
     
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=chunk_size,
-        chunk_overlap=chunk_overlap,
-        length_function=len,
-    )
-    
-    chunks = text_splitter.split_documents(documents)
+    chunks = get_text_splitter(chunk_size, chunk_overlap).split_documents(documents)
     logger.info(f"Split documents into {len(chunks)} chunks")
     return chunks
 
 
-def answer_question(query: str) -> str:
-    """Run semantic search on the vector store."""
+@timed("answer_question")
+def answer_question(query: str, source: Optional[str] = None) -> str:
+    """Run semantic search on the vector store, optionally within one source file."""
     try:
-        vector_store = load_existing_vector_store(CHROMA_DB_DIR)
-        if vector_store is None:
+        # Shared engine - built once per process, not once per question
+        engine = get_engine(CHROMA_DB_DIR)
+        if engine is None:
             return "Error: Vector store not found. Please ensure the system is properly initialized."
         
-        query_engine = create_vector_query_engine(vector_store)  # This returns a callable function
-        response = query_engine(query)  # Call the function directly, not through .query()
+        response = engine.query(query, source=source)
         return str(response)
     except Exception as e:
         logger.error(f"Error in answer_question: {e}")
+        return f"Error answering question: {e}"
+
+@timed("answer_question")
+async def aanswer_question(query: str, source: Optional[str] = None) -> str:
+    """Async version of answer_question - awaits retrieval and generation."""
+    try:
+        engine = get_engine(CHROMA_DB_DIR)
+        if engine is None:
+            return "Error: Vector store not found. Please ensure the system is properly initialized."
+        
+        response = await engine.aquery(query, source=source)
+        return str(response)
+    except Exception as e:
+        logger.error(f"Error in aanswer_question: {e}")
+        return f"Error answering question: {e}"
+
+@timed("summarize_question")
+def summarize_question(query: str, source: Optional[str] = None) -> str:
+    """Answer an overview question from the precomputed summary index."""
+    try:
+        engine = get_engine(CHROMA_DB_DIR)
+        if engine is None:
+            return "Error: Vector store not found. Please ensure the system is properly initialized."
+        
+        return str(engine.summarize(query, source=source))
+    except Exception as e:
+        logger.error(f"Error in summarize_question: {e}")
         return f"Error answering question: {e}"
\ No newline at end of file
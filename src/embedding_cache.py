@@ -0,0 +1,235 @@
+"""
+Persistent, content-addressed embedding cache.
+
+Vectors are stored in SQLite as float32 blobs keyed by model name + a hash of
+the normalized text, so identical chunks across rebuilds and identical
+questions across sessions are embedded once. The store is capped in bytes
+and evicts least-recently-used vectors.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from config.settings import EMBEDDING_CACHE_PATH, EMBEDDING_CACHE_MAX_BYTES
+from src.utils import setup_logging
+
+logger = setup_logging()
+
+# Process-wide counters, aggregated over every CachedEmbeddings instance
+_global_stats = {"hits": 0, "misses": 0, "bytes_saved": 0}
+_global_lock = threading.Lock()
+
+
+def normalize_text(text: str) -> str:
+    """Normalize text so trivially different inputs share a cache entry"""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def make_cache_key(model: str, text: str) -> str:
+    """Cache key: model name + hash of the normalized text"""
+    digest = hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+    return f"{model}:{digest}"
+
+
+class EmbeddingStore:
+    """SQLite-backed vector store with LRU eviction and a size cap"""
+
+    def __init__(self, path: str = EMBEDDING_CACHE_PATH, max_bytes: int = EMBEDDING_CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, vector BLOB NOT NULL, nbytes INTEGER NOT NULL, "
+            "last_access REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS embeddings_last_access ON embeddings (last_access)"
+        )
+        self._conn.commit()
+        self._size = self._conn.execute(
+            "SELECT COALESCE(SUM(nbytes), 0) FROM embeddings"
+        ).fetchone()[0]
+
+    def get_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        """Fetch cached vectors, refreshing their LRU position"""
+        if not keys:
+            return {}
+        found: Dict[str, List[float]] = {}
+        with self._lock:
+            # SQLite caps bound parameters, so look keys up in slices
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_access = ? WHERE key = ?",
+                    [(now, key) for key in found],
+                )
+                self._conn.commit()
+        return found
+
+    def put_many(self, items: Dict[str, List[float]]):
+        """Store vectors and evict the least recently used ones past the cap"""
+        if not items:
+            return
+        now = time.time()
+        rows = []
+        for key, vector in items.items():
+            blob = np.asarray(vector, dtype=np.float32).tobytes()
+            rows.append((key, blob, len(blob), now))
+        with self._lock:
+            # Replaced rows give their bytes back, so the running size never needs a full scan
+            replaced = 0
+            keys = list(items)
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                replaced += self._conn.execute(
+                    f"SELECT COALESCE(SUM(nbytes), 0) FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchone()[0]
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, nbytes, last_access) "
+                "VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            self._size += sum(nbytes for _, _, nbytes, _ in rows) - replaced
+            if self._size > self.max_bytes:
+                self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """Drop least recently used vectors until the store is 90% of the cap"""
+        target = int(self.max_bytes * 0.9)
+        evicted = 0
+        for key, nbytes in self._conn.execute(
+            "SELECT key, nbytes FROM embeddings ORDER BY last_access ASC"
+        ).fetchall():
+            if self._size <= target:
+                break
+            self._conn.execute("DELETE FROM embeddings WHERE key = ?", (key,))
+            self._size -= nbytes
+            evicted += 1
+        logger.info(f"Evicted {evicted} embeddings from cache ({self._size} bytes kept)")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    @property
+    def size_bytes(self) -> int:
+        return self._size
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that serves repeated texts from an EmbeddingStore"""
+
+    def __init__(self, underlying: Embeddings, store: EmbeddingStore, model: str):
+        self.underlying = underlying
+        self.store = store
+        self.model = model
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "bytes_saved": 0}
+
+    def _record(self, hits: int, misses: int, bytes_saved: int):
+        for lock, stats in ((self._lock, self.stats), (_global_lock, _global_stats)):
+            with lock:
+                stats["hits"] += hits
+                stats["misses"] += misses
+                stats["bytes_saved"] += bytes_saved
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [make_cache_key(self.model, text) for text in texts]
+        cached = self.store.get_many(list(dict.fromkeys(keys)))
+
+        # Embed each missing text once even if it repeats within the batch
+        missing: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in cached and key not in missing:
+                missing[key] = text
+        if missing:
+            vectors = self.underlying.embed_documents(list(missing.values()))
+            fresh = dict(zip(missing.keys(), vectors))
+            self.store.put_many(fresh)
+            cached.update(fresh)
+
+        hits = len(texts) - len(missing)
+        bytes_saved = sum(len(cached[key]) * 4 for key in keys if key not in missing)
+        self._record(hits, len(missing), bytes_saved)
+        return [cached[key] for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        key = make_cache_key(self.model, text)
+        cached = self.store.get_many([key])
+        if key in cached:
+            self._record(1, 0, len(cached[key]) * 4)
+            return cached[key]
+        vector = self.underlying.embed_query(text)
+        self.store.put_many({key: vector})
+        self._record(0, 1, 0)
+        return vector
+
+    async def aembed_query(self, text: str) -> List[float]:
+        # Local SQLite lookups stay synchronous; only the API call is awaited
+        key = make_cache_key(self.model, text)
+        cached = self.store.get_many([key])
+        if key in cached:
+            self._record(1, 0, len(cached[key]) * 4)
+            return cached[key]
+        vector = await self.underlying.aembed_query(text)
+        self.store.put_many({key: vector})
+        self._record(0, 1, 0)
+        return vector
+
+    def get_stats(self) -> dict:
+        """Return hit rate, bytes saved and store size"""
+        with self._lock:
+            stats = dict(self.stats)
+        total = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / total, 4) if total else 0.0
+        stats["store_bytes"] = self.store.size_bytes
+        return stats
+
+
+# One store per path, shared by ingestion and query paths
+_stores: Dict[str, EmbeddingStore] = {}
+_stores_lock = threading.Lock()
+
+def get_embedding_store(path: str = EMBEDDING_CACHE_PATH) -> EmbeddingStore:
+    """Get the shared embedding store for a path"""
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = EmbeddingStore(path)
+        return _stores[path]
+
+def wrap_embeddings(underlying: Embeddings, model: str,
+                    store: Optional[EmbeddingStore] = None) -> CachedEmbeddings:
+    """Wrap an embeddings instance with the shared persistent cache"""
+    return CachedEmbeddings(underlying, store or get_embedding_store(), model)
+
+def get_embedding_cache_stats() -> dict:
+    """Process-wide cache stats over every CachedEmbeddings instance"""
+    with _global_lock:
+        stats = dict(_global_stats)
+    total = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = round(stats["hits"] / total, 4) if total else 0.0
+    with _stores_lock:
+        stats["store_bytes"] = sum(store.size_bytes for store in _stores.values())
+    return stats
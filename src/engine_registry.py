@@ -0,0 +1,237 @@
+"""
+Process-wide registry of retrieval engines.
+
+Opening Chroma and building the embeddings client, the LLM and the RetrievalQA
+chain is far more expensive than answering a question, so engines are built
+once per (persist directory, embedding model, LLM model) and shared by
+mckinsey_report_tool and the Flask API.
+"""
+import os
+import threading
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from langchain_chroma import Chroma
+
+from config.settings import (
+    CHROMA_DB_DIR, EMBEDDING_MODEL, LLM_MODEL, SEMANTIC_CACHE_ENABLED, HYBRID_SEARCH_ENABLED,
+    CONTEXT_COMPRESSION_ENABLED
+)
+from src.utils import setup_logging
+from src.vector_store import (
+    load_existing_vector_store, create_vector_query_engine, create_async_vector_query_engine,
+    create_batch_query_engine, create_summary_query_engine
+)
+from src.ingestion import read_manifest
+from src.keyword_index import KeywordIndex, load_keyword_index
+from src.context_compression import SentenceIndex, build_sentence_index
+
+logger = setup_logging()
+
+EngineKey = Tuple[str, str, str]
+
+
+def make_engine_key(persist_directory: str = CHROMA_DB_DIR) -> EngineKey:
+    """Build the registry key for a persist directory and the configured models"""
+    return (os.path.abspath(persist_directory), EMBEDDING_MODEL, LLM_MODEL)
+
+
+def build_query_engine(vector_store: Chroma, corpus_version: str,
+                       keyword_index: Optional[KeywordIndex] = None,
+                       sentence_index: Optional[SentenceIndex] = None) -> Callable[..., str]:
+    """Vector query engine, behind the semantic cache when enabled"""
+    query_engine = create_vector_query_engine(vector_store, keyword_index, sentence_index)
+    if SEMANTIC_CACHE_ENABLED:
+        from src.semantic_cache import get_semantic_cache, with_semantic_cache
+        query_engine = with_semantic_cache(query_engine, get_semantic_cache(), corpus_version)
+    return query_engine
+
+
+def build_summary_engine(vector_store: Chroma, persist_directory: str,
+                         keyword_index: Optional[KeywordIndex] = None) -> Callable[..., str]:
+    """Summary engine over the precomputed index, or map-reduce when there is none"""
+    from src.summary_index import SummaryIndex, create_summary_index_query_engine
+    index = SummaryIndex.load(persist_directory)
+    if index is not None:
+        return create_summary_index_query_engine(index)
+
+    logger.warning("No summary index found - summarizing chunks per question")
+    keyword_index = keyword_index or load_keyword_index(vector_store, persist_directory)
+    summary_query = create_summary_query_engine(keyword_index.documents, keyword_index)
+    return lambda query, source=None: summary_query(query)
+
+
+def build_async_query_engine(vector_store: Chroma, corpus_version: str,
+                             keyword_index: Optional[KeywordIndex] = None,
+                             sentence_index: Optional[SentenceIndex] = None) -> Callable[..., Awaitable[str]]:
+    """Async vector query engine, sharing the semantic cache with the sync one"""
+    query_engine = create_async_vector_query_engine(vector_store, keyword_index, sentence_index)
+    if SEMANTIC_CACHE_ENABLED:
+        from src.semantic_cache import get_semantic_cache, with_async_semantic_cache
+        query_engine = with_async_semantic_cache(query_engine, get_semantic_cache(), corpus_version)
+    return query_engine
+
+
+class RetrievalEngine:
+    """A loaded vector store together with the query engine built on top of it"""
+
+    def __init__(self, key: EngineKey, vector_store: Chroma,
+                 query_engine: Optional[Callable[..., str]] = None,
+                 async_query_engine: Optional[Callable[..., Awaitable[str]]] = None,
+                 persist_directory: Optional[str] = None):
+        self.key = key
+        self.vector_store = vector_store
+        # Side indexes live next to the store actually served, which may be swapped in from elsewhere
+        self.persist_directory = persist_directory or key[0]
+        # Corpus version of the index this engine serves - scopes answer caches
+        manifest = read_manifest(self.persist_directory) or {}
+        self.corpus_version = manifest.get("corpus_version", "unversioned")
+        self.keyword_index = (load_keyword_index(vector_store, self.persist_directory)
+                              if HYBRID_SEARCH_ENABLED else None)
+        self.sentence_index = (build_sentence_index(vector_store, self.persist_directory)
+                               if CONTEXT_COMPRESSION_ENABLED else None)
+        self.query_engine = query_engine or build_query_engine(vector_store, self.corpus_version,
+                                                               self.keyword_index, self.sentence_index)
+        # Built on first async / batch use so other callers never pay for them
+        self.async_query_engine = async_query_engine
+        self.batch_query_engine = None
+        self.summary_engine = None
+
+    def query(self, query: str, source: Optional[str] = None) -> str:
+        """Answer a question using this engine, optionally within one source file"""
+        return self.query_engine(query, source=source)
+
+    async def aquery(self, query: str, source: Optional[str] = None) -> str:
+        """Async version of query for the ASGI serving path"""
+        if self.async_query_engine is None:
+            self.async_query_engine = build_async_query_engine(self.vector_store, self.corpus_version,
+                                                               self.keyword_index, self.sentence_index)
+        return await self.async_query_engine(query, source=source)
+
+    def batch_query(self, queries: List[str], source: Optional[str] = None,
+                    **options) -> Dict[str, Any]:
+        """Answer many questions with shared embedding and search calls"""
+        if self.batch_query_engine is None:
+            self.batch_query_engine = create_batch_query_engine(self.vector_store, self.keyword_index,
+                                                                self.sentence_index)
+        return self.batch_query_engine(queries, source=source, **options)
+
+    def summarize(self, query: str, source: Optional[str] = None) -> str:
+        """Answer an overview / key-insights question from the summary index"""
+        if self.summary_engine is None:
+            self.summary_engine = build_summary_engine(self.vector_store, self.persist_directory,
+                                                       self.keyword_index)
+        return self.summary_engine(query, source=source)
+
+
+class EngineRegistry:
+    """Thread-safe cache of retrieval engines with hot-swap support"""
+
+    def __init__(self):
+        self._engines: Dict[EngineKey, RetrievalEngine] = {}
+        self._lock = threading.Lock()
+        self._build_locks: Dict[EngineKey, threading.Lock] = {}
+        self.stats = {
+            "hits": 0,
+            "constructions": 0,
+            "swaps": 0,
+            "failures": 0,
+        }
+
+    def _build_lock(self, key: EngineKey) -> threading.Lock:
+        with self._lock:
+            if key not in self._build_locks:
+                self._build_locks[key] = threading.Lock()
+            return self._build_locks[key]
+
+    def _lookup(self, key: EngineKey) -> Optional[RetrievalEngine]:
+        with self._lock:
+            engine = self._engines.get(key)
+            if engine is not None:
+                self.stats["hits"] += 1
+            return engine
+
+    def get_engine(self, persist_directory: str = CHROMA_DB_DIR) -> Optional[RetrievalEngine]:
+        """Return the engine for a persist directory, building it on first use"""
+        key = make_engine_key(persist_directory)
+        engine = self._lookup(key)
+        if engine is not None:
+            return engine
+
+        # Only one thread builds a given engine; the others wait and reuse it
+        with self._build_lock(key):
+            engine = self._lookup(key)
+            if engine is not None:
+                return engine
+
+            vector_store = load_existing_vector_store(persist_directory)
+            if vector_store is None:
+                with self._lock:
+                    self.stats["failures"] += 1
+                return None
+
+            engine = RetrievalEngine(key, vector_store)
+            with self._lock:
+                self._engines[key] = engine
+                self.stats["constructions"] += 1
+            logger.info(f"Built retrieval engine for {key[0]}")
+            return engine
+
+    def swap(self, vector_store: Chroma, persist_directory: str = CHROMA_DB_DIR,
+             store_directory: Optional[str] = None) -> RetrievalEngine:
+        """Install an engine for a freshly built vector store, replacing any old one.
+
+        store_directory is where the store and its side indexes live, when it is
+        served under the key of another persist directory.
+        """
+        key = make_engine_key(persist_directory)
+        engine = RetrievalEngine(key, vector_store, persist_directory=store_directory or persist_directory)
+        with self._lock:
+            replaced = key in self._engines
+            self._engines[key] = engine
+            self.stats["constructions"] += 1
+            if replaced:
+                self.stats["swaps"] += 1
+        logger.info(f"{'Swapped' if replaced else 'Registered'} retrieval engine for {key[0]}")
+        return engine
+
+    def invalidate(self, persist_directory: Optional[str] = None):
+        """Drop one engine, or all engines when no directory is given"""
+        with self._lock:
+            if persist_directory is None:
+                self._engines.clear()
+            else:
+                self._engines.pop(make_engine_key(persist_directory), None)
+
+    def get_stats(self) -> dict:
+        """Return cache hit / construction counters"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats["engines"] = len(self._engines)
+        total = stats["hits"] + stats["constructions"]
+        stats["hit_rate"] = round(stats["hits"] / total, 4) if total else 0.0
+        return stats
+
+
+# Global engine registry instance
+engine_registry = EngineRegistry()
+
+def get_engine(persist_directory: str = CHROMA_DB_DIR) -> Optional[RetrievalEngine]:
+    """Get the shared retrieval engine for a persist directory"""
+    return engine_registry.get_engine(persist_directory)
+
+def warm_up_engine(vector_store: Optional[Chroma] = None,
+                   persist_directory: str = CHROMA_DB_DIR,
+                   store_directory: Optional[str] = None) -> bool:
+    """Build the engine ahead of the first question.
+
+    When a freshly built vector store is passed it is hot-swapped in so
+    in-flight and future questions use the new index.
+    """
+    if vector_store is not None:
+        engine_registry.swap(vector_store, persist_directory, store_directory)
+        return True
+    return engine_registry.get_engine(persist_directory) is not None
+
+def get_engine_stats() -> dict:
+    """Get the global engine registry counters"""
+    return engine_registry.get_stats()
@@ -0,0 +1,433 @@
+"""
+Incremental, content-hashed ingestion into the vector store.
+
+Every chunk gets a deterministic id derived from its text, its source and the
+chunking/embedding configuration. Syncing a corpus only embeds ids the store
+does not have yet and deletes ids that disappeared, so an unchanged corpus
+costs zero embedding calls.
+
+New chunks are embedded in batches by a bounded worker pool that retries
+with backoff and stays under a tokens-per-minute budget, and each finished
+batch is upserted into Chroma with its precomputed vectors. The stages are
+generators joined by bounded queues, so memory follows the batch size rather
+than the corpus size.
+"""
+import hashlib
+import json
+import os
+import queue
+import random
+import sys
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_chroma import Chroma
+
+from config.settings import (
+    CHROMA_DB_DIR, DATA_DIR, CHUNK_SIZE, CHUNK_OVERLAP, EMBEDDING_MODEL,
+    EMBEDDING_BATCH_SIZE, EMBEDDING_MAX_WORKERS, EMBEDDING_TOKENS_PER_MINUTE,
+    EMBEDDING_MAX_RETRIES, INCREMENTAL_INGESTION, INGESTION_QUEUE_SIZE,
+    INGESTION_TRACE_MEMORY, SUMMARY_INDEX_ENABLED, CONTEXT_COMPRESSION_ENABLED
+)
+from src.utils import setup_logging, count_tokens
+
+logger = setup_logging()
+
+MANIFEST_FILE = "ingestion_manifest.json"
+
+
+def compute_chunk_id(chunk: Document,
+                     chunk_size: int = CHUNK_SIZE,
+                     chunk_overlap: int = CHUNK_OVERLAP,
+                     embedding_model: str = EMBEDDING_MODEL) -> str:
+    """Content hash of a chunk under a given chunking/embedding configuration"""
+    digest = hashlib.sha256()
+    for part in (embedding_model, str(chunk_size), str(chunk_overlap),
+                 str(chunk.metadata.get("source", "")), chunk.page_content):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+def compute_corpus_version(chunk_ids: List[str]) -> str:
+    """Fingerprint of the whole corpus - changes whenever any chunk changes"""
+    digest = hashlib.sha256()
+    for chunk_id in sorted(chunk_ids):
+        digest.update(chunk_id.encode("ascii"))
+    return digest.hexdigest()[:16]
+
+
+def read_manifest(persist_directory: str = CHROMA_DB_DIR) -> Optional[Dict[str, Any]]:
+    """Read the manifest written by the last ingestion, if any"""
+    path = os.path.join(persist_directory, MANIFEST_FILE)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_manifest(persist_directory: str, manifest: Dict[str, Any]):
+    """Atomically write the ingestion manifest"""
+    path = os.path.join(persist_directory, MANIFEST_FILE)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+class TokenBudget:
+    """Token bucket enforcing a tokens-per-minute limit across worker threads"""
+
+    def __init__(self, tokens_per_minute: int = EMBEDDING_TOKENS_PER_MINUTE):
+        self.capacity = float(tokens_per_minute)
+        self.rate = tokens_per_minute / 60.0
+        self._available = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.waited_seconds = 0.0
+
+    def acquire(self, tokens: int):
+        """Block until `tokens` can be spent without exceeding the budget"""
+        # A single batch larger than the bucket may still go through once full
+        tokens = min(float(tokens), self.capacity)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._available = min(self.capacity,
+                                      self._available + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._available >= tokens:
+                    self._available -= tokens
+                    return
+                delay = (tokens - self._available) / self.rate
+                self.waited_seconds += delay
+            time.sleep(delay)
+
+
+class EmbeddingBatchError(RuntimeError):
+    """Raised when a batch still fails after all retries"""
+
+
+def _embed_with_retry(embeddings: Embeddings, texts: List[str], budget: TokenBudget,
+                      tokens: int, max_retries: int, stats: Dict[str, Any],
+                      lock: threading.Lock) -> List[List[float]]:
+    """Embed one batch, backing off exponentially on failures such as 429s"""
+    for attempt in range(max_retries + 1):
+        budget.acquire(tokens)
+        try:
+            return embeddings.embed_documents(texts)
+        except Exception as e:
+            if attempt == max_retries:
+                raise EmbeddingBatchError(f"Embedding batch failed after {attempt + 1} attempts: {e}") from e
+            delay = min(60.0, (2 ** attempt) + random.uniform(0, 1))
+            with lock:
+                stats["retries"] += 1
+            logger.warning(f"Embedding batch failed ({e}), retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+
+def embed_in_batches(documents: Iterable[Document],
+                     embeddings: Embeddings,
+                     batch_size: int = EMBEDDING_BATCH_SIZE,
+                     max_workers: int = EMBEDDING_MAX_WORKERS,
+                     tokens_per_minute: int = EMBEDDING_TOKENS_PER_MINUTE,
+                     max_retries: int = EMBEDDING_MAX_RETRIES,
+                     stats: Optional[Dict[str, Any]] = None
+                     ) -> Iterator[Tuple[List[Document], List[List[float]]]]:
+    """Yield (documents, vectors) per batch as soon as each batch is embedded.
+
+    At most `max_workers` batches are in flight, so memory and request
+    concurrency stay bounded however large the corpus is. Batches may
+    complete out of order.
+    """
+    stats = stats if stats is not None else {}
+    stats.setdefault("batches", 0)
+    stats.setdefault("retries", 0)
+    stats.setdefault("tokens", 0)
+    budget = TokenBudget(tokens_per_minute)
+    lock = threading.Lock()
+
+    document_iter = iter(documents)
+    batches = iter(lambda: list(islice(document_iter, batch_size)), [])
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="embed") as pool:
+        in_flight = {}
+
+        def submit_next() -> bool:
+            batch = next(batches, None)
+            if batch is None:
+                return False
+            texts = [doc.page_content for doc in batch]
+            tokens = sum(count_tokens(text) for text in texts)
+            future = pool.submit(_embed_with_retry, embeddings, texts, budget,
+                                 tokens, max_retries, stats, lock)
+            in_flight[future] = (batch, tokens)
+            return True
+
+        for _ in range(max_workers):
+            if not submit_next():
+                break
+
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                batch, tokens = in_flight.pop(future)
+                vectors = future.result()
+                with lock:
+                    stats["batches"] += 1
+                    stats["tokens"] += tokens
+                submit_next()
+                yield batch, vectors
+
+    stats["rate_limited_seconds"] = round(budget.waited_seconds, 3)
+
+
+def upsert_embedded(vector_store: Chroma, documents: List[Document], vectors: List[List[float]]):
+    """Bulk insert documents with precomputed vectors - no embedding call"""
+    vector_store._collection.upsert(
+        ids=[doc.metadata["content_hash"] for doc in documents],
+        embeddings=vectors,
+        metadatas=[doc.metadata for doc in documents],
+        documents=[doc.page_content for doc in documents],
+    )
+
+
+def embed_and_upsert(documents: Iterable[Document], vector_store: Chroma,
+                     embeddings: Embeddings, **batch_options) -> Dict[str, Any]:
+    """Embed documents in concurrent batches and stream them into the store"""
+    stats: Dict[str, Any] = {"chunks": 0}
+    started = time.perf_counter()
+    for batch, vectors in embed_in_batches(documents, embeddings, stats=stats, **batch_options):
+        upsert_embedded(vector_store, batch, vectors)
+        stats["chunks"] += len(batch)
+
+    elapsed = time.perf_counter() - started
+    stats["seconds"] = round(elapsed, 3)
+    stats["chunks_per_second"] = round(stats["chunks"] / elapsed, 2) if elapsed else 0.0
+    stats["tokens_per_second"] = round(stats["tokens"] / elapsed, 2) if elapsed else 0.0
+    if stats["chunks"]:
+        logger.info(
+            f"Embedded {stats['chunks']} chunks in {stats['batches']} batches: "
+            f"{stats['chunks_per_second']} chunks/s, {stats['tokens_per_second']} tokens/s, "
+            f"{stats['retries']} retries"
+        )
+    return stats
+
+
+def _tag_chunk(chunk: Document, chunk_size: int, chunk_overlap: int) -> Document:
+    """Copy of a chunk tagged with its content hash"""
+    metadata = dict(chunk.metadata)
+    metadata["content_hash"] = compute_chunk_id(chunk, chunk_size, chunk_overlap, EMBEDDING_MODEL)
+    return Document(page_content=chunk.page_content, metadata=metadata)
+
+
+_END = object()
+
+def _threaded(iterable: Iterable, maxsize: int, depth: Dict[str, int], name: str) -> Iterator:
+    """Run an iterable in a background thread behind a bounded queue.
+
+    The producer blocks once `maxsize` items are waiting, so a fast stage can
+    never run ahead of a slow one by more than the queue size.
+    """
+    items: queue.Queue = queue.Queue(maxsize=maxsize)
+    stop = threading.Event()
+    errors: List[BaseException] = []
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put(item):
+                    return
+        except BaseException as e:
+            errors.append(e)
+        finally:
+            put(_END)
+
+    thread = threading.Thread(target=produce, name=f"ingest-{name}", daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = items.get()
+            if item is _END:
+                break
+            depth[name] = max(depth.get(name, 0), items.qsize() + 1)
+            yield item
+        if errors:
+            raise errors[0]
+    finally:
+        stop.set()
+        thread.join()
+
+
+def _peak_rss_mb() -> Optional[float]:
+    """Process peak resident set size in MB, where the platform reports it"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def sync_vector_store(chunks: Iterable[Document],
+                      persist_directory: str = CHROMA_DB_DIR,
+                      embeddings: Optional[Embeddings] = None,
+                      chunk_size: int = CHUNK_SIZE,
+                      chunk_overlap: int = CHUNK_OVERLAP,
+                      queue_size: int = INGESTION_QUEUE_SIZE,
+                      trace_memory: bool = INGESTION_TRACE_MEMORY,
+                      **batch_options) -> Tuple[Chroma, Dict[str, Any]]:
+    """Stream chunks into the vector store, embedding only what changed.
+
+    Stages are connected by bounded queues - chunks (load/split) → hash and
+    diff against the store → batched embedding → upsert - so peak memory
+    follows the queue and batch sizes rather than the corpus size. Only the
+    set of chunk ids is kept for the whole corpus, to delete removed chunks
+    at the end. Chunks whose text is unchanged but whose metadata moved
+    (e.g. page numbers) are updated in place without re-embedding.
+    `batch_options` are passed to embed_in_batches.
+    """
+    from src.vector_store import create_embeddings
+
+    started = time.perf_counter()
+    if trace_memory:
+        tracemalloc.start()
+    if embeddings is None:
+        embeddings = create_embeddings()
+
+    vector_store = Chroma(persist_directory=persist_directory, embedding_function=embeddings)
+    collection = vector_store._collection
+
+    existing_ids = set(collection.get(include=[])["ids"])
+    seen_ids = set()
+    counts = {"duplicates": 0, "metadata_updated": 0}
+    depth: Dict[str, int] = {}
+    batch_size = batch_options.get("batch_size", EMBEDDING_BATCH_SIZE)
+
+    def update_metadata(known: List[Document]):
+        """Rewrite metadata for unchanged chunks whose metadata moved"""
+        stored = collection.get(ids=[doc.metadata["content_hash"] for doc in known],
+                                include=["metadatas"])
+        stored_metadata = dict(zip(stored["ids"], stored["metadatas"]))
+        changed = [doc for doc in known
+                   if stored_metadata.get(doc.metadata["content_hash"]) != doc.metadata]
+        if changed:
+            collection.update(ids=[doc.metadata["content_hash"] for doc in changed],
+                              metadatas=[doc.metadata for doc in changed])
+            counts["metadata_updated"] += len(changed)
+
+    def new_chunks() -> Iterator[Document]:
+        """Hash and diff stage - yields only chunks the store does not have"""
+        known: List[Document] = []
+        for chunk in _threaded(chunks, queue_size, depth, "chunks"):
+            doc = _tag_chunk(chunk, chunk_size, chunk_overlap)
+            chunk_id = doc.metadata["content_hash"]
+            if chunk_id in seen_ids:
+                # Identical text from the same source - one copy is enough
+                counts["duplicates"] += 1
+                continue
+            seen_ids.add(chunk_id)
+            if chunk_id in existing_ids:
+                known.append(doc)
+                if len(known) >= batch_size:
+                    update_metadata(known)
+                    known = []
+            else:
+                yield doc
+        if known:
+            update_metadata(known)
+
+    embedding_stats = embed_and_upsert(_threaded(new_chunks(), queue_size, depth, "new_chunks"),
+                                       vector_store, embeddings, **batch_options)
+
+    to_delete = list(existing_ids - seen_ids)
+    for start in range(0, len(to_delete), 1000):
+        collection.delete(ids=to_delete[start:start + 1000])
+
+    added = embedding_stats.get("chunks", 0)
+    stats = {
+        "chunks": len(seen_ids),
+        "added": added,
+        "deleted": len(to_delete),
+        "metadata_updated": counts["metadata_updated"],
+        "unchanged": len(seen_ids) - added - counts["metadata_updated"],
+        "duplicates": counts["duplicates"],
+        "seconds": round(time.perf_counter() - started, 3),
+        "embedding": embedding_stats,
+        "memory": {
+            "peak_rss_mb": _peak_rss_mb(),
+            "max_queue_depth": depth,
+        },
+    }
+    if trace_memory:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        stats["memory"]["python_peak_mb"] = round(peak / (1024 * 1024), 1)
+
+    write_manifest(persist_directory, {
+        "corpus_version": compute_corpus_version(list(seen_ids)),
+        "chunk_count": len(seen_ids),
+        "chunk_size": chunk_size,
+        "chunk_overlap": chunk_overlap,
+        "embedding_model": EMBEDDING_MODEL,
+        "updated_at": time.time(),
+    })
+
+    logger.info(
+        f"Synced vector store: {stats['added']} embedded, {stats['deleted']} deleted, "
+        f"{stats['metadata_updated']} metadata-only, {stats['unchanged']} unchanged"
+    )
+    logger.info(f"Ingestion memory high-water mark: {stats['memory']}")
+    return vector_store, stats
+
+
+def ingest_corpus(data_dir: str = DATA_DIR,
+                  persist_directory: str = CHROMA_DB_DIR,
+                  rebuild: bool = not INCREMENTAL_INGESTION,
+                  chunk_size: int = CHUNK_SIZE,
+                  chunk_overlap: int = CHUNK_OVERLAP,
+                  **options) -> Tuple[Chroma, Dict[str, Any]]:
+    """Load page → split → hash → embed batch → upsert for every PDF in the corpus"""
+    from src.document_processor import iter_corpus_pages, iter_chunks
+    from src.vector_store import reset_vector_store, serving_store
+
+    if rebuild:
+        reset_vector_store(persist_directory)
+    chunks = iter_chunks(iter_corpus_pages(data_dir), chunk_size, chunk_overlap)
+    vector_store, stats = sync_vector_store(chunks, persist_directory, chunk_size=chunk_size,
+                                            chunk_overlap=chunk_overlap, **options)
+    vector_store = serving_store(vector_store, persist_directory)
+
+    from src.keyword_index import load_keyword_index
+    stats["keyword_index_terms"] = len(load_keyword_index(vector_store, persist_directory).postings)
+
+    if CONTEXT_COMPRESSION_ENABLED:
+        from src.context_compression import build_sentence_index
+        stats["sentence_index_sentences"] = len(build_sentence_index(vector_store, persist_directory))
+
+    if SUMMARY_INDEX_ENABLED:
+        from src.summary_index import build_summary_index
+        try:
+            stats["summary_index"] = build_summary_index(vector_store, persist_directory)
+        except Exception as e:
+            # Overview questions fall back to on-the-fly summarization
+            logger.error(f"Summary index build failed: {e}")
+            stats["summary_index"] = {"error": str(e)}
+    return vector_store, stats
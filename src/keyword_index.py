@@ -0,0 +1,168 @@
+"""
+Persisted BM25 inverted index over the stored chunks.
+
+Built once per corpus version at ingestion and saved next to Chroma. Each
+posting list keeps the chunk positions and their precomputed BM25 term
+weights, so a query is a handful of numpy scatter-adds instead of a
+substring scan over every chunk.
+"""
+import json
+import os
+import re
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+from config.settings import CHROMA_DB_DIR, BM25_K1, BM25_B
+from src.utils import setup_logging
+from src.ingestion import read_manifest
+
+logger = setup_logging()
+
+KEYWORD_INDEX_FILE = "keyword_index.json"
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset("""
+a about above after again against all am an and any are as at be because been before being below between
+both but by can could did do does doing down during each few for from further had has have having he her
+here hers herself him himself his how i if in into is it its itself just me more most my myself no nor not
+now of off on once only or other our ours ourselves out over own same she should so some such than that the
+their theirs them themselves then there these they this those through to too under until up very was we were
+what when where which while who whom why will with would you your yours yourself yourselves
+according tell say says said
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens without stopwords (single digits are kept for "Exhibit 3")"""
+    return [token for token in TOKEN_PATTERN.findall(text.lower())
+            if token not in STOPWORDS and (len(token) > 1 or token.isdigit())]
+
+
+class KeywordIndex:
+    """BM25 index over a fixed list of chunks"""
+
+    def __init__(self, documents: List[Document], postings: Dict[str, Tuple[np.ndarray, np.ndarray]],
+                 corpus_version: str = "unversioned"):
+        self.documents = documents
+        self.postings = postings
+        self.corpus_version = corpus_version
+        self._source_masks: Dict[str, np.ndarray] = {}
+
+    @classmethod
+    def build(cls, chunks: List[Document], corpus_version: str = "unversioned",
+              k1: float = BM25_K1, b: float = BM25_B) -> "KeywordIndex":
+        """Tokenize every chunk once and precompute BM25 weights per posting"""
+        term_counts: List[Dict[str, int]] = []
+        for chunk in chunks:
+            counts: Dict[str, int] = {}
+            for token in tokenize(chunk.page_content):
+                counts[token] = counts.get(token, 0) + 1
+            term_counts.append(counts)
+
+        lengths = np.array([sum(counts.values()) for counts in term_counts], dtype=np.float32)
+        average_length = float(lengths.mean()) if len(lengths) and lengths.mean() > 0 else 1.0
+        norms = k1 * (1 - b + b * lengths / average_length)
+
+        raw: Dict[str, Tuple[List[int], List[int]]] = {}
+        for position, counts in enumerate(term_counts):
+            for term, count in counts.items():
+                positions, tfs = raw.setdefault(term, ([], []))
+                positions.append(position)
+                tfs.append(count)
+
+        postings = {}
+        for term, (positions, tfs) in raw.items():
+            positions = np.array(positions, dtype=np.int32)
+            tfs = np.array(tfs, dtype=np.float32)
+            idf = np.log(1 + (len(chunks) - len(positions) + 0.5) / (len(positions) + 0.5))
+            postings[term] = (positions, (idf * tfs * (k1 + 1) / (tfs + norms[positions])).astype(np.float32))
+        return cls(list(chunks), postings, corpus_version)
+
+    def _source_mask(self, source: str) -> np.ndarray:
+        if source not in self._source_masks:
+            self._source_masks[source] = np.array([
+                source in (doc.metadata.get("source"), doc.metadata.get("file_name")) for doc in self.documents
+            ], dtype=bool)
+        return self._source_masks[source]
+
+    def document_frequency(self, term: str) -> int:
+        """Number of chunks containing a term"""
+        return len(self.postings[term][0]) if term in self.postings else 0
+
+    def scores(self, query: str) -> np.ndarray:
+        """BM25 score of every chunk for a query"""
+        scores = np.zeros(len(self.documents), dtype=np.float32)
+        for term in set(tokenize(query)):
+            if term in self.postings:
+                positions, weights = self.postings[term]
+                scores[positions] += weights
+        return scores
+
+    def search(self, query: str, k: int = 20, source: Optional[str] = None) -> List[Tuple[Document, float]]:
+        """Top-k matching chunks by BM25 score, best first"""
+        scores = self.scores(query)
+        if source:
+            scores = np.where(self._source_mask(source), scores, 0)
+        matched = np.flatnonzero(scores > 0)
+        if len(matched) > k:
+            matched = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+        ranked = matched[np.argsort(-scores[matched], kind="stable")]
+        return [(self.documents[i], float(scores[i])) for i in ranked]
+
+    def save(self, persist_directory: str = CHROMA_DB_DIR):
+        """Atomically write the index next to the Chroma files"""
+        path = os.path.join(persist_directory, KEYWORD_INDEX_FILE)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "corpus_version": self.corpus_version,
+                "documents": [{"text": doc.page_content, "metadata": doc.metadata} for doc in self.documents],
+                "postings": {term: [positions.tolist(), weights.tolist()]
+                             for term, (positions, weights) in self.postings.items()},
+            }, f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, persist_directory: str = CHROMA_DB_DIR) -> Optional["KeywordIndex"]:
+        """Load the persisted index, if any"""
+        path = os.path.join(persist_directory, KEYWORD_INDEX_FILE)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        documents = [Document(page_content=doc["text"], metadata=doc["metadata"]) for doc in data["documents"]]
+        postings = {term: (np.array(positions, dtype=np.int32), np.array(weights, dtype=np.float32))
+                    for term, (positions, weights) in data["postings"].items()}
+        return cls(documents, postings, data["corpus_version"])
+
+
+def build_keyword_index(vector_store, persist_directory: str = CHROMA_DB_DIR) -> KeywordIndex:
+    """Build the index from the stored chunks and persist it"""
+    from src.vector_store import load_chunks_from_store
+
+    started = time.perf_counter()
+    corpus_version = (read_manifest(persist_directory) or {}).get("corpus_version", "unversioned")
+    index = KeywordIndex.build(load_chunks_from_store(vector_store), corpus_version)
+    try:
+        index.save(persist_directory)
+    except OSError as e:
+        # Still usable for this process - it is rebuilt on the next start
+        logger.warning(f"Could not persist keyword index: {e}")
+    logger.info(f"Built keyword index: {len(index.documents)} chunks, {len(index.postings)} terms "
+                f"in {time.perf_counter() - started:.2f}s")
+    return index
+
+
+def load_keyword_index(vector_store, persist_directory: str = CHROMA_DB_DIR) -> KeywordIndex:
+    """Load the index for the current corpus version, rebuilding it when stale"""
+    corpus_version = (read_manifest(persist_directory) or {}).get("corpus_version", "unversioned")
+    index = KeywordIndex.load(persist_directory)
+    if index is not None and index.corpus_version == corpus_version:
+        return index
+    return build_keyword_index(vector_store, persist_directory)
+
@@ -0,0 +1,246 @@
+"""
+Local per-stage latency metrics.
+
+Hot-path stages (ask_question, the agent's LLM calls, each tool,
+answer_question, vector_query, embedding, vector and keyword search, the
+final answer LLM call) are timed into fixed-bucket histograms plus a sliding
+window of recent samples for p50/p95/p99, and rendered in the Prometheus text
+format for /api/metrics. With METRICS_ENABLED=false a timed call costs one
+attribute check.
+"""
+import functools
+import inspect
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.embeddings import Embeddings
+
+from config.settings import METRICS_ENABLED, METRICS_WINDOW
+
+# Seconds - from a cached embedding lookup up to a slow multi-tool agent run
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class StageHistogram:
+    """Bucket counts, sum and count of one stage, plus its most recent samples"""
+
+    def __init__(self, window: int = METRICS_WINDOW):
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.sum = 0.0
+        self.count = 0
+        self.errors = 0
+        self.recent: deque = deque(maxlen=window)
+
+    def observe(self, seconds: float, error: bool = False):
+        index = bisect_left(LATENCY_BUCKETS, seconds)
+        if index < len(self.buckets):
+            self.buckets[index] += 1
+        self.sum += seconds
+        self.count += 1
+        self.errors += error
+        self.recent.append(seconds)
+
+    def quantiles(self) -> Dict[float, float]:
+        samples = sorted(self.recent)
+        if not samples:
+            return {}
+        return {q: samples[min(len(samples) - 1, int(q * len(samples)))] for q in QUANTILES}
+
+
+class MetricsRegistry:
+    """Thread-safe stage histograms"""
+
+    def __init__(self, enabled: bool = METRICS_ENABLED, window: int = METRICS_WINDOW):
+        self.enabled = enabled
+        self.window = window
+        self._stages: Dict[str, StageHistogram] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage: str, seconds: float, error: bool = False):
+        with self._lock:
+            histogram = self._stages.get(stage)
+            if histogram is None:
+                histogram = self._stages[stage] = StageHistogram(self.window)
+            histogram.observe(seconds, error)
+
+    def timer(self, stage: str) -> "StageTimer":
+        return StageTimer(self, stage)
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+
+    def get_stats(self) -> Dict[str, Dict[str, float]]:
+        """Count, errors, mean and p50/p95/p99 in milliseconds per stage"""
+        with self._lock:
+            stats = {}
+            for stage, histogram in sorted(self._stages.items()):
+                stats[stage] = {
+                    "count": histogram.count,
+                    "errors": histogram.errors,
+                    "mean_ms": round(histogram.sum / histogram.count * 1000, 2),
+                    **{f"p{int(q * 100)}_ms": round(value * 1000, 2)
+                       for q, value in histogram.quantiles().items()},
+                }
+            return stats
+
+    def render_prometheus(self, counters: Optional[Dict[str, int]] = None,
+                          telemetry: Optional[Dict[str, int]] = None) -> str:
+        """Prometheus text exposition format (version 0.0.4)"""
+        lines = [
+            "# HELP rag_stage_duration_seconds Latency of each request stage.",
+            "# TYPE rag_stage_duration_seconds histogram",
+        ]
+        quantile_lines: List[str] = []
+        error_lines: List[str] = []
+        with self._lock:
+            for stage, histogram in sorted(self._stages.items()):
+                label = f'stage="{_escape(stage)}"'
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS, histogram.buckets):
+                    cumulative += count
+                    lines.append(f'rag_stage_duration_seconds_bucket{{{label},le="{bound}"}} {cumulative}')
+                lines.append(f'rag_stage_duration_seconds_bucket{{{label},le="+Inf"}} {histogram.count}')
+                lines.append(f"rag_stage_duration_seconds_sum{{{label}}} {histogram.sum:.6f}")
+                lines.append(f"rag_stage_duration_seconds_count{{{label}}} {histogram.count}")
+                for q, value in histogram.quantiles().items():
+                    quantile_lines.append(f'rag_stage_duration_recent_seconds{{{label},quantile="{q}"}} {value:.6f}')
+                error_lines.append(f"rag_stage_errors_total{{{label}}} {histogram.errors}")
+
+        lines += [f"# HELP rag_stage_duration_recent_seconds Latency quantiles over the last {self.window} calls.",
+                  "# TYPE rag_stage_duration_recent_seconds gauge", *quantile_lines,
+                  "# HELP rag_stage_errors_total Stage calls that raised.",
+                  "# TYPE rag_stage_errors_total counter", *error_lines]
+        if counters:
+            lines += ["# HELP rag_events_total Local observability counters (cache hits, routes, ...).",
+                      "# TYPE rag_events_total counter"]
+            lines += [f'rag_events_total{{event="{_escape(name)}"}} {value}' for name, value in sorted(counters.items())]
+        if telemetry:
+            lines += ["# HELP rag_telemetry_events Telemetry exporter event counts by state.",
+                      "# TYPE rag_telemetry_events gauge"]
+            lines += [f'rag_telemetry_events{{state="{_escape(name)}"}} {value}' for name, value in sorted(telemetry.items())]
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class StageTimer:
+    """Context manager that records its block's duration - a no-op when metrics are off"""
+
+    __slots__ = ("registry", "stage", "started")
+
+    def __init__(self, registry: MetricsRegistry, stage: str):
+        self.registry = registry
+        self.stage = stage
+        self.started = None
+
+    def __enter__(self):
+        if self.registry.enabled:
+            self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.started is not None:
+            self.registry.observe(self.stage, time.perf_counter() - self.started, exc_type is not None)
+        return False
+
+
+# Global metrics registry instance
+metrics_registry = MetricsRegistry()
+
+
+def stage_timer(stage: str) -> StageTimer:
+    """Time a block: `with stage_timer("vector_search"): ...`"""
+    return StageTimer(metrics_registry, stage)
+
+
+def timed(stage: str) -> Callable:
+    """Decorator timing every call of a sync or async function under a stage name"""
+    def decorate(func: Callable) -> Callable:
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if not metrics_registry.enabled:
+                    return await func(*args, **kwargs)
+                with StageTimer(metrics_registry, stage):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not metrics_registry.enabled:
+                return func(*args, **kwargs)
+            with StageTimer(metrics_registry, stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+class TimedEmbeddings(Embeddings):
+    """Times every embedding call - cache hits included, so the stage shows what callers wait"""
+
+    def __init__(self, underlying: Embeddings, stage: str = "embedding"):
+        self.underlying = underlying
+        self.stage = stage
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        with stage_timer(self.stage):
+            return self.underlying.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        with stage_timer(self.stage):
+            return self.underlying.embed_query(text)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        with stage_timer(self.stage):
+            return await self.underlying.aembed_documents(texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        with stage_timer(self.stage):
+            return await self.underlying.aembed_query(text)
+
+
+class LLMTimingHandler(BaseCallbackHandler):
+    """Callback handler recording each LLM call of the model it is attached to"""
+
+    def __init__(self, stage: str):
+        self.stage = stage
+        self._started: Dict[UUID, float] = {}
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], *, run_id: UUID, **kwargs: Any):
+        if metrics_registry.enabled:
+            self._started[run_id] = time.perf_counter()
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[List[Any]], *,
+                            run_id: UUID, **kwargs: Any):
+        if metrics_registry.enabled:
+            self._started[run_id] = time.perf_counter()
+
+    def on_llm_end(self, response: Any, *, run_id: UUID, **kwargs: Any):
+        started = self._started.pop(run_id, None)
+        if started is not None:
+            metrics_registry.observe(self.stage, time.perf_counter() - started)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        started = self._started.pop(run_id, None)
+        if started is not None:
+            metrics_registry.observe(self.stage, time.perf_counter() - started, error=True)
+
+
+def get_metrics_stats() -> Dict[str, Dict[str, float]]:
+    """Per-stage latency summary in milliseconds"""
+    return metrics_registry.get_stats()
+
+
+def render_metrics() -> str:
+    """Stage histograms plus the observability and telemetry counters, as Prometheus text"""
+    from src.observability import get_counters, get_telemetry_stats
+    return metrics_registry.render_prometheus(get_counters(), get_telemetry_stats())
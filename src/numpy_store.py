@@ -0,0 +1,375 @@
+"""
+In-memory NumPy vector backend.
+
+Chroma stays the write path - ingestion upserts and deletes there - and after
+each sync the collection is exported to a read-only snapshot next to the
+Chroma files: one contiguous float32 matrix of L2-normalized vectors
+(memory-mapped on load) plus parallel arrays of ids, texts and metadata.
+A search is a single matrix product and an argpartition, for one question or
+a whole batch. With NUMPY_IVF_LISTS > 0 the rows are grouped by k-means list
+so a query scores only the NUMPY_IVF_NPROBE closest lists.
+
+With NUMPY_QUANTIZATION set to float16 or int8 (one scale per vector), the
+search scans a quantized copy of the matrix - a half or a quarter of the
+memory - and rescores the best k * NUMPY_RESCORE_FACTOR candidates against the
+float32 matrix, which stays memory-mapped on disk so only those rows are read.
+"""
+import json
+import os
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+from config.settings import (
+    CHROMA_DB_DIR, NUMPY_IVF_LISTS, NUMPY_IVF_NPROBE, NUMPY_QUANTIZATION, NUMPY_RESCORE_FACTOR
+)
+from src.utils import setup_logging
+from src.ingestion import read_manifest
+
+logger = setup_logging()
+
+VECTORS_FILE = "numpy_vectors.npy"
+RECORDS_FILE = "numpy_records.json"
+IVF_FILE = "numpy_ivf.npz"
+QUANTIZED_FILE = "numpy_quantized.npy"
+SCALES_FILE = "numpy_scales.npy"
+
+QUANTIZATIONS = ("none", "float16", "int8")
+KMEANS_ITERATIONS = 10
+# Rows converted back to float32 at a time when scanning a quantized matrix
+QUANTIZED_BLOCK_ROWS = 2048
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def top_k(scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Row-wise indices and scores of the k best columns, best first"""
+    k = min(k, scores.shape[1])
+    if k == 0:
+        return np.zeros((len(scores), 0), dtype=np.int64), np.zeros((len(scores), 0), dtype=np.float32)
+    if k < scores.shape[1]:
+        candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        candidates = np.tile(np.arange(k), (len(scores), 1))
+    candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+    order = np.argsort(-candidate_scores, axis=1, kind="stable")
+    return np.take_along_axis(candidates, order, axis=1), np.take_along_axis(candidate_scores, order, axis=1)
+
+
+def quantize(vectors: np.ndarray, quantization: str) -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
+    """Quantized copy of unit vectors and, for int8, the per-vector scales"""
+    if quantization not in QUANTIZATIONS:
+        raise ValueError(f"Unknown quantization {quantization}, expected one of {QUANTIZATIONS}")
+    if quantization == "float16":
+        return vectors.astype(np.float16), None
+    if quantization == "int8":
+        scales = np.abs(vectors).max(axis=1) / 127
+        scales[scales == 0] = 1
+        return np.round(vectors / scales[:, None]).astype(np.int8), scales.astype(np.float32)
+    return None, None
+
+
+def train_ivf(vectors: np.ndarray, lists: int, seed: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """Spherical k-means - returns unit centroids and each row's list"""
+    rng = np.random.default_rng(seed)
+    lists = min(lists, len(vectors))
+    centroids = vectors[rng.choice(len(vectors), lists, replace=False)]
+    for _ in range(KMEANS_ITERATIONS):
+        assignment = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, vectors)
+        empty = ~sums.any(axis=1)
+        # Re-seed empty lists with random rows rather than dropping them
+        sums[empty] = vectors[rng.choice(len(vectors), int(empty.sum()))]
+        centroids = normalize_rows(sums)
+    return centroids, np.argmax(vectors @ centroids.T, axis=1)
+
+
+class ReadOnlyStoreError(RuntimeError):
+    """Raised when documents are added to a read-only NumPy snapshot"""
+
+
+class NumpyVectorStore(VectorStore):
+    """Read-only exact (flat) or IVF dot-product search over a normalized matrix.
+
+    The store is a snapshot of a Chroma collection and only serves searches.
+    Ingestion writes to Chroma and re-exports the snapshot (see serving_store),
+    so add_texts / add_documents raise ReadOnlyStoreError.
+    """
+
+    def __init__(self, vectors: np.ndarray, ids: List[str], documents: List[str],
+                 metadatas: List[Dict[str, Any]], embedding: Optional[Embeddings] = None,
+                 centroids: Optional[np.ndarray] = None, offsets: Optional[np.ndarray] = None,
+                 quantized: Optional[np.ndarray] = None, scales: Optional[np.ndarray] = None,
+                 nprobe: int = NUMPY_IVF_NPROBE, rescore_factor: int = NUMPY_RESCORE_FACTOR,
+                 corpus_version: str = "unversioned", persist_directory: Optional[str] = None):
+        self.vectors = vectors
+        self.ids = ids
+        self.texts = documents
+        self.metadatas = metadatas
+        self._embedding = embedding
+        # IVF lists are contiguous row ranges: list i is rows offsets[i]:offsets[i + 1]
+        self.centroids = centroids
+        self.offsets = offsets
+        self.nprobe = nprobe
+        # The matrix that is scanned - the float32 one is then read only to rescore
+        self.quantized = quantized
+        self.scales = scales
+        self.rescore_factor = rescore_factor
+        self.corpus_version = corpus_version
+        self._persist_directory = persist_directory
+        self._codes: Dict[str, Tuple[Dict[Any, int], np.ndarray]] = {}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def embeddings(self) -> Optional[Embeddings]:
+        return self._embedding
+
+    @property
+    def quantization(self) -> str:
+        return "none" if self.quantized is None else "int8" if self.scales is not None else "float16"
+
+    @classmethod
+    def from_arrays(cls, vectors: np.ndarray, ids: List[str], documents: List[str],
+                    metadatas: List[Dict[str, Any]], embedding: Optional[Embeddings] = None,
+                    ivf_lists: int = NUMPY_IVF_LISTS, quantization: str = NUMPY_QUANTIZATION,
+                    **kwargs) -> "NumpyVectorStore":
+        """Normalize the vectors, reorder every array by list for IVF, then quantize"""
+        vectors = normalize_rows(vectors)
+        centroids = offsets = None
+        if ivf_lists > 0 and len(vectors):
+            centroids, assignment = train_ivf(vectors, ivf_lists)
+            order = np.argsort(assignment, kind="stable")
+            offsets = np.searchsorted(assignment[order], np.arange(len(centroids) + 1)).astype(np.int64)
+            vectors = np.ascontiguousarray(vectors[order])
+            ids = [ids[i] for i in order]
+            documents = [documents[i] for i in order]
+            metadatas = [metadatas[i] for i in order]
+        quantized, scales = quantize(vectors, quantization)
+        return cls(vectors, list(ids), list(documents), [dict(m or {}) for m in metadatas],
+                   embedding, centroids, offsets, quantized, scales, **kwargs)
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding: Embeddings, metadatas: Optional[List[dict]] = None,
+                   ids: Optional[List[str]] = None, **kwargs: Any) -> "NumpyVectorStore":
+        texts = list(texts)
+        return cls.from_arrays(np.array(embedding.embed_documents(texts), dtype=np.float32),
+                               ids or [str(i) for i in range(len(texts))], texts,
+                               metadatas or [{} for _ in texts], embedding, **kwargs)
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[dict]] = None,
+                  **kwargs: Any) -> List[str]:
+        raise ReadOnlyStoreError("NumpyVectorStore is a read-only snapshot - ingest through Chroma")
+
+    def save(self, persist_directory: str = CHROMA_DB_DIR):
+        """Atomically write the snapshot; the records file goes last and marks it complete"""
+        def replace(name: str, write):
+            path = os.path.join(persist_directory, name)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "wb") as f:
+                write(f)
+            os.replace(tmp_path, path)
+
+        replace(VECTORS_FILE, lambda f: np.save(f, np.ascontiguousarray(self.vectors, dtype=np.float32)))
+        if self.centroids is not None:
+            replace(IVF_FILE, lambda f: np.savez(f, centroids=self.centroids, offsets=self.offsets))
+        if self.quantized is not None:
+            replace(QUANTIZED_FILE, lambda f: np.save(f, self.quantized))
+        if self.scales is not None:
+            replace(SCALES_FILE, lambda f: np.save(f, self.scales))
+        for name, present in ((IVF_FILE, self.centroids), (QUANTIZED_FILE, self.quantized),
+                              (SCALES_FILE, self.scales)):
+            if present is None and os.path.exists(os.path.join(persist_directory, name)):
+                os.remove(os.path.join(persist_directory, name))
+        records = {"corpus_version": self.corpus_version, "quantization": self.quantization, "ids": self.ids,
+                   "documents": self.texts, "metadatas": self.metadatas}
+        replace(RECORDS_FILE, lambda f: f.write(json.dumps(records).encode("utf-8")))
+
+    @classmethod
+    def load(cls, persist_directory: str = CHROMA_DB_DIR, embedding: Optional[Embeddings] = None,
+             **kwargs) -> Optional["NumpyVectorStore"]:
+        """Memory-map a saved snapshot, or None when it is missing or inconsistent"""
+        try:
+            with open(os.path.join(persist_directory, RECORDS_FILE), "r", encoding="utf-8") as f:
+                records = json.load(f)
+            ids, texts, metadatas = records["ids"], records["documents"], records["metadatas"]
+            corpus_version = records["corpus_version"]
+            vectors = np.load(os.path.join(persist_directory, VECTORS_FILE), mmap_mode="r")
+            centroids = offsets = None
+            if os.path.exists(os.path.join(persist_directory, IVF_FILE)):
+                with np.load(os.path.join(persist_directory, IVF_FILE)) as ivf:
+                    centroids, offsets = ivf["centroids"], ivf["offsets"]
+            quantized = scales = None
+            if records.get("quantization", "none") != "none":
+                quantized = np.load(os.path.join(persist_directory, QUANTIZED_FILE), mmap_mode="r")
+            if records.get("quantization") == "int8":
+                scales = np.load(os.path.join(persist_directory, SCALES_FILE))
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        if (len(vectors) != len(ids) or (offsets is not None and offsets[-1] != len(vectors))
+                or (quantized is not None and quantized.shape != vectors.shape)):
+            logger.warning(f"NumPy snapshot in {persist_directory} is inconsistent, ignoring it")
+            return None
+        return cls(vectors, ids, texts, metadatas, embedding,
+                   centroids, offsets, quantized, scales, corpus_version=corpus_version,
+                   persist_directory=persist_directory, **kwargs)
+
+    def get_documents(self) -> List[Document]:
+        return [Document(page_content=text, metadata=dict(metadata))
+                for text, metadata in zip(self.texts, self.metadatas)]
+
+    def _filter_mask(self, filter: Optional[Dict[str, Any]]) -> Optional[np.ndarray]:
+        """Rows matching an equality filter such as {"file_name": "state.pdf"}"""
+        if not filter:
+            return None
+        mask = np.ones(len(self), dtype=bool)
+        for key, value in filter.items():
+            if key.startswith("$") or isinstance(value, dict):
+                raise ValueError(f"NumpyVectorStore supports equality filters only, got {key}: {value}")
+            if key not in self._codes:
+                # One integer code per row for this metadata key, built on first use
+                vocabulary: Dict[Any, int] = {}
+                codes = np.array([vocabulary.setdefault(metadata.get(key), len(vocabulary))
+                                  for metadata in self.metadatas], dtype=np.int32)
+                self._codes[key] = (vocabulary, codes)
+            vocabulary, codes = self._codes[key]
+            mask &= codes == vocabulary.get(value, -1)
+        return mask
+
+    def _probed_lists(self, queries: np.ndarray) -> Optional[np.ndarray]:
+        """Each query's nprobe closest IVF lists - None means scan every row"""
+        if self.centroids is None or self.nprobe >= len(self.centroids):
+            return None
+        lists, _ = top_k(queries @ self.centroids.T, self.nprobe)
+        return lists
+
+    def _approximate_scores(self, queries: np.ndarray, start: int, stop: int) -> np.ndarray:
+        """Scores of rows start:stop - exact, or from the quantized matrix in blocks"""
+        if self.quantized is None:
+            return queries @ self.vectors[start:stop].T
+        blocks = []
+        for block_start in range(start, stop, QUANTIZED_BLOCK_ROWS):
+            block_stop = min(block_start + QUANTIZED_BLOCK_ROWS, stop)
+            block = queries @ self.quantized[block_start:block_stop].astype(np.float32).T
+            if self.scales is not None:
+                block *= self.scales[block_start:block_stop]
+            blocks.append(block)
+        return np.hstack(blocks) if blocks else np.zeros((len(queries), 0), dtype=np.float32)
+
+    def _rank(self, query: np.ndarray, rows: np.ndarray, scores: np.ndarray, k: int) -> List[Tuple[int, float]]:
+        """Best k candidates, rescored in full precision when the scan was quantized"""
+        keep = np.isfinite(scores)
+        rows, scores = rows[keep], scores[keep]
+        if self.quantized is not None and len(rows):
+            rows = np.sort(rows)
+            scores = self.vectors[rows] @ query
+        positions, best = top_k(scores[None, :], k)
+        return [(int(rows[p]), float(s)) for p, s in zip(positions[0], best[0])]
+
+    def search_vectors(self, query_vectors, k: int = 4,
+                       filter: Optional[Dict[str, Any]] = None) -> List[List[Tuple[int, float]]]:
+        """Top-k (row, cosine similarity) for each query vector"""
+        queries = normalize_rows(np.atleast_2d(np.asarray(query_vectors, dtype=np.float32)))
+        mask = self._filter_mask(filter)
+        probed = self._probed_lists(queries)
+        fetch = k * self.rescore_factor if self.quantized is not None else k
+
+        if probed is None:
+            scores = self._approximate_scores(queries, 0, len(self))
+            if mask is not None:
+                scores[:, ~mask] = -np.inf
+            rows, best = top_k(scores, fetch)
+            return [self._rank(query, r, s, k) for query, r, s in zip(queries, rows, best)]
+
+        results = []
+        for query, lists in zip(queries, probed):
+            # Lists are contiguous row ranges, so each one is scored on a view - no gather
+            ranges = [(self.offsets[i], self.offsets[i + 1]) for i in lists]
+            rows = np.concatenate([np.arange(start, stop) for start, stop in ranges])
+            scores = np.concatenate([self._approximate_scores(query[None, :], start, stop)[0]
+                                     for start, stop in ranges])
+            if mask is not None:
+                scores[~mask[rows]] = -np.inf
+            positions, best = top_k(scores[None, :], fetch)
+            results.append(self._rank(query, rows[positions[0]], best[0], k))
+        return results
+
+    def _documents(self, hits: List[Tuple[int, float]]) -> List[Tuple[Document, float]]:
+        return [(Document(page_content=self.texts[row], metadata=dict(self.metadatas[row]), id=self.ids[row]), score)
+                for row, score in hits]
+
+    def similarity_search_with_score_by_vector(self, embedding: List[float], k: int = 4,
+                                               filter: Optional[Dict[str, Any]] = None,
+                                               **kwargs: Any) -> List[Tuple[Document, float]]:
+        return self._documents(self.search_vectors([embedding], k, filter)[0])
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4,
+                                    filter: Optional[Dict[str, Any]] = None, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k, filter)]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, filter: Optional[Dict[str, Any]] = None,
+                                     **kwargs: Any) -> List[Tuple[Document, float]]:
+        return self.similarity_search_with_score_by_vector(self._embedding.embed_query(query), k, filter)
+
+    def similarity_search(self, query: str, k: int = 4, filter: Optional[Dict[str, Any]] = None,
+                          **kwargs: Any) -> List[Document]:
+        return self.similarity_search_by_vector(self._embedding.embed_query(query), k, filter)
+
+    async def asimilarity_search(self, query: str, k: int = 4, filter: Optional[Dict[str, Any]] = None,
+                                 **kwargs: Any) -> List[Document]:
+        # Only the embedding call is I/O - the search itself is a sub-millisecond matrix product
+        return self.similarity_search_by_vector(await self._embedding.aembed_query(query), k, filter)
+
+    async def asimilarity_search_by_vector(self, embedding: List[float], k: int = 4,
+                                           filter: Optional[Dict[str, Any]] = None,
+                                           **kwargs: Any) -> List[Document]:
+        return self.similarity_search_by_vector(embedding, k, filter)
+
+    def _select_relevance_score_fn(self):
+        return lambda score: score
+
+
+def export_numpy_store(chroma_store, persist_directory: str = CHROMA_DB_DIR,
+                       ivf_lists: int = NUMPY_IVF_LISTS) -> NumpyVectorStore:
+    """Snapshot a Chroma collection - stored vectors only, nothing is re-embedded"""
+    started = time.perf_counter()
+    stored = chroma_store._collection.get(include=["embeddings", "documents", "metadatas"])
+    store = NumpyVectorStore.from_arrays(
+        np.asarray(stored["embeddings"], dtype=np.float32).reshape(len(stored["ids"]), -1),
+        stored["ids"], stored["documents"], stored["metadatas"], chroma_store.embeddings, ivf_lists,
+        corpus_version=(read_manifest(persist_directory) or {}).get("corpus_version", "unversioned"),
+        persist_directory=persist_directory,
+    )
+    try:
+        store.save(persist_directory)
+    except OSError as e:
+        logger.warning(f"Could not persist NumPy snapshot: {e}")
+    else:
+        # Serve the memory-mapped snapshot so the float32 matrix is not kept in RAM next to the quantized copy
+        store = NumpyVectorStore.load(persist_directory, chroma_store.embeddings) or store
+    logger.info(f"Exported {len(store)} vectors to the NumPy backend in {time.perf_counter() - started:.2f}s")
+    return store
+
+
+def load_numpy_store(persist_directory: str = CHROMA_DB_DIR, embedding: Optional[Embeddings] = None,
+                     chroma_store=None) -> Optional[NumpyVectorStore]:
+    """Load the snapshot for the current corpus version, re-exporting from Chroma when stale"""
+    corpus_version = (read_manifest(persist_directory) or {}).get("corpus_version", "unversioned")
+    store = NumpyVectorStore.load(persist_directory, embedding)
+    if store is not None and store.corpus_version == corpus_version:
+        lists = 0 if store.centroids is None else len(store.centroids)
+        if lists == min(NUMPY_IVF_LISTS, len(store)) and store.quantization == NUMPY_QUANTIZATION:
+            return store
+    if chroma_store is None:
+        return None
+    return export_numpy_store(chroma_store, persist_directory)
@@ -1,11 +1,25 @@
 """
 Observability module for Langfuse integration with LangChain
 Includes fallback handling when Langfuse is not available
+
+Traces and generations never call Langfuse on the request path: they go into
+a bounded in-memory ring buffer that a background thread posts to the Langfuse
+ingestion API in batches, backing off while the host is slow or down.
 """
+import json
 import os
-from typing import Optional
+import threading
+import uuid
+import urllib.request
+from collections import defaultdict, deque
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
 from src.utils import setup_logging
-from config.settings import ENABLE_LANGFUSE
+from config.settings import (
+    ENABLE_LANGFUSE, TELEMETRY_BUFFER_SIZE, TELEMETRY_BATCH_SIZE, TELEMETRY_FLUSH_INTERVAL_SECONDS,
+    TELEMETRY_TIMEOUT_SECONDS, TELEMETRY_MAX_RETRIES, TELEMETRY_BACKOFF_SECONDS,
+    TELEMETRY_MAX_BACKOFF_SECONDS
+)
 
 logger = setup_logging()
 import os
@@ -15,8 +29,8 @@ from dotenv import load_dotenv
 load_dotenv()
 
 # Set Langfuse credentials from environment
-os.environ["LANGFUSE_PUBLIC_KEY"] = os.getenv("LANGFUSE_PUBLIC_KEY")
-os.environ["LANGFUSE_SECRET_KEY"] = os.getenv("LANGFUSE_SECRET_KEY")
+os.environ["LANGFUSE_PUBLIC_KEY"] = os.getenv("LANGFUSE_PUBLIC_KEY", "")
+os.environ["LANGFUSE_SECRET_KEY"] = os.getenv("LANGFUSE_SECRET_KEY", "")
 os.environ["LANGFUSE_HOST"] = os.getenv("LANGFUSE_HOST", "https://cloud.langfuse.com")  # Default fallback
 
 # Optional: base64 auth if needed
@@ -82,6 +96,136 @@ except ImportError:
     LANGFUSE_SECRET_KEY = None
     LANGFUSE_HOST = "https://cloud.langfuse.com"
 
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def ingestion_event(event_type: str, body: Dict[str, Any]) -> Dict[str, Any]:
+    """Envelope for one event of the Langfuse batch ingestion API"""
+    return {"id": str(uuid.uuid4()), "type": event_type, "timestamp": _now(), "body": body}
+
+
+class LangfuseIngestionSender:
+    """POSTs a batch of events to {host}/api/public/ingestion - raises on failure"""
+
+    def __init__(self, host: str, public_key: str, secret_key: str,
+                 timeout: float = TELEMETRY_TIMEOUT_SECONDS):
+        self.url = f"{host.rstrip('/')}/api/public/ingestion"
+        self.headers = {
+            "Authorization": "Basic " + base64.b64encode(f"{public_key}:{secret_key}".encode()).decode(),
+            "Content-Type": "application/json",
+        }
+        self.timeout = timeout
+
+    def __call__(self, events: List[Dict[str, Any]]):
+        request = urllib.request.Request(self.url, data=json.dumps({"batch": events}).encode("utf-8"),
+                                         headers=self.headers, method="POST")
+        # urlopen raises HTTPError for 4xx/5xx; 207 reports per-event errors we do not retry
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+
+class TelemetryExporter:
+    """Bounded ring buffer of events, flushed in batches by a background thread.
+
+    emit() never blocks on the network. When the buffer is full the oldest
+    event is dropped. A failed batch is retried with exponential backoff, and
+    dropped after max_retries so a dead host cannot pin memory.
+    """
+
+    def __init__(self, send: Callable[[List[Dict[str, Any]]], None],
+                 capacity: int = TELEMETRY_BUFFER_SIZE,
+                 batch_size: int = TELEMETRY_BATCH_SIZE,
+                 flush_interval: float = TELEMETRY_FLUSH_INTERVAL_SECONDS,
+                 max_retries: int = TELEMETRY_MAX_RETRIES,
+                 backoff: float = TELEMETRY_BACKOFF_SECONDS,
+                 max_backoff: float = TELEMETRY_MAX_BACKOFF_SECONDS):
+        self.send = send
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self._events: deque = deque()
+        self._condition = threading.Condition()
+        self._in_flight = 0
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.stats = {"enqueued": 0, "dropped": 0, "exported": 0, "failed_batches": 0, "retries": 0}
+
+    def emit(self, event: Dict[str, Any]):
+        """Queue one event - O(1), never waits for the exporter"""
+        with self._condition:
+            if len(self._events) >= self.capacity:
+                self._events.popleft()
+                self.stats["dropped"] += 1
+            self._events.append(event)
+            self.stats["enqueued"] += 1
+            if len(self._events) >= self.batch_size:
+                self._condition.notify_all()
+            if self._thread is None and not self._stopping.is_set():
+                self._thread = threading.Thread(target=self._run, name="telemetry-export", daemon=True)
+                self._thread.start()
+
+    def _next_batch(self) -> List[Dict[str, Any]]:
+        with self._condition:
+            self._condition.wait_for(lambda: self._stopping.is_set() or len(self._events) >= self.batch_size,
+                                     timeout=self.flush_interval)
+            batch = [self._events.popleft() for _ in range(min(self.batch_size, len(self._events)))]
+            self._in_flight = len(batch)
+            return batch
+
+    def _export(self, batch: List[Dict[str, Any]]):
+        for attempt in range(self.max_retries + 1):
+            try:
+                self.send(batch)
+                self._count(exported=len(batch))
+                return
+            except Exception as e:
+                # While shutting down, one attempt per batch - exit must not wait out the backoff
+                if attempt == self.max_retries or self._stopping.is_set():
+                    logger.warning(f"Dropping {len(batch)} telemetry events after {attempt + 1} attempts: {e}")
+                    break
+                self._count(retries=1)
+                self._stopping.wait(min(self.backoff * 2 ** attempt, self.max_backoff))
+        self._count(failed_batches=1, dropped=len(batch))
+
+    def _count(self, **increments: int):
+        with self._condition:
+            for name, value in increments.items():
+                self.stats[name] += value
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch:
+                self._export(batch)
+            with self._condition:
+                self._in_flight = 0
+                self._condition.notify_all()
+                if self._stopping.is_set() and not self._events:
+                    return
+
+    def flush(self, timeout: float = TELEMETRY_TIMEOUT_SECONDS) -> bool:
+        """Wait until every queued event was exported or dropped"""
+        with self._condition:
+            self._condition.notify_all()
+            return self._condition.wait_for(lambda: not self._events and not self._in_flight, timeout=timeout)
+
+    def shutdown(self, timeout: float = TELEMETRY_TIMEOUT_SECONDS):
+        """Stop the worker after a last attempt at the queued events"""
+        self._stopping.set()
+        with self._condition:
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._condition:
+            return dict(self.stats, queued=len(self._events) + self._in_flight)
+
+
 class ObservabilityManager:
     """Manages observability setup for the RAG system with fallback handling"""
 
@@ -90,6 +234,22 @@ class ObservabilityManager:
         self.langfuse_client: Optional[object] = None
         self.tracer_provider: Optional = None
         self.enabled = ENABLE_LANGFUSE and LANGFUSE_AVAILABLE
+        # Local counters (cache hits/misses etc.) - tracked even without Langfuse
+        self.counters: Dict[str, int] = defaultdict(int)
+        self._counters_lock = threading.Lock()
+        # Traces and generations are exported through this - needs credentials, not the SDK
+        self.exporter: Optional[TelemetryExporter] = None
+
+    def initialize_telemetry(self) -> Optional[TelemetryExporter]:
+        """Start the batched, non-blocking exporter to the Langfuse ingestion API"""
+        if not ENABLE_LANGFUSE or not all([LANGFUSE_PUBLIC_KEY, LANGFUSE_SECRET_KEY]):
+            return None
+        if self.exporter is None:
+            self.exporter = TelemetryExporter(
+                LangfuseIngestionSender(LANGFUSE_HOST, LANGFUSE_PUBLIC_KEY, LANGFUSE_SECRET_KEY)
+            )
+            logger.info(f"📊 Telemetry export to {LANGFUSE_HOST} initialized")
+        return self.exporter
 
     def initialize_langfuse(self) -> Optional[object]:
         """Initialize Langfuse for LangChain observability with fallback"""
@@ -164,41 +324,70 @@ class ObservabilityManager:
         """Get the Langfuse callback handler"""
         return self.langfuse_handler if self.enabled else None
 
-    def create_trace_session(self, session_id: str, user_id: Optional[str] = None):
-        """Create a new trace session"""
-        if self.langfuse_client and self.enabled:
-            try:
-                return self.langfuse_client.trace(
-                    id=session_id,
-                    user_id=user_id,
-                    session_id=session_id
-                )
-            except Exception as e:
-                logger.error(f"Failed to create trace: {e}")
-        return None
+    def create_trace_session(self, session_id: str, user_id: Optional[str] = None) -> Optional[str]:
+        """Queue a trace for the session and return its id"""
+        if self.exporter is None:
+            return None
+        self.exporter.emit(ingestion_event("trace-create", {
+            "id": session_id,
+            "sessionId": session_id,
+            "userId": user_id,
+            "timestamp": _now(),
+        }))
+        return session_id
 
     def log_generation(self,
                       name: str,
                       input_text: str,
                       output_text: str,
                       model: str,
-                      metadata: dict = None):
-        """Log a generation event"""
-        if self.langfuse_client and self.enabled:
-            try:
-                self.langfuse_client.generation(
-                    name=name,
-                    input=input_text,
-                    output=output_text,
-                    model=model,
-                    metadata=metadata or {}
-                )
-            except Exception as e:
-                logger.error(f"Failed to log generation: {e}")
+                      metadata: dict = None,
+                      usage: dict = None):
+        """Queue a generation event, linked to its session's trace"""
+        if self.exporter is None:
+            return
+        metadata = metadata or {}
+        body = {
+            "id": str(uuid.uuid4()),
+            "traceId": metadata.get("session_id"),
+            "name": name,
+            "input": input_text,
+            "output": output_text,
+            "model": model,
+            "metadata": metadata,
+            "startTime": _now(),
+        }
+        if usage:
+            # Every LLM call made for the request; embedding tokens are in the cost but not the counts
+            body["usage"] = {
+                "input": usage["prompt_tokens"],
+                "output": usage["completion_tokens"],
+                "total": usage["prompt_tokens"] + usage["completion_tokens"],
+                "unit": "TOKENS",
+                "totalCost": usage["cost_usd"],
+            }
+            metadata["usage"] = usage
+        self.exporter.emit(ingestion_event("generation-create", body))
+
+    def get_telemetry_stats(self) -> Dict[str, int]:
+        """Queued / dropped / exported event counters of the exporter"""
+        return self.exporter.get_stats() if self.exporter is not None else {}
+
+    def increment_counter(self, name: str, value: int = 1):
+        """Increment a local counter"""
+        with self._counters_lock:
+            self.counters[name] += value
+
+    def get_counters(self) -> Dict[str, int]:
+        """Snapshot of the local counters"""
+        with self._counters_lock:
+            return dict(self.counters)
 
     def shutdown(self):
         """Shutdown observability components"""
         try:
+            if self.exporter is not None:
+                self.exporter.shutdown()
             if self.langfuse_client and self.enabled:
                 self.langfuse_client.flush()
             if self.tracer_provider and OPENTELEMETRY_AVAILABLE:
@@ -214,6 +403,7 @@ observability_manager = ObservabilityManager()
 def initialize_observability():
     """Initialize all observability components with fallback"""
     logger.info("🔧 Initializing observability...")
+    observability_manager.initialize_telemetry()
 
     if not LANGFUSE_AVAILABLE:
         logger.info("📊 Running in fallback mode - no observability tracking")
@@ -235,9 +425,22 @@ def create_trace(session_id: str, user_id: Optional[str] = None):
     """Create a new trace session"""
     return observability_manager.create_trace_session(session_id, user_id)
 
-def log_generation(name: str, input_text: str, output_text: str, model: str, metadata: dict = None):
+def log_generation(name: str, input_text: str, output_text: str, model: str, metadata: dict = None,
+                   usage: dict = None):
     """Log a generation event"""
-    observability_manager.log_generation(name, input_text, output_text, model, metadata)
+    observability_manager.log_generation(name, input_text, output_text, model, metadata, usage)
+
+def increment_counter(name: str, value: int = 1):
+    """Increment a local observability counter"""
+    observability_manager.increment_counter(name, value)
+
+def get_counters() -> Dict[str, int]:
+    """Get the local observability counters"""
+    return observability_manager.get_counters()
+
+def get_telemetry_stats() -> Dict[str, int]:
+    """Get the telemetry exporter counters"""
+    return observability_manager.get_telemetry_stats()
 
 def shutdown_observability():
     """Shutdown observability components"""
@@ -0,0 +1,288 @@
+"""
+Exact-match response cache for the /api/ask layer.
+
+Answers are keyed on the normalized question, the LLM model, the prompt
+version and the index fingerprint, and stored in a chain of tiers - an
+in-process LRU and an optional SQLite tier that survives restarts. Entries
+past their TTL are served stale while a background refresh recomputes them.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from config.settings import (
+    RESPONSE_CACHE_MAX_ENTRIES, RESPONSE_CACHE_TTL_SECONDS, RESPONSE_CACHE_STALE_SECONDS,
+    RESPONSE_CACHE_SQLITE_PATH
+)
+from src.utils import setup_logging
+from src.observability import increment_counter
+
+logger = setup_logging()
+
+
+def normalize_question(question: str) -> str:
+    """Lowercase, collapse whitespace and drop trailing punctuation"""
+    question = " ".join(question.lower().split())
+    return re.sub(r"[\s?.!]+$", "", question)
+
+
+def make_response_key(question: str, model: str, prompt_version: str, index_fingerprint: str) -> str:
+    """Cache key for an answer under a given model, prompt and index"""
+    parts = [normalize_question(question), model, prompt_version, index_fingerprint]
+    return hashlib.sha256("\x00".join(parts).encode("utf-8")).hexdigest()
+
+
+class CacheTier(ABC):
+    """Interface for a response cache storage tier"""
+
+    name = "tier"
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """The stored entry, or None"""
+
+    @abstractmethod
+    def set(self, key: str, entry: Dict[str, Any]):
+        """Store an entry, replacing any previous one"""
+
+    @abstractmethod
+    def clear(self):
+        """Drop every entry"""
+
+
+class MemoryTier(CacheTier):
+    """In-process LRU tier"""
+
+    name = "memory"
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, entry: Dict[str, Any]):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteTier(CacheTier):
+    """On-disk tier that survives restarts, pruned to the newest entries"""
+
+    name = "sqlite"
+
+    def __init__(self, path: str = RESPONSE_CACHE_SQLITE_PATH,
+                 max_entries: int = RESPONSE_CACHE_MAX_ENTRIES * 10):
+        self.max_entries = max_entries
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, entry TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT entry FROM responses WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, key: str, entry: Dict[str, Any]):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, entry, created_at) VALUES (?, ?, ?)",
+                (key, json.dumps(entry), entry["created_at"]),
+            )
+            self._writes += 1
+            # Prune occasionally rather than on every write
+            if self._writes % 100 == 0:
+                self._conn.execute(
+                    "DELETE FROM responses WHERE key NOT IN "
+                    "(SELECT key FROM responses ORDER BY created_at DESC LIMIT ?)",
+                    (self.max_entries,),
+                )
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+
+class ResponseCache:
+    """Tiered response cache with stale-while-revalidate"""
+
+    def __init__(self, tiers: List[CacheTier],
+                 ttl_seconds: float = RESPONSE_CACHE_TTL_SECONDS,
+                 stale_seconds: float = RESPONSE_CACHE_STALE_SECONDS):
+        self.tiers = tiers
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self._revalidating: set = set()
+        self._tasks: set = set()
+        self._lock = threading.Lock()
+        self.stats = {"hit": 0, "stale": 0, "miss": 0, "revalidations": 0}
+
+    def _record(self, status: str):
+        with self._lock:
+            self.stats[status] += 1
+        increment_counter(f"response_cache_{status}")
+
+    def get(self, key: str) -> Tuple[Optional[Dict[str, Any]], str]:
+        """Look a key up through the tiers - returns (entry, hit|stale|miss)"""
+        for index, tier in enumerate(self.tiers):
+            try:
+                entry = tier.get(key)
+            except Exception as e:
+                logger.error(f"Response cache {tier.name} tier read failed: {e}")
+                continue
+            if entry is None:
+                continue
+
+            age = time.time() - entry["created_at"]
+            if age > self.ttl_seconds + self.stale_seconds:
+                continue
+            # Promote to the faster tiers
+            for faster in self.tiers[:index]:
+                faster.set(key, entry)
+            return entry, ("hit" if age <= self.ttl_seconds else "stale")
+        return None, "miss"
+
+    def lookup(self, key: str) -> Tuple[Optional[Dict[str, Any]], str]:
+        """get() that also counts towards the hit/stale/miss stats"""
+        entry, status = self.get(key)
+        self._record(status)
+        return entry, status
+
+    def set(self, key: str, value: Any):
+        entry = {"value": value, "created_at": time.time()}
+        for tier in self.tiers:
+            try:
+                tier.set(key, entry)
+            except Exception as e:
+                logger.error(f"Response cache {tier.name} tier write failed: {e}")
+
+    def _claim_revalidation(self, key: str) -> bool:
+        with self._lock:
+            if key in self._revalidating:
+                return False
+            self._revalidating.add(key)
+            self.stats["revalidations"] += 1
+            return True
+
+    def _revalidate(self, key: str, compute: Callable[[], Any],
+                    cacheable: Callable[[Any], bool]):
+        """Recompute a stale entry in the background, once per key"""
+        if not self._claim_revalidation(key):
+            return
+
+        def refresh():
+            try:
+                value = compute()
+                if cacheable(value):
+                    self.set(key, value)
+            except Exception as e:
+                logger.error(f"Response cache revalidation failed: {e}")
+            finally:
+                with self._lock:
+                    self._revalidating.discard(key)
+
+        threading.Thread(target=refresh, name="response-cache-revalidate", daemon=True).start()
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any],
+                       cacheable: Callable[[Any], bool] = lambda value: True
+                       ) -> Tuple[Any, Dict[str, Any]]:
+        """Return (value, cache info), computing and storing on a miss"""
+        entry, status = self.lookup(key)
+        if entry is not None:
+            if status == "stale":
+                self._revalidate(key, compute, cacheable)
+            return entry["value"], {
+                "status": status,
+                "age_seconds": round(time.time() - entry["created_at"], 1),
+            }
+
+        value = compute()
+        if cacheable(value):
+            self.set(key, value)
+        return value, {"status": "miss", "age_seconds": 0.0}
+
+    async def aget_or_compute(self, key: str, compute: Callable[[], Awaitable[Any]],
+                              cacheable: Callable[[Any], bool] = lambda value: True
+                              ) -> Tuple[Any, Dict[str, Any]]:
+        """Async get_or_compute - stale entries are refreshed as an event loop task"""
+        entry, status = self.lookup(key)
+        if entry is not None:
+            if status == "stale" and self._claim_revalidation(key):
+                task = asyncio.get_running_loop().create_task(self._arefresh(key, compute, cacheable))
+                # Hold a reference until done so the task is not garbage collected
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+            return entry["value"], {
+                "status": status,
+                "age_seconds": round(time.time() - entry["created_at"], 1),
+            }
+
+        value = await compute()
+        if cacheable(value):
+            self.set(key, value)
+        return value, {"status": "miss", "age_seconds": 0.0}
+
+    async def _arefresh(self, key: str, compute: Callable[[], Awaitable[Any]],
+                        cacheable: Callable[[Any], bool]):
+        try:
+            value = await compute()
+            if cacheable(value):
+                self.set(key, value)
+        except Exception as e:
+            logger.error(f"Response cache revalidation failed: {e}")
+        finally:
+            with self._lock:
+                self._revalidating.discard(key)
+
+    def clear(self):
+        for tier in self.tiers:
+            tier.clear()
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats)
+        lookups = stats["hit"] + stats["stale"] + stats["miss"]
+        stats["hit_rate"] = round((stats["hit"] + stats["stale"]) / lookups, 4) if lookups else 0.0
+        stats["tiers"] = [tier.name for tier in self.tiers]
+        return stats
+
+
+def create_response_cache(sqlite_path: Optional[str] = RESPONSE_CACHE_SQLITE_PATH) -> ResponseCache:
+    """Memory tier plus, when a path is configured, the persistent SQLite tier"""
+    tiers: List[CacheTier] = [MemoryTier()]
+    if sqlite_path:
+        try:
+            tiers.append(SQLiteTier(sqlite_path))
+        except Exception as e:
+            logger.error(f"Response cache SQLite tier unavailable: {e}")
+    return ResponseCache(tiers)
@@ -0,0 +1,252 @@
+"""
+Pre-agent question router.
+
+The system prompt forces the agent to call a tool for every question, so the
+first LLM hop mostly just picks a report tool. This router classifies a
+question with keyword rules (the same lists as create_router_query_engine)
+and, optionally, cosine similarity against per-tool embedding centroids. When
+it is confident, the question is sent straight to the tool; ambiguous
+questions still go through the AgentExecutor.
+"""
+import re
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from config.settings import (
+    ROUTER_CONFIDENCE_THRESHOLD, ROUTER_EMBEDDING_MARGIN, ROUTER_DIRECT_TOOLS, ROUTER_USE_EMBEDDINGS
+)
+from src.utils import setup_logging
+from src.observability import increment_counter
+from src.vector_store import VECTOR_KEYWORDS, SUMMARY_KEYWORDS
+
+logger = setup_logging()
+
+REPORT_TOOL = "mckinsey_report_tool"
+SUMMARY_TOOL = "mckinsey_summary_tool"
+# Both answer from the report, so they never count as conflicting evidence
+REPORT_TOOLS = {REPORT_TOOL, SUMMARY_TOOL}
+
+ROUTE_KEYWORDS: Dict[str, List[str]] = {
+    REPORT_TOOL: VECTOR_KEYWORDS + [
+        "report", "document", "mckinsey", "survey", "state of ai", "respondents",
+    ],
+    SUMMARY_TOOL: SUMMARY_KEYWORDS + ["overall", "summarize", "takeaways"],
+    "web_search": [
+        "latest", "news", "today", "current", "recent", "this week", "search the web", "online",
+    ],
+    "arxiv_search": [
+        "arxiv", "paper", "papers", "academic", "preprint", "research papers", "publication",
+    ],
+}
+
+# Seed questions per tool - their mean embedding is the tool's centroid
+ROUTE_EXAMPLES: Dict[str, List[str]] = {
+    REPORT_TOOL: [
+        "Who is Lareina Yee according to the document?",
+        "What percentage of organizations use AI according to the report?",
+        "What are the main organizational changes companies are making for AI adoption?",
+        "What does the McKinsey survey say about gen AI risk mitigation?",
+    ],
+    SUMMARY_TOOL: [
+        "Give me an overview of the report",
+        "What are the key insights from the McKinsey survey?",
+        "Summarize the main takeaways of the State of AI report",
+    ],
+    "web_search": [
+        "What is the latest news about OpenAI?",
+        "What happened in AI regulation this week?",
+        "What is the current stock price of Nvidia?",
+    ],
+    "arxiv_search": [
+        "Find academic papers on retrieval augmented generation",
+        "Recent arXiv research on transformer efficiency",
+        "Are there research papers about LLM agents evaluation?",
+    ],
+}
+
+
+class RouteDecision:
+    """Outcome of routing one question"""
+
+    def __init__(self, tool: Optional[str], confidence: float, reason: str,
+                 direct: bool = False, scores: Optional[Dict[str, float]] = None):
+        self.tool = tool
+        self.confidence = confidence
+        self.reason = reason
+        self.direct = direct
+        self.scores = scores or {}
+
+    def as_dict(self) -> dict:
+        return {"tool": self.tool, "confidence": round(self.confidence, 3),
+                "reason": self.reason, "direct": self.direct}
+
+
+class QuestionRouter:
+    """Keyword + embedding-centroid classifier for the fast path"""
+
+    def __init__(self,
+                 embeddings: Optional[Embeddings] = None,
+                 threshold: float = ROUTER_CONFIDENCE_THRESHOLD,
+                 margin: float = ROUTER_EMBEDDING_MARGIN,
+                 direct_tools: Optional[List[str]] = None):
+        self.embeddings = embeddings
+        self.threshold = threshold
+        self.margin = margin
+        self.direct_tools = set(direct_tools if direct_tools is not None else ROUTER_DIRECT_TOOLS)
+        self._patterns = {
+            tool: re.compile(r"\b(" + "|".join(re.escape(k) for k in keywords) + r")\b")
+            for tool, keywords in ROUTE_KEYWORDS.items()
+        }
+        self._vector_pattern = re.compile(r"\b(" + "|".join(re.escape(k) for k in VECTOR_KEYWORDS) + r")\b")
+        self._centroids: Optional[Dict[str, np.ndarray]] = None
+        self._lock = threading.Lock()
+        # Held while the centroids are embedded, so stats and record never wait on the embeddings API
+        self._centroid_lock = threading.Lock()
+        # Running average of agent-path latency, used to estimate the saving
+        self._agent_ms: Optional[float] = None
+        self.stats = {"direct": 0, "agent": 0, "saved_ms": 0.0}
+
+    # --- Scoring ----------------------------------------------------------
+
+    def keyword_scores(self, question: str) -> Dict[str, int]:
+        """Distinct keyword hits per tool"""
+        question = question.lower()
+        hits = {tool: len(set(pattern.findall(question))) for tool, pattern in self._patterns.items()}
+        if hits[REPORT_TOOL] and hits[SUMMARY_TOOL]:
+            # Same rule as create_router_query_engine: specific-fact keywords beat overview ones
+            hits[SUMMARY_TOOL if self._vector_pattern.search(question) else REPORT_TOOL] = 0
+        return hits
+
+    @staticmethod
+    def _normalize(vectors) -> np.ndarray:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+    def _get_centroids(self) -> Dict[str, np.ndarray]:
+        """Embed the seed questions once - served from the embedding cache afterwards"""
+        if self._centroids is not None:
+            return self._centroids
+        with self._centroid_lock:
+            if self._centroids is None:
+                tools = list(ROUTE_EXAMPLES)
+                texts = [text for tool in tools for text in ROUTE_EXAMPLES[tool]]
+                vectors = self._normalize(self.embeddings.embed_documents(texts))
+                centroids, start = {}, 0
+                for tool in tools:
+                    count = len(ROUTE_EXAMPLES[tool])
+                    centroids[tool] = self._normalize(vectors[start:start + count].mean(axis=0))
+                    start += count
+                with self._lock:
+                    self._centroids = centroids
+            return self._centroids
+
+    def centroid_scores(self, vector) -> Dict[str, float]:
+        """Cosine similarity of a question vector to each tool centroid"""
+        vector = self._normalize(vector)
+        return {tool: float(centroid @ vector) for tool, centroid in self._get_centroids().items()}
+
+    def decide(self, question: str, vector=None) -> RouteDecision:
+        """Combine keyword and (when a vector is given) centroid evidence"""
+        hits = self.keyword_scores(question)
+        matched = [tool for tool, count in hits.items() if count]
+        keyword_tool = matched[0] if len(matched) == 1 else None
+
+        centroid_tool, scores = None, {}
+        if vector is not None:
+            scores = self.centroid_scores(vector)
+            ranked = sorted(scores, key=scores.get, reverse=True)
+            if scores[ranked[0]] - scores[ranked[1]] >= self.margin:
+                centroid_tool = ranked[0]
+
+        if len(matched) > 1:
+            decision = RouteDecision(centroid_tool, 0.6 if centroid_tool else 0.0,
+                                     f"keywords for {', '.join(matched)}", scores=scores)
+        elif (keyword_tool and centroid_tool and keyword_tool != centroid_tool
+              and not {keyword_tool, centroid_tool} <= REPORT_TOOLS):
+            decision = RouteDecision(None, 0.0, f"keywords say {keyword_tool}, embeddings say {centroid_tool}",
+                                     scores=scores)
+        elif keyword_tool:
+            agrees = centroid_tool == keyword_tool
+            # One stray keyword alone stays below the default threshold, so it cannot skip the agent
+            confidence = 0.95 if hits[keyword_tool] > 1 or agrees else 0.7
+            decision = RouteDecision(keyword_tool, confidence, "keywords" + (" + embeddings" if agrees else ""),
+                                     scores=scores)
+        elif centroid_tool:
+            decision = RouteDecision(centroid_tool, 0.8, "embeddings", scores=scores)
+        else:
+            decision = RouteDecision(None, 0.0, "no signal", scores=scores)
+
+        decision.direct = (decision.tool in self.direct_tools and decision.confidence >= self.threshold)
+        return decision
+
+    def route(self, question: str) -> RouteDecision:
+        vector = None
+        if self.embeddings is not None:
+            try:
+                vector = self.embeddings.embed_query(question)
+            except Exception as e:
+                logger.error(f"Router embedding failed, using keywords only: {e}")
+        return self.decide(question, vector)
+
+    async def aroute(self, question: str) -> RouteDecision:
+        vector = None
+        if self.embeddings is not None:
+            try:
+                vector = await self.embeddings.aembed_query(question)
+            except Exception as e:
+                logger.error(f"Router embedding failed, using keywords only: {e}")
+        return self.decide(question, vector)
+
+    # --- Accounting -------------------------------------------------------
+
+    def record(self, decision: RouteDecision, elapsed_ms: float):
+        """Log a routed question and track the latency saved by the fast path"""
+        with self._lock:
+            if decision.direct:
+                saved = max(0.0, self._agent_ms - elapsed_ms) if self._agent_ms is not None else None
+                self.stats["direct"] += 1
+                self.stats["saved_ms"] += saved or 0.0
+            else:
+                saved = None
+                self.stats["agent"] += 1
+                self._agent_ms = elapsed_ms if self._agent_ms is None else 0.8 * self._agent_ms + 0.2 * elapsed_ms
+
+        increment_counter("router_direct" if decision.direct else "router_agent")
+        path = f"direct → {decision.tool}" if decision.direct else "agent"
+        saved_text = f", saved ~{saved:.0f}ms" if saved is not None else ""
+        logger.info(f"🔀 Routed via {path} (confidence {decision.confidence:.2f}, "
+                    f"{decision.reason}) in {elapsed_ms:.0f}ms{saved_text}")
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats)
+            stats["agent_avg_ms"] = round(self._agent_ms, 1) if self._agent_ms is not None else None
+        stats["saved_ms"] = round(stats["saved_ms"], 1)
+        total = stats["direct"] + stats["agent"]
+        stats["direct_rate"] = round(stats["direct"] / total, 4) if total else 0.0
+        return stats
+
+
+# Global router, created on first use
+_router: Optional[QuestionRouter] = None
+_router_lock = threading.Lock()
+
+def get_router() -> QuestionRouter:
+    """Get the process-wide question router"""
+    global _router
+    with _router_lock:
+        if _router is None:
+            embeddings = None
+            if ROUTER_USE_EMBEDDINGS:
+                from src.vector_store import create_embeddings
+                embeddings = create_embeddings()
+            _router = QuestionRouter(embeddings)
+        return _router
+
+def get_router_stats() -> dict:
+    """Stats for the global router (empty until first use)"""
+    return _router.get_stats() if _router is not None else {}
@@ -0,0 +1,220 @@
+"""
+Semantic answer cache for the vector query engine.
+
+A stored answer is returned when a new query's embedding is within a cosine
+similarity threshold of a cached query. Entries are scoped by corpus version
+(and source filter) so a reindex invalidates them, and expire by TTL and LRU.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from config.settings import (
+    SEMANTIC_CACHE_THRESHOLD, SEMANTIC_CACHE_TTL_SECONDS, SEMANTIC_CACHE_MAX_ENTRIES
+)
+from src.utils import setup_logging
+from src.observability import increment_counter
+
+logger = setup_logging()
+
+Scope = Tuple[str, str]
+
+
+class CacheEntry:
+    """A cached query/answer pair"""
+
+    def __init__(self, scope: Scope, query: str, vector: np.ndarray, answer: str):
+        self.scope = scope
+        self.query = query
+        self.vector = vector
+        self.answer = answer
+        self.created_at = time.time()
+
+
+class SemanticCache:
+    """Thread-safe cosine-similarity answer cache with TTL and LRU eviction"""
+
+    def __init__(self,
+                 embeddings: Embeddings,
+                 threshold: float = SEMANTIC_CACHE_THRESHOLD,
+                 ttl_seconds: float = SEMANTIC_CACHE_TTL_SECONDS,
+                 max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES):
+        self.embeddings = embeddings
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        # Global LRU order; per-scope id lists and stacked vectors for search
+        self._entries: "OrderedDict[int, CacheEntry]" = OrderedDict()
+        self._scopes: Dict[Scope, List[int]] = {}
+        self._matrices: Dict[Scope, np.ndarray] = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    @staticmethod
+    def _normalize(vector: List[float]) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _embed(self, query: str) -> np.ndarray:
+        return self._normalize(self.embeddings.embed_query(query))
+
+    async def aembed(self, query: str) -> np.ndarray:
+        """Embed a query without blocking the event loop"""
+        return self._normalize(await self.embeddings.aembed_query(query))
+
+    def _remove(self, entry_id: int):
+        entry = self._entries.pop(entry_id)
+        ids = self._scopes[entry.scope]
+        ids.remove(entry_id)
+        if not ids:
+            del self._scopes[entry.scope]
+        self._matrices.pop(entry.scope, None)
+
+    def _invalidate_other_versions(self, corpus_version: str):
+        """Drop every entry built against another corpus version"""
+        stale = [scope for scope in self._scopes if scope[0] != corpus_version]
+        for scope in stale:
+            for entry_id in list(self._scopes[scope]):
+                self._remove(entry_id)
+            self.stats["invalidations"] += 1
+
+    def _prune_expired(self, scope: Scope):
+        """Drop a scope's entries past their TTL, so a live match is never hidden behind one"""
+        cutoff = time.time() - self.ttl_seconds
+        for entry_id in [entry_id for entry_id in self._scopes.get(scope, ())
+                         if self._entries[entry_id].created_at < cutoff]:
+            self._remove(entry_id)
+            self.stats["evictions"] += 1
+
+    def _matrix(self, scope: Scope) -> np.ndarray:
+        """Stacked, normalized query vectors for a scope (rebuilt on change)"""
+        if scope not in self._matrices:
+            self._matrices[scope] = np.stack(
+                [self._entries[entry_id].vector for entry_id in self._scopes[scope]]
+            )
+        return self._matrices[scope]
+
+    def lookup(self, query: str, corpus_version: str, source: Optional[str] = None,
+               vector: Optional[np.ndarray] = None) -> Tuple[Optional[str], np.ndarray]:
+        """Return (cached answer or None, query vector) for a query"""
+        scope = (corpus_version, source or "")
+        if vector is None:
+            vector = self._embed(query)
+
+        answer = None
+        with self._lock:
+            self._invalidate_other_versions(corpus_version)
+            self._prune_expired(scope)
+            if scope in self._scopes:
+                similarities = self._matrix(scope) @ vector
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.threshold:
+                    entry_id = self._scopes[scope][best]
+                    self._entries.move_to_end(entry_id)
+                    answer = self._entries[entry_id].answer
+                    logger.info(f"Semantic cache hit ({similarities[best]:.3f}) for: {query}")
+
+            self.stats["hits" if answer is not None else "misses"] += 1
+        increment_counter("semantic_cache_hits" if answer is not None else "semantic_cache_misses")
+        return answer, vector
+
+    def store(self, query: str, answer: str, corpus_version: str,
+              source: Optional[str] = None, vector: Optional[np.ndarray] = None):
+        """Cache an answer for a query"""
+        scope = (corpus_version, source or "")
+        if vector is None:
+            vector = self._embed(query)
+
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = CacheEntry(scope, query, vector, answer)
+            self._scopes.setdefault(scope, []).append(entry_id)
+            self._matrices.pop(scope, None)
+
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.stats["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._scopes.clear()
+            self._matrices.clear()
+
+    def get_stats(self) -> dict:
+        """Return hit/miss counters and the current size"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats["entries"] = len(self._entries)
+        total = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / total, 4) if total else 0.0
+        return stats
+
+
+def with_semantic_cache(query_engine: Callable[..., str], cache: SemanticCache,
+                        corpus_version: str) -> Callable[..., str]:
+    """Put a semantic cache in front of a vector query engine"""
+
+    def cached_query(query: str, source: Optional[str] = None) -> str:
+        try:
+            answer, vector = cache.lookup(query, corpus_version, source)
+        except Exception as e:
+            logger.error(f"Semantic cache lookup failed: {e}")
+            return query_engine(query, source=source)
+        if answer is not None:
+            return answer
+
+        answer = query_engine(query, source=source)
+        # Never cache failures
+        if not answer.startswith("Error"):
+            cache.store(query, answer, corpus_version, source, vector)
+        return answer
+
+    return cached_query
+
+
+def with_async_semantic_cache(query_engine: Callable[..., Awaitable[str]], cache: SemanticCache,
+                              corpus_version: str) -> Callable[..., Awaitable[str]]:
+    """Async counterpart of with_semantic_cache - shares the same cache"""
+
+    async def cached_query(query: str, source: Optional[str] = None) -> str:
+        try:
+            vector = await cache.aembed(query)
+            answer, _ = cache.lookup(query, corpus_version, source, vector)
+        except Exception as e:
+            logger.error(f"Semantic cache lookup failed: {e}")
+            return await query_engine(query, source=source)
+        if answer is not None:
+            return answer
+
+        answer = await query_engine(query, source=source)
+        if not answer.startswith("Error"):
+            cache.store(query, answer, corpus_version, source, vector)
+        return answer
+
+    return cached_query
+
+
+# Global semantic cache, created on first use
+_semantic_cache: Optional[SemanticCache] = None
+_semantic_cache_lock = threading.Lock()
+
+def get_semantic_cache() -> SemanticCache:
+    """Get the process-wide semantic cache"""
+    global _semantic_cache
+    with _semantic_cache_lock:
+        if _semantic_cache is None:
+            from src.vector_store import create_embeddings
+            _semantic_cache = SemanticCache(create_embeddings())
+        return _semantic_cache
+
+def get_semantic_cache_stats() -> dict:
+    """Stats for the global semantic cache (empty until first use)"""
+    return _semantic_cache.get_stats() if _semantic_cache is not None else {}
@@ -0,0 +1,254 @@
+"""
+Precomputed hierarchical summary index.
+
+At ingestion every report is split into page-range sections; each section is
+summarized once and the section summaries are rolled up into a whole-document
+summary. Summaries (and their embeddings) are persisted next to Chroma and
+keyed by corpus version, so overview questions are answered with one cheap
+lookup and a single LLM call instead of a per-query map-reduce.
+"""
+import hashlib
+import json
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models import BaseChatModel
+from langchain_openai import ChatOpenAI
+
+from config.settings import (
+    CHROMA_DB_DIR, LLM_MODEL, SUMMARY_PAGES_PER_SECTION, SUMMARY_TOP_SECTIONS, SUMMARY_MAX_CONCURRENCY
+)
+from src.utils import setup_logging
+from src.ingestion import read_manifest
+from src.usage import llm_callbacks
+
+logger = setup_logging()
+
+SUMMARY_INDEX_FILE = "summary_index.json"
+
+SECTION_PROMPT = """Summarize this section of the report "{file_name}" (pages {first_page}-{last_page}) in 4-6 sentences.
+Keep the key findings, figures, statistics and the people quoted.
+
+{text}"""
+
+DOCUMENT_PROMPT = """Write an overview of the report "{file_name}" from the section summaries below.
+Start with two sentences on what the report covers, then list its key insights as bullet points.
+
+{text}"""
+
+ANSWER_PROMPT = """Answer the question using only these precomputed summaries of the report.
+
+{text}
+
+Question: {question}"""
+
+
+def _section_key(chunks: List[Document]) -> str:
+    """Changes when any chunk in the section (or the LLM) changes"""
+    digest = hashlib.sha256(LLM_MODEL.encode("utf-8"))
+    for chunk in chunks:
+        digest.update(chunk.metadata.get("content_hash", chunk.page_content).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def group_sections(chunks: List[Document],
+                   pages_per_section: int = SUMMARY_PAGES_PER_SECTION) -> Dict[str, List[dict]]:
+    """Group chunks by source file into consecutive page-range sections"""
+    by_source: Dict[str, List[Document]] = {}
+    for chunk in chunks:
+        by_source.setdefault(chunk.metadata.get("source", "unknown"), []).append(chunk)
+
+    sections: Dict[str, List[dict]] = {}
+    for source, source_chunks in by_source.items():
+        source_chunks.sort(key=lambda chunk: (chunk.metadata.get("page", 0), chunk.metadata.get("content_hash", "")))
+        groups: Dict[int, List[Document]] = {}
+        for chunk in source_chunks:
+            groups.setdefault(chunk.metadata.get("page", 0) // pages_per_section, []).append(chunk)
+        sections[source] = [
+            {
+                "key": _section_key(group),
+                "pages": [group[0].metadata.get("page", 0), group[-1].metadata.get("page", 0)],
+                "text": "\n\n".join(chunk.page_content for chunk in group),
+            }
+            for _, group in sorted(groups.items())
+        ]
+    return sections
+
+
+class SummaryIndex:
+    """Section and document summaries for one corpus version"""
+
+    def __init__(self, corpus_version: str, documents: List[Dict[str, Any]]):
+        self.corpus_version = corpus_version
+        self.documents = documents
+
+    @property
+    def key(self) -> str:
+        """Hash of every section key - changes when any summarized chunk does"""
+        return _corpus_key(self.documents)
+
+    @classmethod
+    def load(cls, persist_directory: str = CHROMA_DB_DIR) -> Optional["SummaryIndex"]:
+        """Load the persisted index, if any"""
+        path = os.path.join(persist_directory, SUMMARY_INDEX_FILE)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return cls(data["corpus_version"], data["documents"])
+
+    def save(self, persist_directory: str = CHROMA_DB_DIR):
+        """Atomically write the index next to the Chroma files"""
+        path = os.path.join(persist_directory, SUMMARY_INDEX_FILE)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "corpus_version": self.corpus_version,
+                "model": LLM_MODEL,
+                "built_at": time.time(),
+                "documents": self.documents,
+            }, f)
+        os.replace(tmp_path, path)
+
+    def sections(self, source: Optional[str] = None) -> List[Dict[str, Any]]:
+        return [dict(section, file_name=document["file_name"])
+                for document in self.documents if _matches(document, source)
+                for section in document["sections"]]
+
+
+def _matches(document: Dict[str, Any], source: Optional[str]) -> bool:
+    return not source or source in (document["source"], document["file_name"])
+
+
+def _document_key(sections: List[dict]) -> str:
+    return hashlib.sha256("".join(section["key"] for section in sections).encode("ascii")).hexdigest()
+
+
+def _corpus_key(documents: List[dict]) -> str:
+    return hashlib.sha256("".join(sorted(document["key"] for document in documents)).encode("ascii")).hexdigest()
+
+
+def build_summary_index(vector_store,
+                        persist_directory: str = CHROMA_DB_DIR,
+                        llm: Optional[BaseChatModel] = None,
+                        embeddings: Optional[Embeddings] = None,
+                        pages_per_section: int = SUMMARY_PAGES_PER_SECTION,
+                        max_concurrency: int = SUMMARY_MAX_CONCURRENCY) -> Dict[str, Any]:
+    """Build (or reuse) the summary index for the current corpus version.
+
+    Sections whose chunks are unchanged keep their earlier summaries, so only
+    edited parts of the corpus cost LLM calls.
+    """
+    from src.vector_store import load_chunks_from_store, create_embeddings
+
+    started = time.perf_counter()
+    corpus_version = (read_manifest(persist_directory) or {}).get("corpus_version", "unversioned")
+    grouped = group_sections(load_chunks_from_store(vector_store), pages_per_section)
+    document_keys = {source: _document_key(sections) for source, sections in grouped.items()}
+
+    existing = SummaryIndex.load(persist_directory)
+    if existing is not None and existing.key == _corpus_key([{"key": key} for key in document_keys.values()]):
+        logger.info("Summary index is up to date")
+        return {"sections": len(existing.sections()), "summarized": 0, "reused": True}
+
+    llm = llm or ChatOpenAI(model=LLM_MODEL, temperature=0, callbacks=llm_callbacks("summary_index"))
+    embeddings = embeddings or create_embeddings()
+    previous = {section["key"]: section for section in (existing.sections() if existing else [])}
+    previous_documents = {document["source"]: document for document in (existing.documents if existing else [])}
+    config = {"max_concurrency": max_concurrency}
+
+    # Level 1: section summaries, only for new or changed sections
+    pending = [(source, section) for source, sections in grouped.items()
+               for section in sections if section["key"] not in previous]
+    prompts = [SECTION_PROMPT.format(file_name=os.path.basename(source), first_page=section["pages"][0],
+                                     last_page=section["pages"][1], text=section["text"])
+               for source, section in pending]
+    for (_, section), message in zip(pending, llm.batch(prompts, config=config) if prompts else []):
+        section["summary"] = message.content
+    for sections in grouped.values():
+        for section in sections:
+            if section["key"] in previous:
+                section["summary"] = previous[section["key"]]["summary"]
+                section["vector"] = previous[section["key"]]["vector"]
+            del section["text"]
+
+    # Level 2: whole-document summaries from the section summaries
+    documents, document_prompts = [], []
+    for source, sections in grouped.items():
+        document = {"source": source, "file_name": os.path.basename(source),
+                    "key": document_keys[source], "sections": sections}
+        old = previous_documents.get(source)
+        if old is not None and old.get("key") == document["key"]:
+            document["summary"], document["vector"] = old["summary"], old["vector"]
+        else:
+            document_prompts.append((document, DOCUMENT_PROMPT.format(
+                file_name=document["file_name"],
+                text="\n\n".join(f"Pages {s['pages'][0]}-{s['pages'][1]}: {s['summary']}" for s in sections),
+            )))
+        documents.append(document)
+    if document_prompts:
+        messages = llm.batch([prompt for _, prompt in document_prompts], config=config)
+        for (document, _), message in zip(document_prompts, messages):
+            document["summary"] = message.content
+
+    # Embed new summaries once so queries only embed the question
+    unembedded = [item for document in documents for item in [document] + document["sections"]
+                  if "vector" not in item]
+    if unembedded:
+        vectors = embeddings.embed_documents([item["summary"] for item in unembedded])
+        for item, vector in zip(unembedded, vectors):
+            item["vector"] = [float(x) for x in vector]
+
+    SummaryIndex(corpus_version, documents).save(persist_directory)
+    stats = {
+        "sections": sum(len(document["sections"]) for document in documents),
+        "summarized": len(pending) + len(document_prompts),
+        "reused": False,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+    logger.info(f"Built summary index: {stats}")
+    return stats
+
+
+def create_summary_index_query_engine(index: SummaryIndex,
+                                      llm: Optional[BaseChatModel] = None,
+                                      embeddings: Optional[Embeddings] = None,
+                                      top_sections: int = SUMMARY_TOP_SECTIONS) -> Callable[..., str]:
+    """Answer overview questions from the summary index with one LLM call"""
+    from src.vector_store import create_embeddings
+
+    llm = llm or ChatOpenAI(model=LLM_MODEL, temperature=0, callbacks=llm_callbacks("summary_llm"))
+    embeddings = embeddings or create_embeddings()
+
+    def summary_index_query(query: str, source: Optional[str] = None) -> str:
+        try:
+            logger.info(f"Summary index search for: {query}")
+            documents = [document for document in index.documents if _matches(document, source)]
+            sections = index.sections(source)
+            if not documents:
+                return "No summaries available for this report."
+
+            # Most relevant section summaries by cosine similarity
+            if sections:
+                matrix = np.asarray([section["vector"] for section in sections], dtype=np.float32)
+                vector = np.asarray(embeddings.embed_query(query), dtype=np.float32)
+                scores = matrix @ vector / (np.linalg.norm(matrix, axis=1) * np.linalg.norm(vector) + 1e-9)
+                sections = [sections[i] for i in np.argsort(-scores)[:top_sections]]
+                sections.sort(key=lambda section: (section["file_name"], section["pages"][0]))
+
+            text = "\n\n".join(
+                [f"Overview of {document['file_name']}:\n{document['summary']}" for document in documents] +
+                [f"{section['file_name']} pages {section['pages'][0]}-{section['pages'][1]}:\n{section['summary']}"
+                 for section in sections]
+            )
+            return llm.invoke(ANSWER_PROMPT.format(text=text, question=query)).content
+        except Exception as e:
+            logger.error(f"Error in summary index query: {e}")
+            return f"Error in summarization: {e}"
+
+    return summary_index_query
@@ -1,34 +1,81 @@
-from typing import List, Callable, TypedDict
-from langchain_core.tools import Tool, tool
+import asyncio
+from typing import List, Callable, Optional, TypedDict
+from langchain_core.tools import Tool, StructuredTool
 from langchain_community.utilities import SerpAPIWrapper, ArxivAPIWrapper
 
 from src.utils import setup_logging
+from src.metrics import timed
+from src.usage import attributed_to
 logger = setup_logging()
 
 # ---------------------------------------------------------------------------
 # McKinsey report tool with strict argument schema
 # ---------------------------------------------------------------------------
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 class McKinseyToolInput(BaseModel):
     query: str
+    source: Optional[str] = Field(
+        default=None,
+        description="Optional report file name (e.g. state.pdf) to restrict the search to",
+    )
 
-@tool(args_schema=McKinseyToolInput)
-def mckinsey_report_tool(query: str) -> str:
+@timed("tool:mckinsey_report_tool")
+@attributed_to("mckinsey_report_tool")
+def mckinsey_report(query: str, source: Optional[str] = None) -> str:
     """Search the McKinsey State of AI March 2025 report for a specific question."""
     from src.document_processor import answer_question
     logger.info(f"→ mckinsey_report_tool called with query: {query}")
-    return answer_question(query)
+    return answer_question(query, source=source)
+
+@timed("tool:mckinsey_report_tool")
+@attributed_to("mckinsey_report_tool")
+async def amckinsey_report(query: str, source: Optional[str] = None) -> str:
+    """Async version used when the agent runs under ainvoke."""
+    from src.document_processor import aanswer_question
+    logger.info(f"→ mckinsey_report_tool (async) called with query: {query}")
+    return await aanswer_question(query, source=source)
+
+mckinsey_report_tool = StructuredTool.from_function(
+    func=mckinsey_report,
+    coroutine=amckinsey_report,
+    name="mckinsey_report_tool",
+    description="Search the McKinsey State of AI March 2025 report for a specific question.",
+    args_schema=McKinseyToolInput,
+)
+
+@timed("tool:mckinsey_summary_tool")
+@attributed_to("mckinsey_summary_tool")
+def mckinsey_summary(query: str, source: Optional[str] = None) -> str:
+    """Answer overview and key-insight questions about the McKinsey report."""
+    from src.document_processor import summarize_question
+    logger.info(f"→ mckinsey_summary_tool called with query: {query}")
+    return summarize_question(query, source=source)
+
+async def amckinsey_summary(query: str, source: Optional[str] = None) -> str:
+    """Async version - the summary index lookup is quick, so it runs in a thread."""
+    return await asyncio.to_thread(mckinsey_summary, query, source)
+
+mckinsey_summary_tool = StructuredTool.from_function(
+    func=mckinsey_summary,
+    coroutine=amckinsey_summary,
+    name="mckinsey_summary_tool",
+    description="Overview, summary or key insights of the McKinsey State of AI March 2025 report. "
+                "Use mckinsey_report_tool for specific facts, people or numbers.",
+    args_schema=McKinseyToolInput,
+)
 
 # ---------------------------------------------------------------------------
-# Web and ArXiv search tools (unchanged)
+# Web and ArXiv search tools
 # ---------------------------------------------------------------------------
 
-def create_web_search_tool() -> Tool:
-    """Create web search tool using SERP API"""
-    search = SerpAPIWrapper()
+def create_web_search_tool(search=None) -> Tool:
+    """Create web search tool using SERP API - or any wrapper with run / arun"""
+    search = search or SerpAPIWrapper()
 
+    @timed("tool:web_search")
+    @attributed_to("web_search")
     def web_search(query: str) -> str:
         try:
             return search.run(query)
@@ -36,16 +83,28 @@ def create_web_search_tool() -> Tool:
             logger.error(f"Error in web search: {e}")
             return f"Error in web search: {e}"
 
+    @timed("tool:web_search")
+    @attributed_to("web_search")
+    async def aweb_search(query: str) -> str:
+        try:
+            return await search.arun(query)
+        except Exception as e:
+            logger.error(f"Error in web search: {e}")
+            return f"Error in web search: {e}"
+
     return Tool(
         name="web_search",
         description="Search the web for current information, recent news, or info not in the McKinsey report.",
         func=web_search,
+        coroutine=aweb_search,
     )
 
-def create_arxiv_tool() -> Tool:
-    """Create ArXiv search tool"""
-    arxiv = ArxivAPIWrapper()
+def create_arxiv_tool(arxiv=None) -> Tool:
+    """Create ArXiv search tool - arxiv may be any wrapper with run"""
+    arxiv = arxiv or ArxivAPIWrapper()
 
+    @timed("tool:arxiv_search")
+    @attributed_to("arxiv_search")
     def arxiv_search(query: str) -> str:
         try:
             return arxiv.run(query)
@@ -53,20 +112,26 @@ def create_arxiv_tool() -> Tool:
             logger.error(f"Error in ArXiv search: {e}")
             return f"Error in ArXiv search: {e}"
 
+    async def aarxiv_search(query: str) -> str:
+        # The arxiv client is synchronous - keep it off the event loop
+        return await asyncio.to_thread(arxiv_search, query)
+
     return Tool(
         name="arxiv_search",
         description="Search ArXiv for academic research papers. Only use when asked for academic material.",
         func=arxiv_search,
+        coroutine=aarxiv_search,
     )
 
 # ---------------------------------------------------------------------------
 # Combine all tools
 # ---------------------------------------------------------------------------
 
-def create_all_tools() -> List[Tool]:
-    """Create all tools for the agent."""
+def create_all_tools(search=None, arxiv=None) -> List[Tool]:
+    """Create all tools for the agent - benchmarks pass offline search and arxiv backends."""
     return [
         mckinsey_report_tool,
-        create_web_search_tool(),
-        create_arxiv_tool(),
+        mckinsey_summary_tool,
+        create_web_search_tool(search),
+        create_arxiv_tool(arxiv),
     ]
\ No newline at end of file
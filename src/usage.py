@@ -0,0 +1,289 @@
+"""
+Token and cost accounting.
+
+A callback handler on every ChatOpenAI client records prompt and completion
+tokens, and a wrapper around the OpenAI embeddings client (below the cache,
+so hits cost nothing) records embedding tokens. Calls are attributed to the
+request in scope through a context variable, broken down by stage and tool,
+and added to a per-session ledger that backs the session token budget.
+"""
+import functools
+import inspect
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.embeddings import Embeddings
+
+from config.settings import (
+    LLM_INPUT_COST_PER_1M, LLM_OUTPUT_COST_PER_1M, EMBEDDING_COST_PER_1M,
+    SESSION_TOKEN_BUDGET, BUDGET_ACTION, BUDGET_REQUEST_ESTIMATE_TOKENS, USAGE_MAX_SESSIONS
+)
+from src.utils import setup_logging, count_tokens
+
+logger = setup_logging()
+
+_current_usage: ContextVar[Optional["RequestUsage"]] = ContextVar("current_usage", default=None)
+_current_tool: ContextVar[Optional[str]] = ContextVar("current_tool", default=None)
+
+
+def llm_cost(prompt_tokens: int, completion_tokens: int) -> float:
+    return (prompt_tokens * LLM_INPUT_COST_PER_1M + completion_tokens * LLM_OUTPUT_COST_PER_1M) / 1_000_000
+
+
+def embedding_cost(tokens: int) -> float:
+    return tokens * EMBEDDING_COST_PER_1M / 1_000_000
+
+
+def _empty_totals() -> Dict[str, Any]:
+    return {"prompt_tokens": 0, "completion_tokens": 0, "embedding_tokens": 0,
+            "total_tokens": 0, "llm_calls": 0, "embedding_calls": 0, "cost_usd": 0.0}
+
+
+def _add(totals: Dict[str, Any], other: Dict[str, Any]):
+    for name, value in other.items():
+        totals[name] = totals.get(name, 0) + value
+
+
+class RequestUsage:
+    """Tokens and cost of one request, by stage and by tool"""
+
+    def __init__(self, session_id: Optional[str] = None):
+        self.session_id = session_id
+        self.totals = _empty_totals()
+        self.by_stage: Dict[str, Dict[str, Any]] = {}
+        self.by_tool: Dict[str, Dict[str, Any]] = {}
+        # Set by the budget guard: "downgraded" or "rejected"
+        self.budget_action: Optional[str] = None
+        self.closed = False
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, tool: Optional[str], delta: Dict[str, Any]):
+        with self._lock:
+            _add(self.totals, delta)
+            _add(self.by_stage.setdefault(stage, {}), delta)
+            if tool:
+                _add(self.by_tool.setdefault(tool, {}), delta)
+
+    def as_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            usage = {name: round(value, 6) if name == "cost_usd" else value
+                     for name, value in self.totals.items()}
+            usage["by_stage"] = {stage: dict(totals) for stage, totals in self.by_stage.items()}
+            usage["by_tool"] = {tool: dict(totals) for tool, totals in self.by_tool.items()}
+            if self.budget_action:
+                usage["budget_action"] = self.budget_action
+            return usage
+
+
+class SessionLedger:
+    """Token totals per session, least recently used sessions evicted first"""
+
+    def __init__(self, budget: int = SESSION_TOKEN_BUDGET, action: str = BUDGET_ACTION,
+                 request_estimate: int = BUDGET_REQUEST_ESTIMATE_TOKENS,
+                 max_sessions: int = USAGE_MAX_SESSIONS):
+        self.budget = budget
+        self.action = action
+        self.request_estimate = request_estimate
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.totals = _empty_totals()
+        self.stats = {"requests": 0, "downgraded": 0, "rejected": 0}
+        self._lock = threading.Lock()
+
+    def add(self, session_id: Optional[str], totals: Dict[str, Any], requests: int = 0):
+        with self._lock:
+            _add(self.totals, totals)
+            self.stats["requests"] += requests
+            if not session_id:
+                return
+            session = self._sessions.pop(session_id, None) or {**_empty_totals(), "requests": 0}
+            _add(session, totals)
+            session["requests"] += requests
+            self._sessions[session_id] = session
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def get_session(self, session_id: Optional[str]) -> Dict[str, Any]:
+        with self._lock:
+            session = self._sessions.get(session_id) if session_id else None
+            return dict(session) if session else {**_empty_totals(), "requests": 0}
+
+    def check(self, session_id: Optional[str]) -> str:
+        """"ok", "downgrade" or "reject" for the session's next request"""
+        if self.budget <= 0 or not session_id:
+            return "ok"
+        session = self.get_session(session_id)
+        used = session["total_tokens"]
+        # The session's own average is the best guess at what the next request costs
+        estimate = used / session["requests"] if session["requests"] else self.request_estimate
+        if used >= self.budget:
+            decision = "reject"
+        elif used + estimate > self.budget:
+            decision = "downgrade" if self.action == "downgrade" else "reject"
+        else:
+            return "ok"
+        with self._lock:
+            self.stats["downgraded" if decision == "downgrade" else "rejected"] += 1
+        return decision
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**{name: round(value, 6) if name == "cost_usd" else value
+                       for name, value in self.totals.items()},
+                    **self.stats, "sessions": len(self._sessions), "session_budget": self.budget}
+
+
+# Global session ledger
+session_ledger = SessionLedger()
+
+
+@contextmanager
+def track_usage(session_id: Optional[str] = None) -> Iterator[RequestUsage]:
+    """Meter the calls made in this block - nested blocks share the outermost request"""
+    usage = _current_usage.get()
+    # A background refresh may outlive the request it was started from
+    if usage is not None and not usage.closed:
+        yield usage
+        return
+    usage = RequestUsage(session_id)
+    token = _current_usage.set(usage)
+    try:
+        yield usage
+    finally:
+        _current_usage.reset(token)
+        usage.closed = True
+        session_ledger.add(session_id, usage.totals, requests=1)
+
+
+def current_usage() -> Optional[RequestUsage]:
+    return _current_usage.get()
+
+
+def _record(stage: str, delta: Dict[str, Any]):
+    usage = _current_usage.get()
+    if usage is not None and not usage.closed:
+        usage.record(stage, _current_tool.get(), delta)
+    else:
+        # Ingestion and index builds run outside any request
+        session_ledger.add(None, delta)
+
+
+@contextmanager
+def tool_scope(name: str):
+    """Attribute the calls made in this block to a tool"""
+    token = _current_tool.set(name)
+    try:
+        yield
+    finally:
+        _current_tool.reset(token)
+
+
+def attributed_to(name: str):
+    """Decorator form of tool_scope for sync and async tool functions"""
+    def decorate(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with tool_scope(name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with tool_scope(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def _token_usage(response: Any) -> Optional[Dict[str, int]]:
+    """Prompt / completion tokens from an LLMResult - per-message metadata, else the provider's totals"""
+    prompt = completion = 0
+    found = False
+    for generations in getattr(response, "generations", None) or []:
+        for generation in generations:
+            metadata = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if metadata:
+                prompt += metadata.get("input_tokens", 0)
+                completion += metadata.get("output_tokens", 0)
+                found = True
+    if not found:
+        token_usage = (getattr(response, "llm_output", None) or {}).get("token_usage") or {}
+        if not token_usage:
+            return None
+        prompt, completion = token_usage.get("prompt_tokens", 0), token_usage.get("completion_tokens", 0)
+    return {"prompt_tokens": prompt, "completion_tokens": completion}
+
+
+class TokenUsageHandler(BaseCallbackHandler):
+    """Callback handler recording the token usage of each LLM call of the model it is attached to"""
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def on_llm_end(self, response: Any, *, run_id: UUID, **kwargs: Any):
+        tokens = _token_usage(response)
+        if tokens is None:
+            return
+        prompt, completion = tokens["prompt_tokens"], tokens["completion_tokens"]
+        _record(self.stage, {"prompt_tokens": prompt, "completion_tokens": completion,
+                             "total_tokens": prompt + completion, "llm_calls": 1,
+                             "cost_usd": llm_cost(prompt, completion)})
+
+
+def llm_callbacks(stage: str) -> List[BaseCallbackHandler]:
+    """Latency and token handlers for a ChatOpenAI client serving one stage"""
+    from src.metrics import LLMTimingHandler
+    return [LLMTimingHandler(stage), TokenUsageHandler(stage)]
+
+
+class MeteredEmbeddings(Embeddings):
+    """Counts the tokens sent to the embeddings API - wrap it below any cache"""
+
+    def __init__(self, underlying: Embeddings, stage: str = "embedding"):
+        self.underlying = underlying
+        self.stage = stage
+
+    def _record(self, texts: List[str]):
+        tokens = sum(count_tokens(text) for text in texts)
+        _record(self.stage, {"embedding_tokens": tokens, "total_tokens": tokens,
+                             "embedding_calls": 1, "cost_usd": embedding_cost(tokens)})
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors = self.underlying.embed_documents(texts)
+        self._record(texts)
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        vector = self.underlying.embed_query(text)
+        self._record([text])
+        return vector
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors = await self.underlying.aembed_documents(texts)
+        self._record(texts)
+        return vectors
+
+    async def aembed_query(self, text: str) -> List[float]:
+        vector = await self.underlying.aembed_query(text)
+        self._record([text])
+        return vector
+
+
+def check_budget(session_id: Optional[str]) -> str:
+    """Budget guard decision for the session's next request"""
+    return session_ledger.check(session_id)
+
+
+def get_session_usage(session_id: Optional[str]) -> Dict[str, Any]:
+    return session_ledger.get_session(session_id)
+
+
+def get_usage_stats() -> Dict[str, Any]:
+    """Process-wide token and cost totals plus budget guard counters"""
+    return session_ledger.get_stats()
@@ -1,6 +1,5 @@
 import logging
 import os
-from typing import Any, Dict
 
 def setup_logging(level: str = "INFO"):
     """Setup logging configuration"""
@@ -25,7 +24,25 @@ def validate_api_keys():
 
 def ensure_directories():
     """Ensure required directories exist"""
-    from config.settings import DATA_DIR, CHROMA_DB_DIR
+    from config.settings import DATA_DIR, CHROMA_DB_DIR, CACHE_DIR
     
     os.makedirs(DATA_DIR, exist_ok=True)
     os.makedirs(CHROMA_DB_DIR, exist_ok=True)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+
+_token_encoder = None
+_token_encoder_loaded = False
+
+def count_tokens(text: str) -> int:
+    """Count tokens with tiktoken, falling back to ~4 characters per token offline"""
+    global _token_encoder, _token_encoder_loaded
+    if not _token_encoder_loaded:
+        _token_encoder_loaded = True
+        try:
+            import tiktoken
+            _token_encoder = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            _token_encoder = None
+    if _token_encoder is not None:
+        return len(_token_encoder.encode(text, disallowed_special=()))
+    return max(1, len(text) // 4)
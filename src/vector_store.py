@@ -1,51 +1,188 @@
-from typing import List, Optional, Callable
-from langchain_core.documents import Document
+import asyncio
+from typing import Any, Awaitable, Dict, List, Optional, Callable
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun, CallbackManagerForRetrieverRun
+from langchain_core.documents import BaseDocumentCompressor, Document
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.vectorstores import VectorStore
 from langchain_openai import OpenAIEmbeddings, ChatOpenAI
 from langchain_chroma import Chroma
+import chromadb
+from chromadb.api.client import SharedSystemClient
 from langchain.chains import RetrievalQA
+from langchain.chains.combine_documents.base import BaseCombineDocumentsChain
+from langchain.chains.question_answering import load_qa_chain
+from langchain.retrievers import ContextualCompressionRetriever
+from langchain.retrievers.document_compressors import DocumentCompressorPipeline
 from langchain.chains.summarize import load_summarize_chain
-from config.settings import EMBEDDING_MODEL, CHROMA_DB_DIR, LLM_MODEL, VECTOR_SEARCH_K
+from config.settings import (
+    EMBEDDING_MODEL, EMBEDDING_DIMENSIONS, CHROMA_DB_DIR, LLM_MODEL, VECTOR_SEARCH_K,
+    INCREMENTAL_INGESTION, EMBEDDING_CACHE_ENABLED, BATCH_MAX_CONCURRENCY,
+    HYBRID_SEARCH_K, HYBRID_FETCH_K, RRF_K, RERANK_ENABLED, RERANK_FETCH_K, VECTOR_BACKEND,
+    METRICS_ENABLED
+)
 from src.utils import setup_logging
+from src.metrics import TimedEmbeddings, stage_timer, timed
+from src.usage import MeteredEmbeddings, llm_callbacks
+from src.keyword_index import KeywordIndex
+from src.reranker import LexicalReranker
+from src.context_compression import SentenceIndex, SentenceCompressor
+from src.numpy_store import NumpyVectorStore, load_numpy_store
 import shutil
 import os
+import time
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from pydantic import ConfigDict
 
 logger = setup_logging()
 
+# Files Chroma writes for every persisted HNSW vector segment
+HNSW_SEGMENT_FILES = ("header.bin", "data_level0.bin", "length.bin", "link_lists.bin")
+
+# Shared by every sync hybrid search - BM25 runs here while the caller embeds the query
+_keyword_search_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="keyword_search")
+
 def create_embeddings():
-    """Create OpenAI embeddings instance"""
-    return OpenAIEmbeddings(model=EMBEDDING_MODEL)
+    """Create OpenAI embeddings instance, behind the persistent cache when enabled"""
+    # Metered below the cache, so only tokens actually sent to OpenAI are counted
+    embeddings = MeteredEmbeddings(OpenAIEmbeddings(model=EMBEDDING_MODEL))
+    if EMBEDDING_CACHE_ENABLED:
+        from src.embedding_cache import wrap_embeddings
+        embeddings = wrap_embeddings(embeddings, EMBEDDING_MODEL)
+    return TimedEmbeddings(embeddings) if METRICS_ENABLED else embeddings
 
-def rebuild_vector_store_fresh(chunks: List[Document], persist_directory: str = CHROMA_DB_DIR) -> Optional[Chroma]:
-    """Rebuild vector store completely from scratch - FIXED VERSION"""
-    logger.info("Rebuilding vector store from scratch...")
-    
-    # Remove existing vector store completely
+def reset_vector_store(persist_directory: str = CHROMA_DB_DIR):
+    """Remove an existing vector store completely"""
     if os.path.exists(persist_directory):
         shutil.rmtree(persist_directory)
+        # Chroma caches clients per path; drop them so the new store starts clean
+        SharedSystemClient.clear_system_cache()
         logger.info(f"Removed existing vector store at {persist_directory}")
+
+def serving_store(vector_store: Chroma, persist_directory: str = CHROMA_DB_DIR) -> VectorStore:
+    """The store questions are answered from - Chroma itself, or its NumPy snapshot"""
+    if VECTOR_BACKEND == "numpy":
+        return load_numpy_store(persist_directory, vector_store.embeddings, vector_store)
+    if VECTOR_BACKEND != "chroma":
+        raise ValueError(f"Unknown VECTOR_BACKEND: {VECTOR_BACKEND}")
+    return vector_store
+
+def rebuild_vector_store_fresh(chunks: List[Document], persist_directory: str = CHROMA_DB_DIR) -> Optional[VectorStore]:
+    """Rebuild vector store completely from scratch - re-embeds every chunk"""
+    from src.ingestion import sync_vector_store
+
+    logger.info("Rebuilding vector store from scratch...")
+    reset_vector_store(persist_directory)
     
     if not chunks:
         logger.error("No chunks provided for vector store creation")
         return None
     
     try:
-        embeddings = create_embeddings()
-        vector_store = Chroma.from_documents(
-            documents=chunks,
-            embedding=embeddings,
-            persist_directory=persist_directory
-        )
-        logger.info(f"Created fresh vector store with {len(chunks)} chunks")
-        return vector_store
+        # Syncing into an empty store embeds everything under content-hashed ids
+        vector_store, stats = sync_vector_store(chunks, persist_directory)
+        logger.info(f"Created fresh vector store with {stats['chunks']} chunks")
+        return serving_store(vector_store, persist_directory)
     except Exception as e:
         logger.error(f"Error creating vector store: {e}")
         return None
 
-def create_vector_index(chunks: List[Document], persist_directory: str = CHROMA_DB_DIR) -> Optional[Chroma]:
-    """Create vector index - Always rebuild for consistent results"""
+def update_vector_store(chunks: List[Document], persist_directory: str = CHROMA_DB_DIR) -> Optional[VectorStore]:
+    """Incrementally update the vector store - only new or changed chunks are embedded"""
+    from src.ingestion import sync_vector_store
+
+    if not chunks:
+        logger.error("No chunks provided for vector store update")
+        return None
+
+    try:
+        vector_store, stats = sync_vector_store(chunks, persist_directory)
+        return serving_store(vector_store, persist_directory)
+    except Exception as e:
+        logger.error(f"Error updating vector store: {e}")
+        return None
+
+def create_vector_index(chunks: List[Document], persist_directory: str = CHROMA_DB_DIR) -> Optional[VectorStore]:
+    """Create vector index - incremental by default, full rebuild when disabled"""
+    if INCREMENTAL_INGESTION:
+        return update_vector_store(chunks, persist_directory)
     return rebuild_vector_store_fresh(chunks, persist_directory)
 
-def load_existing_vector_store(persist_directory: str = CHROMA_DB_DIR) -> Optional[Chroma]:
+def check_vector_store_health(persist_directory: str = CHROMA_DB_DIR,
+                              vector_store: Optional[Chroma] = None) -> Dict[str, Any]:
+    """Validate the on-disk index without embedding anything.
+
+    Checks that the collection exists, holds documents whose embeddings have
+    the configured dimensionality, and that the HNSW segment files are on disk.
+    """
+    started = time.perf_counter()
+    report: Dict[str, Any] = {
+        "healthy": False,
+        "persist_directory": persist_directory,
+        "collection": None,
+        "document_count": 0,
+        "embedding_dimensions": None,
+        "segments": {},
+        "errors": [],
+        "warnings": [],
+    }
+
+    try:
+        if not os.path.exists(persist_directory):
+            report["errors"].append("Persist directory does not exist")
+            return report
+
+        if not os.path.exists(os.path.join(persist_directory, "chroma.sqlite3")):
+            report["errors"].append("chroma.sqlite3 not found")
+            return report
+
+        # Opened read-only - Chroma() would create a missing collection and report it healthy
+        if vector_store is None:
+            client = chromadb.PersistentClient(path=persist_directory)
+            try:
+                collection = client.get_collection(Chroma._LANGCHAIN_DEFAULT_COLLECTION_NAME)
+            except Exception:
+                report["errors"].append(f"Collection '{Chroma._LANGCHAIN_DEFAULT_COLLECTION_NAME}' not found")
+                return report
+        else:
+            collection = vector_store._collection
+        report["collection"] = collection.name
+        report["document_count"] = collection.count()
+
+        if report["document_count"] == 0:
+            report["errors"].append("Collection is empty")
+        else:
+            sample = collection.get(limit=1, include=["embeddings"])
+            dimensions = len(sample["embeddings"][0])
+            report["embedding_dimensions"] = dimensions
+            if dimensions != EMBEDDING_DIMENSIONS:
+                report["errors"].append(
+                    f"Embedding dimensions {dimensions} != expected {EMBEDDING_DIMENSIONS}"
+                )
+
+        # HNSW segments live in one sub-directory per vector segment
+        for entry in os.scandir(persist_directory):
+            if not entry.is_dir():
+                continue
+            missing = [name for name in HNSW_SEGMENT_FILES
+                       if not os.path.exists(os.path.join(entry.path, name))]
+            report["segments"][entry.name] = {"missing_files": missing}
+            if missing:
+                # Chroma only flushes HNSW files past its sync threshold, the
+                # data is still served from SQLite so this is not fatal
+                report["warnings"].append(f"Segment {entry.name} missing {', '.join(missing)}")
+        if not report["segments"]:
+            report["warnings"].append("No HNSW segment directories found")
+
+        report["healthy"] = not report["errors"]
+    except Exception as e:
+        report["errors"].append(str(e))
+    finally:
+        report["check_ms"] = round((time.perf_counter() - started) * 1000, 2)
+
+    return report
+
+def load_existing_vector_store(persist_directory: str = CHROMA_DB_DIR) -> Optional[VectorStore]:
     """Load existing vector store from disk"""
     try:
         if not os.path.exists(persist_directory):
@@ -53,56 +190,317 @@ def load_existing_vector_store(persist_directory: str = CHROMA_DB_DIR) -> Option
             return None
             
         embeddings = create_embeddings()
+        if VECTOR_BACKEND == "numpy":
+            # A current snapshot is served without opening Chroma at all
+            numpy_store = load_numpy_store(persist_directory, embeddings)
+            if numpy_store is not None:
+                logger.info(f"Loaded NumPy vector store ({len(numpy_store)} vectors)")
+                return numpy_store
         vector_store = Chroma(
             persist_directory=persist_directory,
             embedding_function=embeddings
         )
         
-        # Test if it works
-        test_results = vector_store.similarity_search("test", k=1)
-        logger.info("Loaded existing vector store successfully")
-        return vector_store
+        # Validate locally - no embedding round-trip
+        health = check_vector_store_health(persist_directory, vector_store)
+        if not health["healthy"]:
+            logger.error(f"Vector store at {persist_directory} failed health check: {health['errors']}")
+            return None
+        for warning in health["warnings"]:
+            logger.warning(f"Vector store health: {warning}")
+        logger.info(
+            f"Loaded existing vector store successfully "
+            f"({health['document_count']} documents, {health['check_ms']}ms)"
+        )
+        return serving_store(vector_store, persist_directory)
     except Exception as e:
         logger.error(f"Error loading vector store: {e}")
         return None
 
-def create_vector_query_engine(vector_store: Chroma) -> Callable[[str], str]:
-    """Create vector query engine - FIXED VERSION"""
-    llm = ChatOpenAI(model=LLM_MODEL, temperature=0)
+def source_filter(source: str) -> Dict[str, str]:
+    """Chroma metadata filter for one corpus file, by path or bare file name"""
+    if os.sep in source or "/" in source:
+        return {"source": source}
+    return {"file_name": source}
+
+def load_chunks_from_store(vector_store: VectorStore) -> List[Document]:
+    """Read every stored chunk back from the vector store - no embedding calls"""
+    if isinstance(vector_store, NumpyVectorStore):
+        return vector_store.get_documents()
+    stored = vector_store._collection.get(include=["documents", "metadatas"])
+    return [Document(page_content=text, metadata=metadata or {})
+            for text, metadata in zip(stored["documents"], stored["metadatas"])]
+
+def search_by_vectors(vector_store: VectorStore, vectors: List[List[float]], k: int,
+                      source: Optional[str] = None) -> List[List[Document]]:
+    """Top-k chunks for many query vectors in one backend call"""
+    where = source_filter(source) if source else None
+    if isinstance(vector_store, NumpyVectorStore):
+        return [[doc for doc, _ in vector_store._documents(hits)]
+                for hits in vector_store.search_vectors(vectors, k, where)]
+    found = vector_store._collection.query(
+        query_embeddings=vectors,
+        n_results=k,
+        where=where,
+        include=["documents", "metadatas"],
+    )
+    return [[Document(page_content=text, metadata=metadata or {}) for text, metadata in zip(texts, metadatas)]
+            for texts, metadatas in zip(found["documents"], found["metadatas"])]
+
+def _fusion_key(doc: Document) -> str:
+    return doc.metadata.get("content_hash") or f"{doc.metadata.get('source')}:{doc.metadata.get('page')}:{doc.page_content}"
+
+def reciprocal_rank_fusion(rankings: List[List[Document]], k: int, rrf_k: int = RRF_K) -> List[Document]:
+    """Fuse ranked lists - each document scores sum(1 / (rrf_k + rank)) over the lists it appears in"""
+    scores: Dict[str, float] = {}
+    documents: Dict[str, Document] = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking, start=1):
+            key = _fusion_key(doc)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (rrf_k + rank)
+            documents.setdefault(key, doc)
+    return [documents[key] for key in sorted(scores, key=scores.get, reverse=True)[:k]]
+
+class HybridRetriever(BaseRetriever):
+    """Chroma dense search and BM25 keyword search, fused with reciprocal rank fusion.
+
+    BM25 catches exact names and numbers ("Lareina Yee", "Exhibit 3") that dense
+    search ranks poorly, so fewer fused chunks reach the prompt for the same recall.
+    """
+    
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+    
+    vector_store: VectorStore
+    keyword_index: KeywordIndex
+    k: int = HYBRID_SEARCH_K
+    fetch_k: int = HYBRID_FETCH_K
+    rrf_k: int = RRF_K
+    source: Optional[str] = None
     
-    retrieval_qa = RetrievalQA.from_chain_type(
-        llm=llm,
-        chain_type="stuff",
-        retriever=vector_store.as_retriever(search_kwargs={"k": VECTOR_SEARCH_K}),
+    def _search_kwargs(self) -> Dict[str, Any]:
+        return {"k": self.fetch_k, "filter": source_filter(self.source) if self.source else None}
+    
+    def _keyword_search(self, query: str) -> List[Document]:
+        with stage_timer("keyword_search"):
+            return [doc for doc, _ in self.keyword_index.search(query, self.fetch_k, self.source)]
+    
+    def _dense_search(self, query: str) -> List[Document]:
+        # Embedding and search are separate calls so each shows up as its own stage
+        vector = self.vector_store.embeddings.embed_query(query)
+        with stage_timer("vector_search"):
+            return self.vector_store.similarity_search_by_vector(vector, **self._search_kwargs())
+    
+    async def _adense_search(self, query: str) -> List[Document]:
+        vector = await self.vector_store.embeddings.aembed_query(query)
+        with stage_timer("vector_search"):
+            return await self.vector_store.asimilarity_search_by_vector(vector, **self._search_kwargs())
+    
+    def _get_relevant_documents(self, query: str, *,
+                                run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        # The keyword search runs on the shared pool while the query embedding and dense search are in flight
+        keyword_future = _keyword_search_pool.submit(contextvars.copy_context().run, self._keyword_search, query)
+        dense_docs = self._dense_search(query)
+        keyword_docs = keyword_future.result()
+        return reciprocal_rank_fusion([dense_docs, keyword_docs], self.k, self.rrf_k)
+    
+    async def _aget_relevant_documents(self, query: str, *,
+                                       run_manager: AsyncCallbackManagerForRetrieverRun) -> List[Document]:
+        # The keyword search runs in a worker thread while the query embedding and dense search are in flight
+        dense_docs, keyword_docs = await asyncio.gather(self._adense_search(query),
+                                                        asyncio.to_thread(self._keyword_search, query))
+        return reciprocal_rank_fusion([dense_docs, keyword_docs], self.k, self.rrf_k)
+
+def create_document_compressor(vector_store: Chroma,
+                               keyword_index: Optional[KeywordIndex] = None,
+                               sentence_index: Optional[SentenceIndex] = None) -> Optional[BaseDocumentCompressor]:
+    """Post-retrieval stages that trim what reaches the "stuff" prompt - rerank, then sentence compression"""
+    stages: List[BaseDocumentCompressor] = []
+    if RERANK_ENABLED:
+        stages.append(LexicalReranker(keyword_index=keyword_index))
+    if sentence_index is not None:
+        stages.append(SentenceCompressor(embeddings=vector_store.embeddings, sentence_index=sentence_index))
+    if len(stages) > 1:
+        return DocumentCompressorPipeline(transformers=stages)
+    return stages[0] if stages else None
+
+def create_retriever(vector_store: Chroma,
+                     keyword_index: Optional[KeywordIndex] = None,
+                     source: Optional[str] = None,
+                     sentence_index: Optional[SentenceIndex] = None) -> BaseRetriever:
+    """Hybrid retriever when a keyword index is available, otherwise plain dense search.
+
+    With RERANK_ENABLED the retriever over-fetches and the reranker keeps the best chunks;
+    with a sentence index the kept chunks are compressed to their most relevant sentences.
+    """
+    if keyword_index is not None:
+        k = RERANK_FETCH_K if RERANK_ENABLED else HYBRID_SEARCH_K
+        retriever = HybridRetriever(vector_store=vector_store, keyword_index=keyword_index, source=source,
+                                    k=k, fetch_k=max(HYBRID_FETCH_K, k))
+    else:
+        search_kwargs: Dict[str, Any] = {"k": RERANK_FETCH_K if RERANK_ENABLED else VECTOR_SEARCH_K}
+        if source:
+            search_kwargs["filter"] = source_filter(source)
+        retriever = vector_store.as_retriever(search_kwargs=search_kwargs)
+    
+    compressor = create_document_compressor(vector_store, keyword_index, sentence_index)
+    if compressor is not None:
+        return ContextualCompressionRetriever(base_compressor=compressor, base_retriever=retriever)
+    return retriever
+
+def create_combine_documents_chain() -> BaseCombineDocumentsChain:
+    """The "stuff" chain that answers a question from its documents, as RetrievalQA uses it"""
+    llm = ChatOpenAI(model=LLM_MODEL, temperature=0, callbacks=llm_callbacks("answer_llm"))
+    return load_qa_chain(llm, chain_type="stuff")
+
+def create_retrieval_chains(vector_store: Chroma,
+                            keyword_index: Optional[KeywordIndex] = None,
+                            sentence_index: Optional[SentenceIndex] = None) -> Callable[[Optional[str]], RetrievalQA]:
+    """Return a lookup of RetrievalQA chains by source filter - all share one LLM client"""
+    combine_documents_chain = create_combine_documents_chain()
+    
+    retrieval_qa = RetrievalQA(
+        combine_documents_chain=combine_documents_chain,
+        retriever=create_retriever(vector_store, keyword_index, sentence_index=sentence_index),
         return_source_documents=True,
         verbose=False  # Reduce noise
     )
     
-    def vector_query(query: str) -> str:
+    def retrieval_qa_for(source: Optional[str]) -> RetrievalQA:
+        """Chain restricted to one source file - shares the LLM client"""
+        if not source:
+            return retrieval_qa
+        return RetrievalQA(
+            combine_documents_chain=combine_documents_chain,
+            retriever=create_retriever(vector_store, keyword_index, source, sentence_index),
+            return_source_documents=True,
+            verbose=False
+        )
+    
+    return retrieval_qa_for
+
+def format_vector_answer(result: Dict[str, Any]) -> str:
+    """Append source snippets to a RetrievalQA result"""
+    answer = result["result"]
+    
+    # Add source information
+    sources = result.get("source_documents", [])
+    if sources:
+        answer += f"\n\n📚 Found {len(sources)} sources:\n"
+        for i, doc in enumerate(sources[:2]):
+            content = doc.page_content[:200] + "..." if len(doc.page_content) > 200 else doc.page_content
+            answer += f"Source {i+1}: {content}\n"
+    
+    return answer
+
+def create_vector_query_engine(vector_store: Chroma,
+                               keyword_index: Optional[KeywordIndex] = None,
+                               sentence_index: Optional[SentenceIndex] = None) -> Callable[..., str]:
+    """Create vector query engine - FIXED VERSION"""
+    retrieval_qa_for = create_retrieval_chains(vector_store, keyword_index, sentence_index)
+    
+    @timed("vector_query")
+    def vector_query(query: str, source: Optional[str] = None) -> str:
         """Fixed vector query function"""
         try:
-            logger.info(f"Vector search for: {query}")
-            result = retrieval_qa.invoke({"query": query})
-            answer = result["result"]
-            
-            # Add source information
-            sources = result.get("source_documents", [])
-            if sources:
-                answer += f"\n\n📚 Found {len(sources)} sources:\n"
-                for i, doc in enumerate(sources[:2]):
-                    content = doc.page_content[:200] + "..." if len(doc.page_content) > 200 else doc.page_content
-                    answer += f"Source {i+1}: {content}\n"
-            
-            return answer
+            logger.info(f"Vector search for: {query}" + (f" (source: {source})" if source else ""))
+            return format_vector_answer(retrieval_qa_for(source).invoke({"query": query}))
         except Exception as e:
             logger.error(f"Error in vector search: {e}")
             return f"Error in vector search: {e}"
     
     return vector_query
 
-def create_summary_query_engine(chunks: List[Document]) -> Callable[[str], str]:
-    """Create summary query engine - FIXED VERSION"""
-    llm = ChatOpenAI(model=LLM_MODEL, temperature=0)
+def create_async_vector_query_engine(vector_store: Chroma,
+                                     keyword_index: Optional[KeywordIndex] = None,
+                                     sentence_index: Optional[SentenceIndex] = None) -> Callable[..., Awaitable[str]]:
+    """Async vector query engine - awaits the embedding and LLM calls instead of blocking"""
+    retrieval_qa_for = create_retrieval_chains(vector_store, keyword_index, sentence_index)
+    
+    @timed("vector_query")
+    async def vector_query(query: str, source: Optional[str] = None) -> str:
+        try:
+            logger.info(f"Async vector search for: {query}" + (f" (source: {source})" if source else ""))
+            return format_vector_answer(await retrieval_qa_for(source).ainvoke({"query": query}))
+        except Exception as e:
+            logger.error(f"Error in vector search: {e}")
+            return f"Error in vector search: {e}"
+    
+    return vector_query
+
+def create_batch_query_engine(vector_store: Chroma,
+                              keyword_index: Optional[KeywordIndex] = None,
+                              sentence_index: Optional[SentenceIndex] = None) -> Callable[..., Dict[str, Any]]:
+    """Batch vector query engine - one embedding request, one vector search, concurrent LLM calls"""
+    combine_documents_chain = create_combine_documents_chain()
+    compressor = create_document_compressor(vector_store, keyword_index, sentence_index)
+    fused_k = RERANK_FETCH_K if RERANK_ENABLED else HYBRID_SEARCH_K
+    if keyword_index is not None:
+        n_results = max(HYBRID_FETCH_K, fused_k)
+    else:
+        n_results = RERANK_FETCH_K if RERANK_ENABLED else VECTOR_SEARCH_K
+    
+    def batch_query(queries: List[str], source: Optional[str] = None,
+                    max_concurrency: int = BATCH_MAX_CONCURRENCY) -> Dict[str, Any]:
+        started = time.perf_counter()
+        vectors = vector_store.embeddings.embed_documents(queries)
+        embedded = time.perf_counter()
+        
+        with stage_timer("vector_search"):
+            found = search_by_vectors(vector_store, vectors, n_results, source)
+        searched = time.perf_counter()
+        
+        def answer(index: int) -> Dict[str, Any]:
+            item_started = time.perf_counter()
+            documents = found[index]
+            if keyword_index is not None:
+                with stage_timer("keyword_search"):
+                    keyword_docs = [doc for doc, _ in keyword_index.search(queries[index], n_results, source)]
+                documents = reciprocal_rank_fusion([documents, keyword_docs], fused_k)
+            if compressor is not None:
+                documents = list(compressor.compress_documents(documents, queries[index]))
+            try:
+                result = combine_documents_chain.invoke(
+                    {"input_documents": documents, "question": queries[index]}
+                )
+                text = format_vector_answer({"result": result["output_text"], "source_documents": documents})
+            except Exception as e:
+                logger.error(f"Error in batch query {index}: {e}")
+                text = f"Error in vector search: {e}"
+            finished = time.perf_counter()
+            return {
+                "index": index,
+                "question": queries[index],
+                "answer": text,
+                "sources": len(documents),
+                "timing_ms": {
+                    "generation": round((finished - item_started) * 1000, 1),
+                    # Shared embedding/search plus any wait for a free LLM slot
+                    "total": round((finished - started) * 1000, 1),
+                },
+            }
+        
+        with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(queries)))) as pool:
+            # Each worker runs in a copy of the caller's context so token usage reaches its request
+            futures = [pool.submit(contextvars.copy_context().run, answer, index) for index in range(len(queries))]
+            results = [future.result() for future in futures]
+        
+        logger.info(f"Batch answered {len(queries)} queries in {time.perf_counter() - started:.2f}s")
+        return {
+            "results": results,
+            "timing_ms": {
+                "embedding": round((embedded - started) * 1000, 1),
+                "search": round((searched - embedded) * 1000, 1),
+                "total": round((time.perf_counter() - started) * 1000, 1),
+            },
+        }
+    
+    return batch_query
+
+def create_summary_query_engine(chunks: List[Document],
+                                keyword_index: Optional[KeywordIndex] = None) -> Callable[[str], str]:
+    """Create summary query engine over the chunks, ranked by a BM25 keyword index"""
+    llm = ChatOpenAI(model=LLM_MODEL, temperature=0, callbacks=llm_callbacks("summary_llm"))
+    keyword_index = keyword_index or KeywordIndex.build(chunks)
     
     def summary_query(query: str) -> str:
         """Fixed summary query function"""
@@ -112,21 +510,12 @@ def create_summary_query_engine(chunks: List[Document]) -> Callable[[str], str]:
             
             logger.info(f"Summary search for: {query}")
             
-            # Better keyword matching
-            query_keywords = [word.lower() for word in query.split() if len(word) > 2]
-            relevant_chunks = []
-            
-            for chunk in chunks:
-                content_lower = chunk.page_content.lower()
-                if any(keyword in content_lower for keyword in query_keywords):
-                    relevant_chunks.append(chunk)
+            # Most relevant chunks by BM25 - no per-query scan of the chunk text
+            relevant_chunks = [doc for doc, _ in keyword_index.search(query, k=20)]
             
             if not relevant_chunks:
                 relevant_chunks = chunks[:15]  # Use first 15 chunks for broad queries
             
-            if len(relevant_chunks) > 20:
-                relevant_chunks = relevant_chunks[:20]
-            
             summarize_chain = load_summarize_chain(
                 llm=llm,
                 chain_type="map_reduce",
@@ -142,6 +531,31 @@ def create_summary_query_engine(chunks: List[Document]) -> Callable[[str], str]:
     
     return summary_query
 
+# --- Keyword lists (shared with the pre-agent router in src/router.py) ---------
+
+VECTOR_KEYWORDS = [
+    "who is",
+    "who are",   # ← NEW: ensures identity questions route to vector search
+    "percentage",
+    "specific",
+    "according to",
+    "what does",
+    "statistics",
+    "data",
+    "numbers",
+    "exhibit",
+    "figure",
+    "says",
+]
+
+SUMMARY_KEYWORDS = [
+    "overview",
+    "summary",
+    "key",
+    "main",
+    "insight",
+]
+
 def create_router_query_engine(vector_query_engine: Callable, summary_query_engine: Callable) -> Callable[[str], str]:
     """Create smart router - FIXED VERSION"""
     
@@ -150,33 +564,8 @@ def create_router_query_engine(vector_query_engine: Callable, summary_query_engi
         query_lower = query.lower()
         
         # Use summary for broad, high-level questions
-        # --- Keyword lists -----------------------------------------------------------
-
-        vector_keywords = [
-            "who is",
-            "who are",   # ← NEW: ensures identity questions route to vector search
-            "percentage",
-            "specific",
-            "according to",
-            "what does",
-            "statistics",
-            "data",
-            "numbers",
-            "exhibit",
-            "figure",
-            "says",
-        ]
-
-        summary_keywords = [
-            "overview",
-            "summary",
-            "key",
-            "main",
-            "insight",
-        ]
-        
-        use_summary = any(keyword in query_lower for keyword in summary_keywords)
-        use_vector = any(keyword in query_lower for keyword in vector_keywords)
+        use_summary = any(keyword in query_lower for keyword in SUMMARY_KEYWORDS)
+        use_vector = any(keyword in query_lower for keyword in VECTOR_KEYWORDS)
         
         if use_summary and not use_vector:
             logger.info("🔍 Using Summary Tool for broad question")
@@ -0,0 +1,69 @@
+"""Offline stand-ins for the chat model, tools and agent used by the serving tests"""
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGenerationChunk
+from langchain_core.runnables import RunnableLambda
+from langchain_core.tools import StructuredTool
+
+from src.router import QuestionRouter, REPORT_TOOL
+from src.usage import TokenUsageHandler
+
+PROMPT_TOKENS, COMPLETION_TOKENS = 10, 5
+USAGE = {"input_tokens": PROMPT_TOKENS, "output_tokens": COMPLETION_TOKENS,
+         "total_tokens": PROMPT_TOKENS + COMPLETION_TOKENS}
+
+
+class UsageChatModel(GenericFakeChatModel):
+    """Answers (streamed word by word) with its canned messages and reports token usage like ChatOpenAI"""
+
+    def _generate(self, *args, **kwargs):
+        result = super()._generate(*args, **kwargs)
+        result.generations[0].message.usage_metadata = dict(USAGE)
+        return result
+
+    def _stream(self, *args, **kwargs):
+        yield from super()._stream(*args, **kwargs)
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=dict(USAGE)))
+
+
+def chat_model(*answers: str, stage: str = "agent_llm") -> UsageChatModel:
+    return UsageChatModel(messages=iter([AIMessage(content=answer) for answer in answers]),
+                          callbacks=[TokenUsageHandler(stage)])
+
+
+def report_tool(*answers: str) -> StructuredTool:
+    """The report tool, answering from its own chat model as RetrievalQA does"""
+    model = chat_model(*answers, stage="answer_llm")
+
+    def report(query: str) -> str:
+        return model.invoke(query).content
+
+    async def areport(query: str) -> str:
+        return (await model.ainvoke(query)).content
+
+    return StructuredTool.from_function(report, coroutine=areport, name=REPORT_TOOL,
+                                        description="Answers questions about the report")
+
+
+def fake_agent(tool: StructuredTool, *answers: str, output: str = None) -> RunnableLambda:
+    """Calls the tool once, then answers with its own model - output overrides the final answer"""
+    model = chat_model(*answers)
+
+    def run(inputs: dict) -> dict:
+        tool.invoke({"query": inputs["input"]})
+        answer = model.invoke(inputs["input"]).content
+        return {"output": output or answer}
+
+    async def arun(inputs: dict) -> dict:
+        await tool.ainvoke({"query": inputs["input"]})
+        answer = (await model.ainvoke(inputs["input"])).content
+        return {"output": output or answer}
+
+    agent = RunnableLambda(run, afunc=arun)
+    agent.tools = [tool]
+    return agent
+
+
+def keyword_router() -> QuestionRouter:
+    """Routes on keywords alone, so no embeddings are needed"""
+    return QuestionRouter(embeddings=None, threshold=0.8, direct_tools=[REPORT_TOOL])
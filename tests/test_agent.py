@@ -1,4 +1,5 @@
 import unittest
+import asyncio
 import os
 import sys
 from unittest.mock import patch, MagicMock
@@ -9,6 +10,10 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
 from src.document_processor import split_documents
 from src.vector_store import create_embeddings
 from src.utils import validate_api_keys
+from src import usage as usage_module
+from src.agent import astream_question
+from src.usage import SessionLedger
+from tests.fakes import fake_agent, keyword_router, report_tool
 
 class TestAgenticRAG(unittest.TestCase):
     
@@ -36,5 +41,70 @@ class TestAgenticRAG(unittest.TestCase):
             embeddings = create_embeddings()
             self.assertIsNotNone(embeddings)
 
+class TestStreaming(unittest.TestCase):
+
+    def setUp(self):
+        self.ledger = SessionLedger()
+        for patcher in (patch.object(usage_module, "session_ledger", self.ledger),
+                        patch("src.agent.get_router", return_value=keyword_router())):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def stream(self, agent, question: str, stop_after: str = None) -> list:
+        async def collect():
+            events = []
+            stream = astream_question(agent, question, session_id="s")
+            async for event in stream:
+                events.append(event)
+                if event["event"] == stop_after:
+                    await stream.aclose()
+            return events
+        return asyncio.run(collect())
+
+    def test_tool_tokens_are_not_streamed_as_the_answer(self):
+        """While a tool runs its model's tokens are withheld; the answer is the agent's output"""
+        agent = fake_agent(report_tool("Lareina Yee is a senior partner"), "She is a partner",
+                           output="Lareina Yee is a senior partner at McKinsey")
+        events = self.stream(agent, "What is the latest news?")
+
+        kinds = [event["event"] for event in events]
+        self.assertEqual(kinds[:2], ["tool_start", "tool_end"])
+        self.assertEqual(kinds[-1], "done")
+        tokens = "".join(event["text"] for event in events if event["event"] == "token")
+        self.assertEqual(tokens, "She is a partner")
+        self.assertEqual(events[-1]["answer"], "Lareina Yee is a senior partner at McKinsey")
+
+        # Both model calls are charged to the request and to its session
+        self.assertEqual(events[-1]["usage"]["llm_calls"], 2)
+        self.assertEqual(self.ledger.get_session("s")["requests"], 1)
+        self.assertEqual(self.ledger.get_session("s")["total_tokens"], events[-1]["usage"]["total_tokens"])
+
+    def test_direct_route_streams_the_tool(self):
+        """A routed question streams the tool's tokens and answers with its output"""
+        agent = fake_agent(report_tool("Lareina Yee is a senior partner"), "unused")
+        events = self.stream(agent, "Who is Lareina Yee according to the report?")
+
+        self.assertEqual(events[0]["event"], "route")
+        self.assertEqual(events[0]["tool"], "mckinsey_report_tool")
+        tokens = "".join(event["text"] for event in events if event["event"] == "token")
+        self.assertEqual(tokens, "Lareina Yee is a senior partner")
+        self.assertEqual(events[-1]["event"], "done")
+        self.assertEqual(events[-1]["answer"], "Lareina Yee is a senior partner")
+
+    def test_closing_the_stream_stops_the_run(self):
+        """A client that goes away mid-answer cancels the model call and still closes the request"""
+        agent = fake_agent(report_tool("Lareina Yee is a senior partner"), "unused")
+        events = self.stream(agent, "Who is Lareina Yee according to the report?", stop_after="token")
+
+        self.assertEqual([event["event"] for event in events], ["route", "tool_start", "token"])
+        session = self.ledger.get_session("s")
+        self.assertEqual((session["requests"], session["total_tokens"]), (1, 0))
+
+    def test_rejected_session_gets_an_error_event(self):
+        self.ledger.budget = 100
+        self.ledger.add("s", {"total_tokens": 100}, requests=1)
+        events = self.stream(fake_agent(report_tool("unused"), "unused"), "What is the latest news?")
+        self.assertEqual([event["event"] for event in events], ["error"])
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,126 @@
+import json
+import os
+import sys
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'flask'))
+
+import app as web
+from src import usage as usage_module
+from src.response_cache import MemoryTier, ResponseCache
+from src.usage import SessionLedger
+from tests.fakes import fake_agent, keyword_router, report_tool
+
+
+def parse_sse(body: str) -> list:
+    return [json.loads(block.split("data: ", 1)[1]) for block in body.strip().split("\n\n") if block]
+
+
+class TestStreamEndpoint(unittest.TestCase):
+
+    def setUp(self):
+        self.ledger = SessionLedger()
+        self.agent = fake_agent(report_tool("Lareina Yee is a senior partner"), "She is a partner")
+        for patcher in (patch.object(usage_module, "session_ledger", self.ledger),
+                        patch("src.agent.get_router", return_value=keyword_router()),
+                        patch.object(web, "agent", self.agent),
+                        patch.object(web, "system_initialized", True),
+                        patch.object(web, "response_cache", None)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.client = web.app.test_client()
+
+    def post(self, question: str, **kwargs):
+        return self.client.post("/api/ask/stream", json={"question": question, "session_id": "s"}, **kwargs)
+
+    def test_stream_is_metered(self):
+        response = self.post("What is the latest news?")
+        self.assertEqual(response.mimetype, "text/event-stream")
+
+        events = parse_sse(response.get_data(as_text=True))
+        self.assertEqual([event["event"] for event in events[:2]], ["tool_start", "tool_end"])
+        done = events[-1]
+        self.assertEqual((done["event"], done["answer"]), ("done", "She is a partner"))
+        # The steps run on separate event loop tasks but are charged to one request
+        session = self.ledger.get_session("s")
+        self.assertEqual(done["usage"]["llm_calls"], 2)
+        self.assertEqual((session["requests"], session["total_tokens"]), (1, done["usage"]["total_tokens"]))
+
+    def test_cache_hit_is_a_single_done_event(self):
+        engine = SimpleNamespace(corpus_version="v1")
+        with patch.object(web, "response_cache", ResponseCache([MemoryTier()])), \
+                patch.object(web, "get_engine", return_value=engine):
+            first = parse_sse(self.post("What is the latest news?").get_data(as_text=True))
+            second = parse_sse(self.post("What is the latest news?").get_data(as_text=True))
+
+        self.assertGreater(len(first), 1)
+        self.assertEqual(len(second), 1)
+        self.assertEqual((second[0]["event"], second[0]["answer"]), ("done", first[-1]["answer"]))
+        self.assertEqual(second[0]["cache"], {"status": "hit"})
+        self.assertEqual(second[0]["usage"]["total_tokens"], 0)
+
+    def test_disconnect_closes_the_stream(self):
+        response = self.post("Who is Lareina Yee according to the report?", buffered=False)
+        chunks = iter(response.response)
+        first = parse_sse(next(chunks).decode("utf-8"))
+        response.close()
+
+        self.assertEqual(first[0]["event"], "route")
+        session = self.ledger.get_session("s")
+        self.assertEqual((session["requests"], session["total_tokens"]), (1, 0))
+
+    def test_invalid_request(self):
+        response = self.client.post("/api/ask/stream", json={"question": "  "})
+        self.assertEqual(response.status_code, 400)
+
+
+class TestBatchEndpoint(unittest.TestCase):
+
+    def setUp(self):
+        self.ledger = SessionLedger()
+        for patcher in (patch.object(usage_module, "session_ledger", self.ledger),
+                        patch.object(web, "agent", fake_agent(report_tool("unused"), "unused")),
+                        patch.object(web, "system_initialized", True)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.client = web.app.test_client()
+
+    def post(self, **payload):
+        return self.client.post("/api/ask/batch", json={"questions": ["Who is Lareina Yee?"],
+                                                        "session_id": "s", **payload})
+
+    def test_batch_is_answered(self):
+        engine = SimpleNamespace(batch_query=lambda questions, **options: {
+            "results": [{"index": 0, "question": questions[0], "answer": "A partner", "timing_ms": {}}],
+            "timing_ms": {"total": 1.0},
+        })
+        with patch("src.agent.get_engine", return_value=engine):
+            response = self.post(source="state.pdf")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()["results"][0]["answer"], "A partner")
+
+    def test_exhausted_session_is_rejected(self):
+        self.ledger.budget = 100
+        self.ledger.add("s", {"total_tokens": 100}, requests=1)
+        response = self.post()
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response.get_json()["status"], "error")
+
+    def test_failed_batch_is_an_error(self):
+        with patch("src.agent.get_engine", return_value=None):
+            response = self.post()
+        self.assertEqual(response.status_code, 500)
+        payload = response.get_json()
+        self.assertEqual(payload["status"], "error")
+        self.assertTrue(payload["message"].startswith("Error"))
+
+    def test_source_must_be_a_string(self):
+        self.assertEqual(self.post(source=["state.pdf"]).status_code, 400)
+        self.assertEqual(self.client.post("/api/ask/batch", data="{not json",
+                                          content_type="application/json").status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
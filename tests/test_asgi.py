@@ -0,0 +1,116 @@
+import asyncio
+import json
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'flask'))
+
+import app as web
+import asgi
+from src import usage as usage_module
+from src.usage import SessionLedger
+from tests.fakes import fake_agent, keyword_router, report_tool
+
+
+def call(method: str, path: str, body: bytes = b"") -> dict:
+    """Run one request through the ASGI application and collect the response"""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": method, "path": path, "raw_path": path.encode("ascii"), "root_path": "",
+        "scheme": "http", "query_string": b"", "headers": [(b"content-type", b"application/json")],
+        "server": ("testserver", 80), "client": ("127.0.0.1", 5000),
+    }
+    requests = [{"type": "http.request", "body": body, "more_body": False}]
+    messages = []
+
+    async def receive():
+        if requests:
+            return requests.pop(0)
+        await asyncio.sleep(3600)
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(asgi.application(scope, receive, send))
+    start = messages[0]
+    return {
+        "status": start["status"],
+        "headers": dict(start["headers"]),
+        "body": b"".join(message.get("body", b"") for message in messages[1:]).decode("utf-8"),
+    }
+
+
+def post_json(path: str, payload: dict) -> dict:
+    return call("POST", path, json.dumps(payload).encode("utf-8"))
+
+
+class TestAsyncApplication(unittest.TestCase):
+
+    def setUp(self):
+        self.ledger = SessionLedger()
+        self.tool = report_tool("Lareina Yee is a senior partner")
+        for patcher in (patch.object(usage_module, "session_ledger", self.ledger),
+                        patch("src.agent.get_router", return_value=keyword_router()),
+                        patch.object(web, "agent", fake_agent(self.tool, "She is a partner")),
+                        patch.object(web, "system_initialized", True),
+                        patch.object(web, "response_cache", None)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def native_only(self):
+        """Fail the test if a request reaches the Flask fallback"""
+        return patch.object(asgi.application, "fallback", side_effect=AssertionError("served by Flask"))
+
+    def test_ask_routes_directly_to_the_tool(self):
+        with self.native_only():
+            response = post_json("/api/ask", {"question": "Who is Lareina Yee according to the report?",
+                                              "session_id": "s"})
+        self.assertEqual(response["status"], 200)
+        payload = json.loads(response["body"])
+        self.assertEqual(payload["answer"], "Lareina Yee is a senior partner")
+        # Only the tool's model ran - the agent was skipped
+        self.assertEqual(payload["usage"]["llm_calls"], 1)
+        self.assertEqual(set(payload["usage"]["by_stage"]), {"answer_llm"})
+        self.assertEqual(payload["session_usage"]["requests"], 1)
+
+    def test_ask_goes_through_the_agent(self):
+        with self.native_only():
+            response = post_json("/api/ask", {"question": "What is the latest news?", "session_id": "s"})
+        payload = json.loads(response["body"])
+        self.assertEqual((response["status"], payload["answer"]), (200, "She is a partner"))
+        self.assertEqual(payload["usage"]["llm_calls"], 2)
+
+    def test_stream_is_served_natively(self):
+        with self.native_only():
+            response = post_json("/api/ask/stream", {"question": "What is the latest news?",
+                                                     "session_id": "s"})
+        self.assertEqual(response["status"], 200)
+        self.assertEqual(response["headers"][b"content-type"], b"text/event-stream")
+        events = [json.loads(block.split("data: ", 1)[1]) for block in response["body"].strip().split("\n\n")]
+        self.assertEqual((events[-1]["event"], events[-1]["answer"]), ("done", "She is a partner"))
+        self.assertEqual(self.ledger.get_session("s")["requests"], 1)
+
+    def test_invalid_json_is_rejected(self):
+        with self.native_only():
+            response = call("POST", "/api/ask", b"{not json")
+        self.assertEqual(response["status"], 400)
+        self.assertEqual(json.loads(response["body"])["status"], "error")
+
+    def test_over_budget_session_is_rejected(self):
+        self.ledger.budget = 100
+        self.ledger.add("s", {"total_tokens": 100}, requests=1)
+        response = post_json("/api/ask", {"question": "What is the latest news?", "session_id": "s"})
+        self.assertEqual(response["status"], 429)
+        self.assertEqual(json.loads(response["body"])["session_usage"]["total_tokens"], 100)
+
+    def test_other_routes_fall_through_to_flask(self):
+        self.assertEqual(call("GET", "/")["status"], 200)
+        # Only POST /api/ask is native, so Flask answers the wrong method
+        self.assertEqual(call("GET", "/api/ask")["status"], 405)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import asyncio
+import shutil
+import tempfile
+import unittest
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from src.context_compression import SentenceCompressor, SentenceIndex, split_sentences
+
+VOCABULARY = ["ceo", "governance", "workforce", "risk", "budget"]
+
+
+class KeywordEmbeddings(Embeddings):
+    """One dimension per vocabulary word - counts embedded texts"""
+
+    def __init__(self):
+        self.embedded = 0
+        self.async_embedded = 0
+
+    def embed_query(self, text):
+        words = text.lower().replace("?", "").replace(".", "").split()
+        return [float(word in words) for word in VOCABULARY]
+
+    def embed_documents(self, texts):
+        self.embedded += len(texts)
+        return [self.embed_query(text) for text in texts]
+
+    async def aembed_documents(self, texts):
+        self.async_embedded += len(texts)
+        return [self.embed_query(text) for text in texts]
+
+
+class TestContextCompression(unittest.TestCase):
+
+    def setUp(self):
+        self.embeddings = KeywordEmbeddings()
+        self.documents = [
+            Document(page_content="The CEO oversees governance. Workforce plans\nare unchanged.", metadata={"page": 1}),
+            Document(page_content="Risk teams grew. The budget was flat.", metadata={"page": 2}),
+        ]
+
+    def test_split_sentences_rejoins_line_breaks(self):
+        self.assertEqual(split_sentences("The CEO oversees governance. Workforce plans\nare unchanged."),
+                         ["The CEO oversees governance.", "Workforce plans are unchanged."])
+        self.assertEqual(len(split_sentences(" ".join(["word"] * 130))), 3)
+
+    def test_keeps_most_similar_sentences_within_budget(self):
+        compressor = SentenceCompressor(embeddings=self.embeddings, sentence_index=SentenceIndex(), token_budget=11)
+        compressed = compressor.compress_documents(self.documents, "Who handles governance and risk?")
+        self.assertEqual([(doc.page_content, doc.metadata["page"]) for doc in compressed],
+                         [("The CEO oversees governance.", 1), ("Risk teams grew.", 2)])
+
+    def test_async_path_awaits_the_sentence_embeddings(self):
+        compressor = SentenceCompressor(embeddings=self.embeddings, sentence_index=SentenceIndex(), token_budget=11)
+        compressed = asyncio.run(compressor.acompress_documents(self.documents, "Who handles governance and risk?"))
+        self.assertEqual([doc.page_content for doc in compressed], ["The CEO oversees governance.", "Risk teams grew."])
+        self.assertEqual((self.embeddings.async_embedded, self.embeddings.embedded), (4, 0))
+
+    def test_reuses_indexed_sentence_vectors(self):
+        index = SentenceIndex()
+        compressor = SentenceCompressor(embeddings=self.embeddings, sentence_index=index, token_budget=100)
+        compressor.compress_documents(self.documents, "governance")
+        embedded = self.embeddings.embedded
+        self.assertEqual(embedded, 4)
+
+        persist_directory = tempfile.mkdtemp()
+        try:
+            index.save(persist_directory)
+            loaded = SentenceIndex.load(persist_directory)
+        finally:
+            shutil.rmtree(persist_directory)
+        compressor = SentenceCompressor(embeddings=self.embeddings, sentence_index=loaded, token_budget=100)
+        compressed = compressor.compress_documents(self.documents, "budget")
+        self.assertEqual(self.embeddings.embedded, embedded)
+        self.assertEqual(len(compressed), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
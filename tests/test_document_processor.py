@@ -0,0 +1,59 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from src.document_processor import load_corpus
+
+
+def write_pdf(path, pages):
+    """Write a minimal text-only PDF with one page per string"""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None,
+               "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for text in pages:
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>")
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+    out = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+class TestCorpusLoading(unittest.TestCase):
+
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        write_pdf(os.path.join(self.data_dir, "state.pdf"),
+                  [f"State of AI page {i}" for i in range(5)])
+        os.makedirs(os.path.join(self.data_dir, "archive"))
+        write_pdf(os.path.join(self.data_dir, "archive", "older.pdf"), ["Older report"])
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir, ignore_errors=True)
+
+    def test_corpus_chunks_are_tagged(self):
+        """Every PDF is parsed, in order, with source, page and checksum"""
+        chunks = load_corpus(self.data_dir, chunk_size=100, chunk_overlap=0)
+
+        self.assertEqual(len(chunks), 6)
+        self.assertEqual(chunks[0].metadata["file_name"], "older.pdf")
+        state_pages = [c.metadata["page"] for c in chunks if c.metadata["file_name"] == "state.pdf"]
+        self.assertEqual(state_pages, list(range(5)))
+        self.assertEqual(len({c.metadata["checksum"] for c in chunks}), 2)
+        self.assertIn("State of AI page 3", chunks[4].page_content)
+
+
+if __name__ == '__main__':
+    unittest.main()
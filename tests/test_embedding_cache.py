@@ -0,0 +1,80 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from src.embedding_cache import CachedEmbeddings, EmbeddingStore
+
+
+class CountingEmbeddings(DeterministicFakeEmbedding):
+    """Deterministic fake embedder that counts embedded texts"""
+
+    embedded: int = 0
+
+    def embed_documents(self, texts):
+        self.embedded += len(texts)
+        return super().embed_documents(texts)
+
+    def embed_query(self, text):
+        self.embedded += 1
+        return super().embed_query(text)
+
+
+class TestEmbeddingCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.cache_dir, "embeddings.sqlite3")
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def test_repeated_texts_are_served_from_cache(self):
+        """Second embedding of the same texts makes no underlying calls"""
+        fake = CountingEmbeddings(size=8)
+        cached = CachedEmbeddings(fake, EmbeddingStore(self.path), "fake-model")
+
+        first = cached.embed_documents(["alpha", "beta"])
+        second = cached.embed_documents(["alpha", "  beta "])
+        self.assertEqual(fake.embedded, 2)
+        self.assertEqual(len(second), 2)
+        for expected, actual in zip(first[0], second[0]):
+            self.assertAlmostEqual(expected, actual, places=5)
+
+        stats = cached.get_stats()
+        self.assertEqual(stats["hits"], 2)
+        self.assertEqual(stats["bytes_saved"], 2 * 8 * 4)
+
+    def test_cache_survives_restart(self):
+        """Vectors persist across store instances"""
+        CachedEmbeddings(CountingEmbeddings(size=8), EmbeddingStore(self.path), "m").embed_query("q")
+
+        fake = CountingEmbeddings(size=8)
+        CachedEmbeddings(fake, EmbeddingStore(self.path), "m").embed_query("q")
+        self.assertEqual(fake.embedded, 0)
+
+    def test_lru_eviction_respects_size_cap(self):
+        """The store evicts least recently used vectors past its cap"""
+        store = EmbeddingStore(self.path, max_bytes=8 * 4 * 3)
+        cached = CachedEmbeddings(CountingEmbeddings(size=8), store, "m")
+
+        cached.embed_documents([f"text {i}" for i in range(5)])
+        self.assertLessEqual(store.size_bytes, store.max_bytes)
+        self.assertLess(len(store), 5)
+
+    def test_size_is_kept_in_step_with_the_table(self):
+        """Replaced and evicted rows are taken off the running size"""
+        store = EmbeddingStore(self.path, max_bytes=8 * 4 * 3)
+        store.put_many({"a": [0.0] * 8, "b": [0.0] * 8})
+        store.put_many({"a": [1.0] * 4})
+        self.assertEqual(store.size_bytes, 8 * 4 + 4 * 4)
+
+        store.put_many({f"k{i}": [0.0] * 8 for i in range(4)})
+        self.assertEqual(store.size_bytes, EmbeddingStore(self.path).size_bytes)
+        self.assertLessEqual(store.size_bytes, store.max_bytes)
+
+
+if __name__ == '__main__':
+    unittest.main()
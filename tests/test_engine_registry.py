@@ -0,0 +1,56 @@
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch, MagicMock
+
+from src.engine_registry import EngineRegistry
+
+
+class TestEngineRegistry(unittest.TestCase):
+
+    @patch("src.engine_registry.SEMANTIC_CACHE_ENABLED", False)
+    @patch("src.engine_registry.HYBRID_SEARCH_ENABLED", False)
+    @patch("src.engine_registry.create_vector_query_engine")
+    @patch("src.engine_registry.load_existing_vector_store")
+    def test_engine_built_once(self, mock_load, mock_create):
+        """Concurrent lookups share a single engine"""
+        mock_load.return_value = MagicMock()
+        mock_create.return_value = lambda query, source=None: f"answer: {query}"
+        registry = EngineRegistry()
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            engines = list(pool.map(lambda _: registry.get_engine("/tmp/store"), range(32)))
+
+        self.assertEqual(len({id(engine) for engine in engines}), 1)
+        self.assertEqual(mock_load.call_count, 1)
+        stats = registry.get_stats()
+        self.assertEqual(stats["constructions"], 1)
+        self.assertEqual(stats["hits"], 31)
+
+    @patch("src.engine_registry.SEMANTIC_CACHE_ENABLED", False)
+    @patch("src.engine_registry.HYBRID_SEARCH_ENABLED", False)
+    @patch("src.engine_registry.create_vector_query_engine")
+    @patch("src.engine_registry.load_existing_vector_store")
+    def test_swap_replaces_engine(self, mock_load, mock_create):
+        """A rebuilt vector store replaces the cached engine"""
+        mock_load.return_value = MagicMock()
+        mock_create.side_effect = lambda store, keyword_index=None, sentence_index=None: (lambda query, source=None: store)
+        registry = EngineRegistry()
+
+        old_engine = registry.get_engine("/tmp/store")
+        new_store = MagicMock()
+        registry.swap(new_store, "/tmp/store")
+
+        engine = registry.get_engine("/tmp/store")
+        self.assertIsNot(engine, old_engine)
+        self.assertIs(engine.query("q"), new_store)
+        self.assertEqual(registry.get_stats()["swaps"], 1)
+        self.assertEqual(engine.persist_directory, "/tmp/store")
+
+        # A store built elsewhere keeps its side indexes in its own directory
+        engine = registry.swap(MagicMock(), "/tmp/store", store_directory="/tmp/other")
+        self.assertEqual(engine.key[0], "/tmp/store")
+        self.assertEqual(engine.persist_directory, "/tmp/other")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from src.ingestion import sync_vector_store, read_manifest, embed_in_batches
+
+
+class CountingEmbeddings(DeterministicFakeEmbedding):
+    """Deterministic fake embedder that counts embedded texts"""
+
+    embedded: int = 0
+
+    def embed_documents(self, texts):
+        self.embedded += len(texts)
+        return super().embed_documents(texts)
+
+
+class FlakyEmbeddings(DeterministicFakeEmbedding):
+    """Fails the first call, like a 429 from the embeddings API"""
+
+    calls: int = 0
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        if self.calls == 1:
+            raise RuntimeError("Rate limit reached")
+        return super().embed_documents(texts)
+
+
+def make_chunks(texts):
+    return [Document(page_content=text, metadata={"source": "report.pdf", "page": i})
+            for i, text in enumerate(texts)]
+
+
+class TestIncrementalIngestion(unittest.TestCase):
+
+    def setUp(self):
+        self.persist_directory = tempfile.mkdtemp()
+        self.embeddings = CountingEmbeddings(size=16)
+
+    def tearDown(self):
+        shutil.rmtree(self.persist_directory, ignore_errors=True)
+
+    def test_unchanged_corpus_embeds_nothing(self):
+        """Re-syncing the same chunks does no embedding work"""
+        chunks = make_chunks(["alpha", "beta", "gamma"])
+        sync_vector_store(chunks, self.persist_directory, self.embeddings)
+        self.assertEqual(self.embeddings.embedded, 3)
+
+        _, stats = sync_vector_store(chunks, self.persist_directory, self.embeddings)
+        self.assertEqual(self.embeddings.embedded, 3)
+        self.assertEqual(stats["unchanged"], 3)
+
+    def test_changed_chunk_is_reembedded(self):
+        """Only the edited chunk is embedded and the stale one removed"""
+        sync_vector_store(make_chunks(["alpha", "beta", "gamma"]),
+                          self.persist_directory, self.embeddings)
+        version = read_manifest(self.persist_directory)["corpus_version"]
+
+        vector_store, stats = sync_vector_store(make_chunks(["alpha", "BETA", "gamma"]),
+                                                self.persist_directory, self.embeddings)
+        self.assertEqual((stats["added"], stats["deleted"]), (1, 1))
+        self.assertEqual(self.embeddings.embedded, 4)
+        self.assertEqual(vector_store._collection.count(), 3)
+        self.assertNotEqual(read_manifest(self.persist_directory)["corpus_version"], version)
+
+    def test_streamed_chunks_stay_bounded(self):
+        """A chunk generator is consumed through bounded queues"""
+        chunks = (Document(page_content=f"chunk {i}", metadata={"source": "report.pdf", "page": i})
+                  for i in range(200))
+        _, stats = sync_vector_store(chunks, self.persist_directory, self.embeddings,
+                                     queue_size=8, batch_size=10)
+
+        self.assertEqual(stats["added"], 200)
+        self.assertLessEqual(max(stats["memory"]["max_queue_depth"].values()), 8)
+
+
+class TestBatchedEmbedding(unittest.TestCase):
+
+    @patch("src.ingestion.time.sleep")
+    def test_batches_are_retried(self, mock_sleep):
+        """Every chunk is embedded once in bounded batches despite a failure"""
+        chunks = make_chunks([f"chunk {i}" for i in range(10)])
+        stats = {}
+        results = list(embed_in_batches(chunks, FlakyEmbeddings(size=8), batch_size=3,
+                                        max_workers=2, stats=stats))
+
+        self.assertEqual(sum(len(batch) for batch, _ in results), 10)
+        self.assertTrue(all(len(batch) == len(vectors) for batch, vectors in results))
+        self.assertEqual(stats["batches"], 4)
+        self.assertEqual(stats["retries"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import shutil
+import tempfile
+import unittest
+
+from langchain_core.documents import Document
+
+from src.keyword_index import KeywordIndex, tokenize
+
+
+class TestKeywordIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.chunks = [
+            Document(page_content="Lareina Yee is a senior partner at McKinsey.", metadata={"file_name": "a.pdf"}),
+            Document(page_content="Exhibit 3 shows AI adoption by function.", metadata={"file_name": "a.pdf"}),
+            Document(page_content="Organizations redesign workflows as they adopt AI. AI AI.",
+                     metadata={"file_name": "b.pdf"}),
+        ]
+        self.index = KeywordIndex.build(self.chunks)
+
+    def test_tokenize_drops_stopwords_but_keeps_digits(self):
+        self.assertEqual(tokenize("What does Exhibit 3 say about the AI?"), ["exhibit", "3", "ai"])
+
+    def test_search_ranks_by_bm25(self):
+        results = self.index.search("Who is Lareina Yee according to the report?")
+        self.assertEqual(results[0][0].page_content, self.chunks[0].page_content)
+        self.assertEqual(len(results), 1)
+
+        # Higher term frequency ranks first
+        ranked = [doc.page_content for doc, _ in self.index.search("AI")]
+        self.assertEqual(ranked[0], self.chunks[2].page_content)
+
+    def test_search_respects_k_and_source(self):
+        self.assertEqual(len(self.index.search("AI adoption", k=1)), 1)
+        results = self.index.search("AI", source="a.pdf")
+        self.assertEqual({doc.metadata["file_name"] for doc, _ in results}, {"a.pdf"})
+
+    def test_save_and_load_round_trip(self):
+        persist_directory = tempfile.mkdtemp()
+        try:
+            self.index.save(persist_directory)
+            loaded = KeywordIndex.load(persist_directory)
+        finally:
+            shutil.rmtree(persist_directory, ignore_errors=True)
+
+        self.assertEqual(
+            [(doc.page_content, round(score, 4)) for doc, score in loaded.search("exhibit 3 adoption")],
+            [(doc.page_content, round(score, 4)) for doc, score in self.index.search("exhibit 3 adoption")],
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import asyncio
+import unittest
+from uuid import uuid4
+
+from src.metrics import (
+    LATENCY_BUCKETS, LLMTimingHandler, MetricsRegistry, StageTimer, metrics_registry, timed
+)
+
+
+class TestMetricsRegistry(unittest.TestCase):
+
+    def test_histogram_and_quantiles(self):
+        registry = MetricsRegistry(enabled=True, window=100)
+        for ms in range(1, 101):
+            registry.observe("vector_search", ms / 1000)
+        registry.observe("vector_search", 0.2, error=True)
+
+        stats = registry.get_stats()["vector_search"]
+        self.assertEqual((stats["count"], stats["errors"]), (101, 1))
+        self.assertEqual((stats["p50_ms"], stats["p95_ms"], stats["p99_ms"]), (52.0, 97.0, 200.0))
+
+        text = registry.render_prometheus({"cache_hit": 3})
+        self.assertIn('rag_stage_duration_seconds_bucket{stage="vector_search",le="0.005"} 5', text)
+        self.assertIn('rag_stage_duration_seconds_bucket{stage="vector_search",le="0.1"} 100', text)
+        self.assertIn('rag_stage_duration_seconds_bucket{stage="vector_search",le="+Inf"} 101', text)
+        self.assertIn('rag_stage_duration_seconds_count{stage="vector_search"} 101', text)
+        self.assertIn('rag_stage_duration_recent_seconds{stage="vector_search",quantile="0.99"}', text)
+        self.assertIn('rag_stage_errors_total{stage="vector_search"} 1', text)
+        self.assertIn('rag_events_total{event="cache_hit"} 3', text)
+        self.assertTrue(all(line.startswith(("#", "rag_")) for line in text.splitlines()))
+
+    def test_timer_records_errors_and_is_a_no_op_when_disabled(self):
+        registry = MetricsRegistry(enabled=True)
+        with self.assertRaises(ValueError):
+            with StageTimer(registry, "tool:web_search"):
+                raise ValueError("boom")
+        self.assertEqual(registry.get_stats()["tool:web_search"]["errors"], 1)
+
+        disabled = MetricsRegistry(enabled=False)
+        with StageTimer(disabled, "tool:web_search"):
+            pass
+        self.assertEqual(disabled.get_stats(), {})
+        self.assertEqual(len(LATENCY_BUCKETS), len(registry._stages["tool:web_search"].buckets))
+
+
+class TestTimedDecorator(unittest.TestCase):
+
+    def setUp(self):
+        self.enabled = metrics_registry.enabled
+        metrics_registry.enabled = True
+        metrics_registry.reset()
+
+    def tearDown(self):
+        metrics_registry.enabled = self.enabled
+        metrics_registry.reset()
+
+    def test_sync_and_async_functions(self):
+        @timed("answer_question")
+        def answer(query: str) -> str:
+            return query.upper()
+
+        @timed("answer_question")
+        async def aanswer(query: str) -> str:
+            return query.lower()
+
+        self.assertEqual(answer("q"), "Q")
+        self.assertEqual(asyncio.run(aanswer("Q")), "q")
+        self.assertEqual(answer.__name__, "answer")
+        self.assertEqual(metrics_registry.get_stats()["answer_question"]["count"], 2)
+
+        metrics_registry.enabled = False
+        answer("q")
+        self.assertEqual(metrics_registry.get_stats()["answer_question"]["count"], 2)
+
+    def test_llm_handler_times_each_run(self):
+        handler = LLMTimingHandler("answer_llm")
+        first, second = uuid4(), uuid4()
+        handler.on_chat_model_start({}, [[]], run_id=first)
+        handler.on_llm_start({}, ["prompt"], run_id=second)
+        handler.on_llm_end(None, run_id=first)
+        handler.on_llm_error(RuntimeError("rate limited"), run_id=second)
+
+        stats = metrics_registry.get_stats()["answer_llm"]
+        self.assertEqual((stats["count"], stats["errors"]), (2, 1))
+        self.assertEqual(handler._started, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,148 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+from langchain_chroma import Chroma
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding, Embeddings
+
+from src.keyword_index import KeywordIndex
+from src.numpy_store import RECORDS_FILE, NumpyVectorStore, ReadOnlyStoreError, export_numpy_store
+from src.vector_store import HybridRetriever
+
+
+class TestNumpyVectorStore(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        self.vectors = rng.normal(size=(200, 16)).astype(np.float32)
+        self.ids = [f"id-{i}" for i in range(200)]
+        self.texts = [f"chunk {i}" for i in range(200)]
+        self.metadatas = [{"file_name": "a.pdf" if i % 2 else "b.pdf", "page": i} for i in range(200)]
+        self.queries = rng.normal(size=(5, 16)).astype(np.float32)
+
+    def expected(self, k, rows=None):
+        """Brute-force cosine ranking"""
+        vectors = self.vectors / np.linalg.norm(self.vectors, axis=1, keepdims=True)
+        queries = self.queries / np.linalg.norm(self.queries, axis=1, keepdims=True)
+        scores = queries @ vectors.T
+        if rows is not None:
+            scores[:, [i for i in range(len(vectors)) if i not in rows]] = -np.inf
+        return [[self.ids[i] for i in np.argsort(-row)[:k]] for row in scores]
+
+    def search_ids(self, store, k, filter=None):
+        return [[store.ids[row] for row, _ in hits] for hits in store.search_vectors(self.queries, k, filter)]
+
+    def test_flat_search_is_exact(self):
+        store = NumpyVectorStore.from_arrays(self.vectors, self.ids, self.texts, self.metadatas, ivf_lists=0)
+        self.assertEqual(self.search_ids(store, 5), self.expected(5))
+        doc, score = store.similarity_search_with_score_by_vector(self.queries[0].tolist(), k=1)[0]
+        self.assertEqual(doc.id, self.expected(1)[0][0])
+        self.assertLessEqual(score, 1.0 + 1e-5)
+
+    def test_metadata_filter(self):
+        store = NumpyVectorStore.from_arrays(self.vectors, self.ids, self.texts, self.metadatas, ivf_lists=0)
+        odd = {i for i in range(200) if i % 2}
+        self.assertEqual(self.search_ids(store, 3, {"file_name": "a.pdf"}), self.expected(3, odd))
+        self.assertEqual(self.search_ids(store, 3, {"file_name": "missing.pdf"}), [[]] * 5)
+        with self.assertRaises(ValueError):
+            store.search_vectors(self.queries, 3, {"page": {"$gt": 3}})
+
+    def test_ivf_scans_only_probed_lists(self):
+        store = NumpyVectorStore.from_arrays(self.vectors, self.ids, self.texts, self.metadatas,
+                                             ivf_lists=8, nprobe=8)
+        self.assertEqual(list(store.offsets[[0, -1]]), [0, 200])
+        # Probing every list is exact
+        self.assertEqual(self.search_ids(store, 4), self.expected(4))
+
+        store.nprobe = 1
+        probed = store._probed_lists(self.queries / np.linalg.norm(self.queries, axis=1, keepdims=True))
+        for hits, (probed_list,) in zip(store.search_vectors(self.queries, 4), probed):
+            start, stop = store.offsets[probed_list], store.offsets[probed_list + 1]
+            self.assertTrue(all(start <= row < stop for row, _ in hits))
+
+    def test_save_and_load_memory_maps_the_matrix(self):
+        store = NumpyVectorStore.from_arrays(self.vectors, self.ids, self.texts, self.metadatas,
+                                             ivf_lists=4, quantization="int8", corpus_version="v1")
+        persist_directory = tempfile.mkdtemp()
+        try:
+            store.save(persist_directory)
+            loaded = NumpyVectorStore.load(persist_directory)
+            self.assertIsInstance(loaded.vectors, np.memmap)
+            self.assertEqual(loaded.corpus_version, "v1")
+            self.assertEqual(loaded.quantization, "int8")
+            self.assertEqual(self.search_ids(loaded, 3), self.search_ids(store, 3))
+            self.assertEqual(loaded.get_documents()[0].page_content, store.texts[0])
+        finally:
+            shutil.rmtree(persist_directory)
+
+    def test_damaged_records_are_ignored(self):
+        """A records file without the expected keys loads as no snapshot"""
+        store = NumpyVectorStore.from_arrays(self.vectors, self.ids, self.texts, self.metadatas)
+        persist_directory = tempfile.mkdtemp()
+        try:
+            store.save(persist_directory)
+            for records in ({"documents": [], "metadatas": []}, ["not", "a", "mapping"]):
+                with open(os.path.join(persist_directory, RECORDS_FILE), "w", encoding="utf-8") as f:
+                    json.dump(records, f)
+                self.assertIsNone(NumpyVectorStore.load(persist_directory))
+        finally:
+            shutil.rmtree(persist_directory)
+
+    def test_export_serves_the_memory_mapped_snapshot(self):
+        persist_directory = tempfile.mkdtemp()
+        try:
+            chroma_store = Chroma.from_texts(self.texts[:20], DeterministicFakeEmbedding(size=16),
+                                             metadatas=self.metadatas[:20], persist_directory=persist_directory)
+            store = export_numpy_store(chroma_store, persist_directory, ivf_lists=0)
+            self.assertIsInstance(store.vectors, np.memmap)
+            self.assertEqual(len(store), 20)
+        finally:
+            shutil.rmtree(persist_directory)
+
+    def test_quantized_scan_is_rescored_in_full_precision(self):
+        for quantization in ("float16", "int8"):
+            store = NumpyVectorStore.from_arrays(self.vectors, self.ids, self.texts, self.metadatas,
+                                                 ivf_lists=0, quantization=quantization)
+            self.assertEqual(store.quantization, quantization)
+            self.assertEqual(self.search_ids(store, 5), self.expected(5))
+            exact = NumpyVectorStore.from_arrays(self.vectors, self.ids, self.texts, self.metadatas, ivf_lists=0)
+            self.assertEqual(store.search_vectors(self.queries[:1], 3), exact.search_vectors(self.queries[:1], 3))
+
+        store = NumpyVectorStore.from_arrays(self.vectors, self.ids, self.texts, self.metadatas, ivf_lists=0,
+                                             quantization="int8")
+        self.assertEqual(store.quantized.dtype, np.int8)
+        self.assertEqual(store.quantized.nbytes * 4, store.vectors.nbytes)
+        with self.assertRaises(ValueError):
+            NumpyVectorStore.from_arrays(self.vectors, self.ids, self.texts, self.metadatas, quantization="int4")
+
+    def test_serves_the_hybrid_retriever(self):
+        class FirstRowEmbeddings(Embeddings):
+            def embed_query(self, text):
+                return vectors[0].tolist()
+
+            def embed_documents(self, texts):
+                return [self.embed_query(text) for text in texts]
+
+        vectors = self.vectors
+        store = NumpyVectorStore.from_arrays(self.vectors, self.ids, self.texts, self.metadatas,
+                                             FirstRowEmbeddings(), ivf_lists=0)
+        retriever = HybridRetriever(vector_store=store, keyword_index=KeywordIndex.build(store.get_documents()),
+                                    k=3, source="b.pdf")
+        documents = retriever.invoke("chunk 0")
+        self.assertEqual(documents[0].page_content, "chunk 0")
+        self.assertTrue(all(doc.metadata["file_name"] == "b.pdf" for doc in documents))
+
+    def test_read_only(self):
+        store = NumpyVectorStore.from_arrays(self.vectors, self.ids, self.texts, self.metadatas, ivf_lists=0)
+        with self.assertRaises(ReadOnlyStoreError):
+            store.add_texts(["new"])
+        with self.assertRaises(ReadOnlyStoreError):
+            store.add_documents([Document(page_content="new")])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,154 @@
+import json
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from src.observability import (
+    LangfuseIngestionSender, ObservabilityManager, TelemetryExporter, ingestion_event
+)
+
+
+class StubCollector:
+    """Local stand-in for the Langfuse ingestion endpoint"""
+
+    def __init__(self, latency: float = 0.0, failures: int = 0):
+        self.latency = latency
+        self.failures = failures
+        self.batches = []
+        self.headers = []
+        collector = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                time.sleep(collector.latency)
+                if collector.failures > 0:
+                    collector.failures -= 1
+                    self.send_response(503)
+                    self.end_headers()
+                    return
+                collector.batches.append(body["batch"])
+                collector.headers.append((self.path, self.headers["Authorization"]))
+                self.send_response(207)
+                self.end_headers()
+                self.wfile.write(b'{"successes": [], "errors": []}')
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    @property
+    def host(self) -> str:
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class TestTelemetryExporter(unittest.TestCase):
+
+    def setUp(self):
+        self.exporters = []
+
+    def tearDown(self):
+        for exporter in self.exporters:
+            exporter.shutdown(timeout=1)
+
+    def exporter(self, collector: StubCollector, **options) -> TelemetryExporter:
+        options.setdefault("flush_interval", 0.05)
+        options.setdefault("backoff", 0.01)
+        exporter = TelemetryExporter(LangfuseIngestionSender(collector.host, "pk", "sk", timeout=2), **options)
+        self.exporters.append(exporter)
+        return exporter
+
+    def test_exports_in_batches(self):
+        collector = StubCollector()
+        self.addCleanup(collector.close)
+        exporter = self.exporter(collector, batch_size=100)
+        for i in range(250):
+            exporter.emit(ingestion_event("event-create", {"n": i}))
+        self.assertTrue(exporter.flush(timeout=5))
+
+        self.assertEqual(sorted(event["body"]["n"] for batch in collector.batches for event in batch),
+                         list(range(250)))
+        self.assertTrue(all(len(batch) <= 100 for batch in collector.batches))
+        self.assertEqual(collector.headers[0][0], "/api/public/ingestion")
+        self.assertTrue(collector.headers[0][1].startswith("Basic "))
+        self.assertEqual(exporter.get_stats(), {"enqueued": 250, "dropped": 0, "exported": 250,
+                                                "failed_batches": 0, "retries": 0, "queued": 0})
+
+    def test_emit_does_not_wait_for_a_slow_collector(self):
+        collector = StubCollector(latency=0.2)
+        self.addCleanup(collector.close)
+        exporter = self.exporter(collector, batch_size=1)
+        started = time.perf_counter()
+        for i in range(20):
+            exporter.emit(ingestion_event("event-create", {"n": i}))
+        self.assertLess(time.perf_counter() - started, 0.1)
+
+    def test_full_buffer_drops_oldest(self):
+        release = threading.Event()
+        sent = []
+
+        def send(batch):
+            release.wait(5)
+            sent.extend(event["body"]["n"] for event in batch)
+
+        exporter = TelemetryExporter(send, capacity=5, batch_size=1, flush_interval=0.01)
+        self.exporters.append(exporter)
+        exporter.emit(ingestion_event("event-create", {"n": 0}))
+        while not exporter._in_flight:
+            time.sleep(0.005)
+        for i in range(1, 11):
+            exporter.emit(ingestion_event("event-create", {"n": i}))
+        self.assertEqual(exporter.get_stats()["dropped"], 5)
+        self.assertEqual(exporter.get_stats()["queued"], 6)
+
+        release.set()
+        self.assertTrue(exporter.flush(timeout=5))
+        self.assertEqual(sent, [0, 6, 7, 8, 9, 10])
+
+    def test_retries_with_backoff_then_gives_up(self):
+        collector = StubCollector(failures=2)
+        self.addCleanup(collector.close)
+        exporter = self.exporter(collector, batch_size=10)
+        exporter.emit(ingestion_event("event-create", {"n": 1}))
+        self.assertTrue(exporter.flush(timeout=5))
+        self.assertEqual(exporter.get_stats()["retries"], 2)
+        self.assertEqual(exporter.get_stats()["exported"], 1)
+
+        collector.failures = 10
+        exporter.max_retries = 1
+        exporter.emit(ingestion_event("event-create", {"n": 2}))
+        self.assertTrue(exporter.flush(timeout=5))
+        stats = exporter.get_stats()
+        self.assertEqual((stats["failed_batches"], stats["dropped"], stats["exported"]), (1, 1, 1))
+
+    def test_manager_queues_traces_and_generations(self):
+        collector = StubCollector()
+        self.addCleanup(collector.close)
+        manager = ObservabilityManager()
+        manager.exporter = self.exporter(collector)
+
+        self.assertEqual(manager.create_trace_session("session-1", "user-1"), "session-1")
+        manager.log_generation("answer", "question?", "answer.", "gpt", {"session_id": "session-1"})
+        self.assertTrue(manager.exporter.flush(timeout=5))
+
+        events = [event for batch in collector.batches for event in batch]
+        self.assertEqual([event["type"] for event in events], ["trace-create", "generation-create"])
+        self.assertEqual(events[1]["body"]["traceId"], "session-1")
+        self.assertEqual(manager.get_telemetry_stats()["exported"], 2)
+
+    def test_manager_without_exporter_is_a_no_op(self):
+        manager = ObservabilityManager()
+        self.assertIsNone(manager.create_trace_session("session-1"))
+        manager.log_generation("answer", "q", "a", "gpt")
+        self.assertEqual(manager.get_telemetry_stats(), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
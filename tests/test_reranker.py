@@ -0,0 +1,38 @@
+import unittest
+
+from langchain_core.documents import Document
+
+from src.keyword_index import KeywordIndex
+from src.reranker import LexicalReranker
+
+
+class TestLexicalReranker(unittest.TestCase):
+
+    def setUp(self):
+        self.documents = [
+            Document(page_content="Gen AI adoption keeps growing across business functions."),
+            Document(page_content="Yee wrote about the workforce. Lareina joined later."),
+            Document(page_content="Lareina Yee is a senior partner and McKinsey Global Institute director."),
+        ]
+
+    def test_keeps_top_n_by_coverage_and_phrase(self):
+        """Both words as an exact phrase beat both words apart"""
+        reranker = LexicalReranker(top_n=2)
+        ranked = reranker.compress_documents(self.documents, "Who is Lareina Yee?")
+        self.assertEqual([doc.page_content for doc in ranked],
+                         [self.documents[2].page_content, self.documents[1].page_content])
+
+    def test_rare_terms_weigh_more_with_corpus_idf(self):
+        corpus = self.documents + [Document(page_content=f"gen AI note {i}") for i in range(5)]
+        reranker = LexicalReranker(top_n=1, keyword_index=KeywordIndex.build(corpus))
+        ranked = reranker.compress_documents(self.documents[:2], "gen AI workforce")
+        self.assertEqual(ranked[0].page_content, self.documents[1].page_content)
+
+    def test_ties_keep_retriever_order(self):
+        reranker = LexicalReranker(top_n=3)
+        ranked = reranker.compress_documents(self.documents, "the of")
+        self.assertEqual(list(ranked), self.documents)
+
+
+if __name__ == '__main__':
+    unittest.main()
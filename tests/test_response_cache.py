@@ -0,0 +1,101 @@
+import asyncio
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from src.response_cache import (
+    CacheTier, ResponseCache, MemoryTier, SQLiteTier, make_response_key
+)
+
+
+class TestResponseCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.cache_dir, "responses.sqlite3")
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def test_key_normalizes_question(self):
+        """Case, spacing and trailing punctuation do not change the key"""
+        a = make_response_key("Who is  Lareina Yee?", "gpt-4", "p1", "v1")
+        b = make_response_key("who is lareina yee", "gpt-4", "p1", "v1")
+        self.assertEqual(a, b)
+        self.assertNotEqual(a, make_response_key("who is lareina yee", "gpt-4", "p1", "v2"))
+        self.assertNotEqual(a, make_response_key("who is lareina yee", "gpt-4", "p2", "v1"))
+
+    def test_hit_after_miss(self):
+        """The second identical question is served without computing"""
+        cache = ResponseCache([MemoryTier()])
+        calls = []
+        compute = lambda: calls.append(1) or "answer"
+
+        self.assertEqual(cache.get_or_compute("k", compute)[1]["status"], "miss")
+        value, info = cache.get_or_compute("k", compute)
+        self.assertEqual((value, info["status"]), ("answer", "hit"))
+        self.assertEqual(len(calls), 1)
+
+    def test_errors_not_cached(self):
+        cache = ResponseCache([MemoryTier()])
+        cache.get_or_compute("k", lambda: "Error: boom", cacheable=lambda v: not v.startswith("Error"))
+        self.assertEqual(cache.get("k")[1], "miss")
+
+    def test_tier_must_implement_the_interface(self):
+        class GetOnlyTier(CacheTier):
+            def get(self, key):
+                return None
+
+        with self.assertRaises(TypeError):
+            GetOnlyTier()
+
+    def test_sqlite_tier_survives_restart(self):
+        """A new cache over the same file serves earlier answers"""
+        ResponseCache([MemoryTier(), SQLiteTier(self.path)]).set("k", "answer")
+
+        value, info = ResponseCache([MemoryTier(), SQLiteTier(self.path)]).get_or_compute(
+            "k", lambda: "recomputed"
+        )
+        self.assertEqual((value, info["status"]), ("answer", "hit"))
+
+    def test_stale_while_revalidate(self):
+        """Expired entries are served stale and refreshed in the background"""
+        cache = ResponseCache([MemoryTier()], ttl_seconds=0, stale_seconds=60)
+        cache.set("k", "old")
+        refreshed = threading.Event()
+
+        def compute():
+            refreshed.set()
+            return "new"
+
+        value, info = cache.get_or_compute("k", compute)
+        self.assertEqual((value, info["status"]), ("old", "stale"))
+        self.assertTrue(refreshed.wait(5))
+        for _ in range(100):
+            if cache.get("k")[0]["value"] == "new":
+                break
+            threading.Event().wait(0.01)
+        self.assertEqual(cache.get("k")[0]["value"], "new")
+
+    def test_async_stale_while_revalidate(self):
+        """The async path serves stale entries and refreshes them as a task"""
+        cache = ResponseCache([MemoryTier()], ttl_seconds=0, stale_seconds=60)
+        cache.set("k", "old")
+
+        async def compute():
+            return "new"
+
+        async def run():
+            value, info = await cache.aget_or_compute("k", compute)
+            await asyncio.sleep(0.01)
+            return value, info
+
+        value, info = asyncio.run(run())
+        self.assertEqual((value, info["status"]), ("old", "stale"))
+        self.assertEqual(cache.get("k")[0]["value"], "new")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import threading
+import unittest
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from src.router import QuestionRouter, REPORT_TOOL, SUMMARY_TOOL
+
+
+class TestQuestionRouter(unittest.TestCase):
+
+    def setUp(self):
+        self.router = QuestionRouter(embeddings=None, threshold=0.8, direct_tools=[REPORT_TOOL])
+
+    def test_report_question_goes_direct(self):
+        decision = self.router.route("Who is Lareina Yee according to the document?")
+        self.assertEqual(decision.tool, REPORT_TOOL)
+        self.assertTrue(decision.direct)
+
+    def test_overview_question_goes_to_summary_tool(self):
+        """Overview keywords win unless a specific-fact keyword is present"""
+        self.assertEqual(self.router.route("Give me an overview of the report").tool, SUMMARY_TOOL)
+        self.assertEqual(self.router.route("What are the key statistics in the report?").tool, REPORT_TOOL)
+
+    def test_single_keyword_needs_embedding_agreement(self):
+        """One keyword hit alone is not enough to skip the agent"""
+        decision = self.router.route("Give me an overview of the report")
+        self.assertEqual((decision.tool, decision.direct), (SUMMARY_TOOL, False))
+
+        router = QuestionRouter(embeddings=None, threshold=0.8, direct_tools=[SUMMARY_TOOL])
+        router.centroid_scores = lambda vector: {SUMMARY_TOOL: 0.9, REPORT_TOOL: 0.5}
+        decision = router.decide("Give me an overview of the report", vector=[1.0])
+        self.assertEqual((decision.tool, decision.direct), (SUMMARY_TOOL, True))
+
+    def test_ambiguous_question_uses_agent(self):
+        """Keywords for several tools fall back to the agent"""
+        decision = self.router.route("Find academic papers on the main findings of the report")
+        self.assertFalse(decision.direct)
+
+    def test_non_direct_tool_uses_agent(self):
+        decision = self.router.route("What is the latest news on AI regulation?")
+        self.assertEqual(decision.tool, "web_search")
+        self.assertFalse(decision.direct)
+
+    def test_saved_latency_is_estimated_from_agent_runs(self):
+        self.router.record(self.router.route("What is the latest news?"), 1000.0)
+        self.router.record(self.router.route("Who is Lareina Yee according to the report?"), 250.0)
+        stats = self.router.get_stats()
+        self.assertEqual((stats["direct"], stats["agent"]), (1, 1))
+        self.assertEqual(stats["saved_ms"], 750.0)
+
+    def test_stats_do_not_wait_for_the_centroids(self):
+        """Embedding the seed questions does not block record or get_stats"""
+        started, release = threading.Event(), threading.Event()
+
+        class SlowEmbeddings(DeterministicFakeEmbedding):
+            def embed_documents(self, texts):
+                started.set()
+                release.wait(5)
+                return super().embed_documents(texts)
+
+        router = QuestionRouter(embeddings=SlowEmbeddings(size=8))
+        worker = threading.Thread(target=router.route, args=("What is the latest news?",))
+        worker.start()
+        self.assertTrue(started.wait(5))
+        recorded = threading.Event()
+
+        def record():
+            router.record(self.router.route("What is the latest news?"), 100.0)
+            router.get_stats()
+            recorded.set()
+
+        try:
+            threading.Thread(target=record, daemon=True).start()
+            self.assertTrue(recorded.wait(1))
+        finally:
+            release.set()
+            worker.join(5)
+        self.assertEqual(set(router._centroids), set(router.centroid_scores([1.0] * 8)))
+
+
+if __name__ == '__main__':
+    unittest.main()
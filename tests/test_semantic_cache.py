@@ -0,0 +1,73 @@
+import unittest
+
+from langchain_core.embeddings import Embeddings
+
+from src.semantic_cache import SemanticCache, with_semantic_cache
+
+
+class KeywordEmbeddings(Embeddings):
+    """Bag-of-words fake embedder so paraphrases land close together"""
+
+    vocabulary = ["lareina", "yee", "who", "percentage", "organizations", "ai", "use"]
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text):
+        words = text.lower().replace("?", "").split()
+        return [float(words.count(term)) + 0.01 for term in self.vocabulary]
+
+
+class TestSemanticCache(unittest.TestCase):
+
+    def setUp(self):
+        self.calls = []
+
+        def query_engine(query, source=None):
+            self.calls.append(query)
+            return f"answer to {query}"
+
+        self.query_engine = query_engine
+        self.cache = SemanticCache(KeywordEmbeddings(), threshold=0.95)
+
+    def test_similar_query_is_served_from_cache(self):
+        """A paraphrase within the threshold reuses the stored answer"""
+        cached = with_semantic_cache(self.query_engine, self.cache, "v1")
+
+        first = cached("Who is Lareina Yee?")
+        second = cached("who is lareina yee")
+        cached("What percentage of organizations use AI?")
+
+        self.assertEqual(first, second)
+        self.assertEqual(len(self.calls), 2)
+        self.assertEqual(self.cache.get_stats()["hits"], 1)
+
+    def test_new_corpus_version_invalidates(self):
+        """Answers cached against an older index are not reused"""
+        with_semantic_cache(self.query_engine, self.cache, "v1")("Who is Lareina Yee?")
+        with_semantic_cache(self.query_engine, self.cache, "v2")("Who is Lareina Yee?")
+
+        self.assertEqual(len(self.calls), 2)
+        self.assertEqual(self.cache.get_stats()["entries"], 1)
+
+    def test_lru_eviction(self):
+        """The cache never grows past max_entries"""
+        cache = SemanticCache(KeywordEmbeddings(), max_entries=2)
+        for query in ["who", "lareina yee", "ai use"]:
+            cache.store(query, query, "v1")
+        self.assertEqual(cache.get_stats()["entries"], 2)
+
+    def test_expired_entries_do_not_hide_live_ones(self):
+        """An expired exact match is dropped before scoring, so a fresh paraphrase still hits"""
+        cache = SemanticCache(KeywordEmbeddings(), threshold=0.95, ttl_seconds=60)
+        cache.store("Who is Lareina Yee?", "old answer", "v1")
+        cache.store("who is lareina yee", "new answer", "v1")
+        cache._entries[0].created_at -= 120
+
+        answer, _ = cache.lookup("Who is Lareina Yee?", "v1")
+        self.assertEqual(answer, "new answer")
+        self.assertEqual(cache.get_stats()["entries"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import shutil
+import tempfile
+import unittest
+
+from langchain_chroma import Chroma
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.language_models import FakeListChatModel
+
+from src.summary_index import SummaryIndex, build_summary_index, create_summary_index_query_engine
+
+
+class CountingChatModel(FakeListChatModel):
+    """Fake chat model that counts completions"""
+
+    calls: int = 0
+
+    def _call(self, *args, **kwargs):
+        self.calls += 1
+        return super()._call(*args, **kwargs)
+
+
+def make_chunk(page: int, text: str) -> Document:
+    return Document(page_content=text, metadata={
+        "source": "data/state.pdf", "file_name": "state.pdf", "page": page, "content_hash": f"{page}-{text}",
+    })
+
+
+class TestSummaryIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.persist_directory = tempfile.mkdtemp()
+        self.embeddings = DeterministicFakeEmbedding(size=16)
+        self.vector_store = Chroma.from_documents(
+            documents=[make_chunk(page, f"page {page} text") for page in range(8)],
+            embedding=self.embeddings,
+            persist_directory=self.persist_directory,
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.persist_directory, ignore_errors=True)
+
+    def build(self, llm):
+        return build_summary_index(self.vector_store, self.persist_directory, llm=llm,
+                                   embeddings=self.embeddings, pages_per_section=4, max_concurrency=1)
+
+    def test_build_persists_section_and_document_summaries(self):
+        llm = CountingChatModel(responses=["summary"])
+        stats = self.build(llm)
+
+        # Two 4-page sections plus one document summary
+        self.assertEqual((stats["sections"], stats["summarized"], llm.calls), (2, 3, 3))
+        index = SummaryIndex.load(self.persist_directory)
+        self.assertEqual(index.documents[0]["file_name"], "state.pdf")
+        self.assertEqual([section["pages"] for section in index.sections()], [[0, 3], [4, 7]])
+
+    def test_unchanged_corpus_is_not_resummarized(self):
+        self.build(CountingChatModel(responses=["summary"]))
+        llm = CountingChatModel(responses=["summary"])
+        self.assertTrue(self.build(llm)["reused"])
+        self.assertEqual(llm.calls, 0)
+
+    def test_only_changed_sections_are_resummarized(self):
+        self.build(CountingChatModel(responses=["summary"]))
+        self.vector_store.add_documents([make_chunk(6, "new finding")])
+
+        llm = CountingChatModel(responses=["summary"])
+        stats = self.build(llm)
+        # The edited section and the document roll-up
+        self.assertEqual((stats["summarized"], llm.calls), (2, 2))
+
+    def test_query_makes_a_single_llm_call(self):
+        self.build(CountingChatModel(responses=["summary"]))
+        llm = CountingChatModel(responses=["overview answer"])
+        query = create_summary_index_query_engine(SummaryIndex.load(self.persist_directory),
+                                                  llm=llm, embeddings=self.embeddings)
+
+        self.assertEqual(query("What are the key insights?"), "overview answer")
+        self.assertEqual(llm.calls, 1)
+        self.assertEqual(query("overview", source="other.pdf"), "No summaries available for this report.")
+
+
+if __name__ == '__main__':
+    unittest.main()
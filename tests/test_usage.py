@@ -0,0 +1,112 @@
+import unittest
+import uuid
+from unittest.mock import patch
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, LLMResult
+from langchain_core.tools import StructuredTool
+
+from src import usage as usage_module
+from src.agent import ask_question
+from src.usage import (
+    MeteredEmbeddings, SessionLedger, TokenUsageHandler, current_usage, tool_scope, track_usage
+)
+
+
+def chat_result(prompt_tokens: int, completion_tokens: int) -> LLMResult:
+    message = AIMessage(content="answer", usage_metadata={
+        "input_tokens": prompt_tokens, "output_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+    })
+    return LLMResult(generations=[[ChatGeneration(message=message)]])
+
+
+class TestTokenAccounting(unittest.TestCase):
+
+    def test_llm_and_embedding_calls_are_attributed_to_the_request(self):
+        ledger = SessionLedger()
+        with patch.object(usage_module, "session_ledger", ledger):
+            with track_usage("session-1") as usage:
+                TokenUsageHandler("agent_llm").on_llm_end(chat_result(100, 20), run_id=uuid.uuid4())
+                with tool_scope("mckinsey_report_tool"):
+                    MeteredEmbeddings(DeterministicFakeEmbedding(size=8)).embed_query("Who is Lareina Yee?")
+                    # Providers without per-message metadata still report totals in llm_output
+                    TokenUsageHandler("answer_llm").on_llm_end(
+                        LLMResult(generations=[], llm_output={"token_usage": {"prompt_tokens": 50,
+                                                                               "completion_tokens": 10}}),
+                        run_id=uuid.uuid4())
+                with track_usage("session-1") as nested:
+                    self.assertIs(nested, usage)
+            self.assertIsNone(current_usage())
+
+            totals = usage.as_dict()
+            self.assertEqual((totals["prompt_tokens"], totals["completion_tokens"], totals["llm_calls"]),
+                             (150, 30, 2))
+            self.assertGreater(totals["embedding_tokens"], 0)
+            self.assertEqual(totals["total_tokens"], 180 + totals["embedding_tokens"])
+            self.assertGreater(totals["cost_usd"], 0)
+            self.assertEqual(set(totals["by_stage"]), {"agent_llm", "answer_llm", "embedding"})
+            self.assertEqual(totals["by_tool"]["mckinsey_report_tool"]["prompt_tokens"], 50)
+
+            session = ledger.get_session("session-1")
+            self.assertEqual((session["requests"], session["total_tokens"]), (1, totals["total_tokens"]))
+
+    def test_calls_outside_a_request_only_reach_the_process_totals(self):
+        ledger = SessionLedger()
+        with patch.object(usage_module, "session_ledger", ledger):
+            TokenUsageHandler("summary_index").on_llm_end(chat_result(10, 5), run_id=uuid.uuid4())
+        self.assertEqual(ledger.get_stats()["total_tokens"], 15)
+        self.assertEqual(ledger.get_stats()["sessions"], 0)
+
+
+class TestBudgetGuard(unittest.TestCase):
+
+    def test_budget_decisions(self):
+        ledger = SessionLedger(budget=1000, action="downgrade", request_estimate=300)
+        self.assertEqual(ledger.check("s"), "ok")
+        ledger.add("s", {"total_tokens": 600}, requests=1)
+        # The next request is expected to cost the session average of 600 tokens
+        self.assertEqual(ledger.check("s"), "downgrade")
+        ledger.add("s", {"total_tokens": 500}, requests=1)
+        self.assertEqual(ledger.check("s"), "reject")
+        self.assertEqual(SessionLedger(budget=0).check("s"), "ok")
+
+        ledger.action = "reject"
+        ledger.add("t", {"total_tokens": 800}, requests=1)
+        self.assertEqual(ledger.check("t"), "reject")
+        self.assertEqual((ledger.get_stats()["downgraded"], ledger.get_stats()["rejected"]), (1, 2))
+
+    def test_ask_question_downgrades_then_rejects(self):
+        calls = []
+
+        def report(query: str) -> str:
+            calls.append(query)
+            return "report answer"
+
+        class Agent:
+            tools = [StructuredTool.from_function(report, name="mckinsey_report_tool", description="report")]
+
+            def invoke(self, *args, **kwargs):
+                raise AssertionError("a downgraded request must not reach the agent")
+
+        ledger = SessionLedger(budget=1000, action="downgrade")
+        ledger.add("s", {"total_tokens": 700}, requests=1)
+        history = [{"question": "earlier", "answer": "earlier answer"}]
+        with patch.object(usage_module, "session_ledger", ledger):
+            with track_usage("s") as usage:
+                self.assertEqual(ask_question(Agent(), "Who is Lareina Yee?", history, session_id="s"),
+                                 "report answer")
+            self.assertEqual(usage.budget_action, "downgraded")
+            self.assertEqual(calls, ["Who is Lareina Yee?"])
+
+            ledger.add("s", {"total_tokens": 300})
+            with track_usage("s") as usage:
+                answer = ask_question(Agent(), "Who is Lareina Yee?", history, session_id="s")
+            self.assertTrue(answer.startswith("Error"))
+            self.assertEqual(usage.budget_action, "rejected")
+            self.assertEqual(len(calls), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+import asyncio
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+import chromadb
+from langchain_chroma import Chroma
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.language_models import FakeListChatModel
+
+from config.settings import EMBEDDING_DIMENSIONS
+from src.keyword_index import KeywordIndex
+from src.vector_store import (
+    check_vector_store_health, create_batch_query_engine, reciprocal_rank_fusion, HybridRetriever
+)
+
+
+class CountingEmbeddings(DeterministicFakeEmbedding):
+    """Deterministic fake embedder that counts embedding requests"""
+
+    calls: int = 0
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        return super().embed_documents(texts)
+
+
+class TestVectorStoreHealth(unittest.TestCase):
+
+    def setUp(self):
+        self.persist_directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.persist_directory, ignore_errors=True)
+
+    def test_missing_directory(self):
+        """A missing index is reported as unhealthy"""
+        report = check_vector_store_health(self.persist_directory + "_missing")
+        self.assertFalse(report["healthy"])
+        self.assertTrue(report["errors"])
+
+    def test_missing_collection_is_not_created(self):
+        """The probe reports a missing collection instead of creating an empty one"""
+        client = chromadb.PersistentClient(path=self.persist_directory)
+        client.create_collection("other")
+
+        report = check_vector_store_health(self.persist_directory)
+        self.assertFalse(report["healthy"])
+        self.assertIn("not found", report["errors"][0])
+        self.assertEqual([collection.name for collection in client.list_collections()], ["other"])
+
+    def test_healthy_store(self):
+        """A populated index passes without embedding anything"""
+        embeddings = DeterministicFakeEmbedding(size=EMBEDDING_DIMENSIONS)
+        vector_store = Chroma.from_documents(
+            documents=[Document(page_content=f"chunk {i}") for i in range(3)],
+            embedding=embeddings,
+            persist_directory=self.persist_directory,
+        )
+
+        report = check_vector_store_health(self.persist_directory, vector_store)
+        self.assertTrue(report["healthy"], report["errors"])
+        self.assertEqual(report["document_count"], 3)
+        self.assertEqual(report["embedding_dimensions"], EMBEDDING_DIMENSIONS)
+
+
+class TestBatchQuery(unittest.TestCase):
+
+    def setUp(self):
+        self.persist_directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.persist_directory, ignore_errors=True)
+
+    @patch("src.vector_store.ChatOpenAI", lambda **kwargs: FakeListChatModel(responses=["answer"]))
+    def test_batch_embeds_once_and_keeps_order(self):
+        """A batch makes one embedding request and returns results in order"""
+        embeddings = CountingEmbeddings(size=16)
+        vector_store = Chroma.from_documents(
+            documents=[Document(page_content=f"chunk {i}") for i in range(6)],
+            embedding=embeddings,
+            persist_directory=self.persist_directory,
+        )
+        embeddings.calls = 0
+
+        questions = [f"question {i}" for i in range(5)]
+        batch = create_batch_query_engine(vector_store)(questions, max_concurrency=3)
+
+        self.assertEqual(embeddings.calls, 1)
+        self.assertEqual([item["question"] for item in batch["results"]], questions)
+        self.assertTrue(all(item["answer"].startswith("answer") for item in batch["results"]))
+        self.assertIn("generation", batch["results"][0]["timing_ms"])
+
+
+class TestHybridRetrieval(unittest.TestCase):
+
+    def test_rrf_rewards_documents_ranked_by_both_lists(self):
+        a, b, c = (Document(page_content=text) for text in "abc")
+        fused = reciprocal_rank_fusion([[a, b], [c, b]], k=3)
+        self.assertEqual([doc.page_content for doc in fused], ["b", "a", "c"])
+
+    def test_hybrid_retriever_finds_exact_name_missed_by_dense(self):
+        persist_directory = tempfile.mkdtemp()
+        try:
+            chunks = [Document(page_content=f"filler chunk {i}", metadata={"page": i}) for i in range(10)]
+            chunks.append(Document(page_content="Lareina Yee is a senior partner", metadata={"page": 10}))
+            vector_store = Chroma.from_documents(chunks, DeterministicFakeEmbedding(size=16),
+                                                 persist_directory=persist_directory)
+            keyword_index = KeywordIndex.build(chunks)
+            threads = []
+            search = keyword_index.search
+            keyword_index.search = lambda *args: threads.append(threading.current_thread()) or search(*args)
+            retriever = HybridRetriever(vector_store=vector_store, keyword_index=keyword_index, k=2, fetch_k=2)
+            results = retriever.invoke("Who is Lareina Yee?")
+            async_results = asyncio.run(retriever.ainvoke("Who is Lareina Yee?"))
+        finally:
+            shutil.rmtree(persist_directory, ignore_errors=True)
+
+        self.assertIn("Lareina Yee is a senior partner", [doc.page_content for doc in results])
+        self.assertEqual(len(results), 2)
+        # Both paths search BM25 off the calling thread, alongside the dense search
+        self.assertNotIn(threading.current_thread(), threads)
+        self.assertEqual([doc.page_content for doc in async_results], [doc.page_content for doc in results])
+
+
+if __name__ == '__main__':
+    unittest.main()